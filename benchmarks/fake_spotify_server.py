@@ -0,0 +1,263 @@
+"""
+Локальная замена Spotify Web API для нагрузочных тестов.
+
+Отдаёт синтетические, но похожие по форме на настоящие ответы для эндпоинтов
+токена, поиска, треков, альбомов и треков альбома. Поддерживает настраиваемую
+задержку, а также случайные ответы 429 и «зависшие» запросы.
+
+Запуск из корня проекта:
+    python -m benchmarks.fake_spotify_server --port 8080 --latency lognormal:0.08,0.6 --rate-429 0.01
+
+Бот и клиенты Spotify направляются на сервер переменными окружения:
+    SPOTIFY_AUTH_URL=http://127.0.0.1:8080/api/token
+    SPOTIFY_API_URL=http://127.0.0.1:8080/v1
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from aiohttp import web
+
+MAX_PAGE_LIMIT = 50
+
+BASE62_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+SPOTIFY_ID_LENGTH = 22
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Разбирает описание распределения задержки.
+
+    Args:
+        spec: «fixed:сек», «uniform:мин,макс» или «lognormal:медиана,сигма»
+
+    Returns:
+        Функция, возвращающая очередную задержку в секундах
+    """
+
+    kind, _, raw_params = spec.partition(":")
+
+    params = [float(param) for param in raw_params.split(",") if param]
+
+    if kind == "fixed":
+        return lambda: params[0] if params else 0.0
+    elif kind == "uniform":
+        return lambda: random.uniform(params[0], params[1])
+    elif kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(params[0]), params[1])
+
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+
+@dataclass
+class FaultSettings:
+    latency: Callable[[], float]
+    rate_429: float = 0.0
+    retry_after: int = 1
+    rate_timeout: float = 0.0
+    timeout_delay: float = 300.0
+
+
+def _number(content_id: str, modulo: int) -> int:
+    return int(hashlib.md5(content_id.encode()).hexdigest(), 16) % modulo
+
+
+def spotify_id(seed: str) -> str:
+    """
+    Детерминированный ID в формате Spotify (22 символа base62), иначе клиент отклонит его до запроса.
+
+    Args:
+        seed: Строка, из которой получается ID (одинаковая строка - одинаковый ID)
+    """
+
+    number = int(hashlib.md5(seed.encode()).hexdigest(), 16)
+
+    chars = []
+
+    for _ in range(SPOTIFY_ID_LENGTH):
+        number, index = divmod(number, len(BASE62_ALPHABET))
+
+        chars.append(BASE62_ALPHABET[index])
+
+    return "".join(chars)
+
+
+def artist_payload(artist_id: str) -> dict[str, Any]:
+    return {
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+        "id": artist_id,
+        "name": f"Artist {artist_id[:6]}",
+        "type": "artist"
+    }
+
+
+def album_payload(album_id: str) -> dict[str, Any]:
+    return {
+        "album_type": "album",
+        "artists": [artist_payload(spotify_id(f"artist:{album_id}"))],
+        "external_urls": {"spotify": f"https://open.spotify.com/album/{album_id}"},
+        "id": album_id,
+        "images": [
+            {"height": size, "width": size, "url": f"https://i.scdn.co/image/{album_id}{size}"}
+            for size in (640, 300, 64)
+        ],
+        "name": f"Album {album_id[:8]}",
+        "release_date": f"{2000 + _number(album_id, 25)}-01-01",
+        "total_tracks": album_total_tracks(album_id),
+        "type": "album"
+    }
+
+
+def album_total_tracks(album_id: str) -> int:
+    # Часть альбомов - большие сборники, чтобы проверять постраничную загрузку
+    return 1 + _number(album_id, 150)
+
+
+def track_payload(track_id: str, with_album: bool = True) -> dict[str, Any]:
+    data = {
+        "artists": [artist_payload(spotify_id(f"artist:{track_id}"))],
+        "duration_ms": 120_000 + _number(track_id, 180_000),
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        "id": track_id,
+        "name": f"Track {track_id[:8]}",
+        "type": "track"
+    }
+
+    if with_album:
+        data["album"] = album_payload(spotify_id(f"album:{track_id}"))
+
+    return data
+
+
+def conditional_json_response(request: web.Request, payload: dict[str, Any]) -> web.Response:
+    """Ответ с ETag; при совпадении If-None-Match возвращает 304 без тела."""
+
+    body = json.dumps(payload).encode()
+
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers={"ETag": etag})
+
+    return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+
+def create_app(settings: FaultSettings) -> web.Application:
+    @web.middleware
+    async def faults_middleware(request: web.Request, handler):
+        await asyncio.sleep(settings.latency())
+
+        if random.random() < settings.rate_timeout:
+            await asyncio.sleep(settings.timeout_delay)
+
+        if request.path != "/api/token" and random.random() < settings.rate_429:
+            return web.json_response(
+                {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                status=429,
+                headers={"Retry-After": str(settings.retry_after)}
+            )
+
+        return await handler(request)
+
+    async def token(request: web.Request) -> web.Response:
+        return web.json_response({"access_token": "fake-token", "token_type": "Bearer", "expires_in": 3600})
+
+    async def search(request: web.Request) -> web.Response:
+        query = request.query.get("q", "")
+        content_type = request.query.get("type", "track")
+        limit = min(int(request.query.get("limit", 20)), MAX_PAGE_LIMIT)
+
+        seed = hashlib.md5(query.encode()).hexdigest()
+
+        if content_type == "album":
+            items = [album_payload(spotify_id(f"{seed}:{index}")) for index in range(limit)]
+        else:
+            items = [track_payload(spotify_id(f"{seed}:{index}")) for index in range(limit)]
+
+        return web.json_response({f"{content_type}s": {"items": items, "total": limit, "limit": limit, "offset": 0}})
+
+    async def tracks(request: web.Request) -> web.Response:
+        ids = [content_id for content_id in request.query.get("ids", "").split(",") if content_id]
+
+        return web.json_response({"tracks": [track_payload(track_id) for track_id in ids]})
+
+    async def track(request: web.Request) -> web.Response:
+        return conditional_json_response(request, track_payload(request.match_info["content_id"]))
+
+    async def albums(request: web.Request) -> web.Response:
+        ids = [content_id for content_id in request.query.get("ids", "").split(",") if content_id]
+
+        return web.json_response({"albums": [album_payload(album_id) for album_id in ids]})
+
+    async def album(request: web.Request) -> web.Response:
+        return conditional_json_response(request, album_payload(request.match_info["content_id"]))
+
+    async def album_tracks(request: web.Request) -> web.Response:
+        album_id = request.match_info["content_id"]
+
+        offset = int(request.query.get("offset", 0))
+        limit = min(int(request.query.get("limit", 20)), MAX_PAGE_LIMIT)
+
+        total = album_total_tracks(album_id)
+
+        items = [
+            track_payload(spotify_id(f"{album_id}:track:{index}"), with_album=False)
+            for index in range(offset, min(offset + limit, total))
+        ]
+
+        next_url = None
+
+        if offset + limit < total:
+            next_url = f"{request.url.with_query(offset=offset + limit, limit=limit)}"
+
+        return conditional_json_response(
+            request,
+            {"items": items, "total": total, "limit": limit, "offset": offset, "next": next_url}
+        )
+
+    app = web.Application(middlewares=[faults_middleware])
+
+    app.router.add_post("/api/token", token)
+    app.router.add_get("/v1/search", search)
+    app.router.add_get("/v1/tracks", tracks)
+    app.router.add_get("/v1/tracks/{content_id}", track)
+    app.router.add_get("/v1/albums", albums)
+    app.router.add_get("/v1/albums/{content_id}", album)
+    app.router.add_get("/v1/albums/{content_id}/tracks", album_tracks)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная замена Spotify Web API")
+
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", default="fixed:0.05", help="fixed:сек | uniform:мин,макс | lognormal:медиана,сигма")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Значение Retry-After для ответов 429")
+    parser.add_argument("--rate-timeout", type=float, default=0.0, help="Доля «зависших» запросов")
+    parser.add_argument("--timeout-delay", type=float, default=300.0, help="Задержка «зависшего» запроса в секундах")
+
+    args = parser.parse_args()
+
+    settings = FaultSettings(
+        latency=parse_latency(args.latency),
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        rate_timeout=args.rate_timeout,
+        timeout_delay=args.timeout_delay
+    )
+
+    web.run_app(create_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
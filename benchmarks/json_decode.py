@@ -0,0 +1,82 @@
+"""
+Сравнение разбора ответов Spotify стандартным json и orjson, а также размера
+ответов при сжатии.
+
+Запуск из корня проекта:
+    python -m benchmarks.json_decode
+"""
+
+import gzip
+import json
+import timeit
+
+from benchmarks.spotify_models import PAGE_SIZE, render, track_payload
+from services.spotify_models import SpotifyTrack
+from utils import json_decode
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def search_page_body() -> bytes:
+    items = [track_payload(index, with_album=True) for index in range(PAGE_SIZE)]
+
+    return json.dumps({"tracks": {"items": items, "total": 1000, "limit": PAGE_SIZE, "offset": 0}}).encode()
+
+
+def album_tracks_body() -> bytes:
+    items = [track_payload(index, with_album=False) for index in range(PAGE_SIZE)]
+
+    return json.dumps({"items": items, "total": PAGE_SIZE, "limit": PAGE_SIZE, "offset": 0}).encode()
+
+
+def parse_search(data: dict) -> None:
+    render([SpotifyTrack.from_dict(item) for item in data["tracks"]["items"]])
+
+
+def parse_album_tracks(data: dict) -> None:
+    render([SpotifyTrack.from_dict(item) for item in data["items"]])
+
+
+def measure(name: str, function, repeat: int = 300) -> float:
+    seconds = min(timeit.repeat(function, number=repeat, repeat=3)) / repeat
+
+    print(f"  {name:<45} {seconds * 1_000_000:>10.1f} мкс")
+
+    return seconds
+
+
+def compare(title: str, body: bytes, parse):
+    print(f"\n{title}: {len(body) / 1024:.1f} КиБ, gzip {len(gzip.compress(body)) / 1024:.1f} КиБ")
+
+    # Прежний путь синхронного клиента: response.json() вызывался на каждое обращение к данным ответа
+    json_time = measure("json.loads x2 + модели", lambda: (json.loads(body), parse(json.loads(body))))
+    measure("json.loads x1 + модели", lambda: parse(json.loads(body)))
+
+    if orjson is not None:
+        orjson_time = measure("orjson.loads x1 + модели", lambda: parse(orjson.loads(body)))
+
+        print(f"  ускорение: x{json_time / orjson_time:.1f}")
+    else:
+        print("  orjson не установлен, используется стандартный json")
+
+
+def main():
+    print(f"Парсер по умолчанию: {json_decode.JSON_BACKEND}, Accept-Encoding: {json_decode.ACCEPT_ENCODING}")
+
+    compare(
+        "Страница поиска (/search?type=track)",
+        search_page_body(),
+        parse_search
+    )
+    compare(
+        "Треки альбома (/albums/{id}/tracks)",
+        album_tracks_body(),
+        parse_album_tracks
+    )
+
+
+if __name__ == "__main__":
+    main()
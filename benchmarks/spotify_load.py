@@ -0,0 +1,126 @@
+"""
+Нагрузочный тест асинхронного клиента Spotify.
+
+Имитирует пользователей, которые ищут треки, открывают их по ссылкам и
+смотрят альбомы, и выводит пропускную способность и перцентили задержек.
+Рассчитан на работу с benchmarks.fake_spotify_server.
+
+Запуск из корня проекта:
+    python -m benchmarks.spotify_load --api-url http://127.0.0.1:8080/v1 --users 200 --duration 30
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+
+from benchmarks.fake_spotify_server import spotify_id
+from errors import RemoteError
+from services.db import SpotifyEntitiesRepository, SQLiteQuerySender
+from services.spotify import AsyncSpotifyClient
+from services.spotify_cache import SpotifyEntityCache
+
+POPULAR_QUERIES = [f"popular song {index}" for index in range(50)]
+
+
+def percentile(values: list[float], value: float) -> float:
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+
+    index = min(int(len(values) * value), len(values) - 1)
+
+    return values[index]
+
+
+async def user_session(client: AsyncSpotifyClient, deadline: float, latencies: dict[str, list[float]], errors: dict[str, int]):
+    while time.monotonic() < deadline:
+        scenario = random.choice(("search", "track", "album"))
+
+        started_at = time.monotonic()
+
+        try:
+            if scenario == "search":
+                await client.search_track(random.choice(POPULAR_QUERIES), limit=1)
+            elif scenario == "track":
+                await client.search_track_by_id(spotify_id(f"track:{random.randint(0, 500)}"))
+            else:
+                album_id = spotify_id(f"album:{random.randint(0, 200)}")
+
+                await asyncio.gather(
+                    client.search_album_by_id(album_id),
+                    client.get_tracks_by_album_id(album_id)
+                )
+        except RemoteError:
+            errors[scenario] += 1
+        else:
+            latencies[scenario].append(time.monotonic() - started_at)
+
+
+async def run(api_url: str, auth_url: str, users: int, duration: float, db_path: str):
+    # Отдельный файл кеша, чтобы не смешивать синтетические данные с данными бота
+    entities_repository = SpotifyEntitiesRepository(SQLiteQuerySender(db_path))
+    entities_repository.create_table()
+
+    client = AsyncSpotifyClient(
+        client_id="load",
+        client_secret="load",
+        auth_url=auth_url,
+        api_url=api_url,
+        entity_cache=SpotifyEntityCache(entities_repository, parse=AsyncSpotifyClient._parse_cached)
+    )
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+
+    started_at = time.monotonic()
+
+    try:
+        await asyncio.gather(*(
+            user_session(client, started_at + duration, latencies, errors)
+            for _ in range(users)
+        ))
+    finally:
+        await client.close()
+
+    elapsed = time.monotonic() - started_at
+
+    total = sum(len(values) for values in latencies.values())
+
+    print(f"Пользователей: {users}, длительность: {elapsed:.1f} сек., успешных операций: {total} ({total / elapsed:.1f}/сек.)")
+
+    for scenario in sorted(set(latencies) | set(errors)):
+        values = latencies[scenario]
+
+        print(
+            f"  {scenario:<8} n={len(values):<7} ошибок={errors[scenario]:<5}"
+            f" p50={percentile(values, 0.50) * 1000:7.1f} мс"
+            f" p95={percentile(values, 0.95) * 1000:7.1f} мс"
+            f" p99={percentile(values, 0.99) * 1000:7.1f} мс"
+            f" среднее={(statistics.fmean(values) if values else 0) * 1000:7.1f} мс"
+        )
+
+    print(f"  соединения: {client.connection_stats}")
+    print(f"  кеш поиска: {client.search_cache.stats}")
+    print(f"  планировщик: {client.scheduler.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест клиента Spotify")
+
+    parser.add_argument("--api-url", default="http://127.0.0.1:8080/v1")
+    parser.add_argument("--auth-url", default="http://127.0.0.1:8080/api/token")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--db-path", default="./storage/temp/load_cache.sqlite", help="Файл SQLite для кеша сущностей")
+
+    args = parser.parse_args()
+
+    asyncio.run(run(args.api_url, args.auth_url, args.users, args.duration, args.db_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Сравнение прежних (жадных) моделей Spotify с компактными ленивыми моделями.
+
+Запуск из корня проекта:
+    python -m benchmarks.spotify_models
+"""
+
+import timeit
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Union
+
+from config import EMPTY_CONTENT_TEXT, EMPTY_CONTENT_URL, EMPTY_CONTENT_ID
+from services.spotify_models import SpotifyTrack
+
+PAGE_SIZE = 50
+
+
+@dataclass
+class EagerImage:
+    height: Union[int, str] = 0
+    width: Union[int, str] = 0
+    url: str = EMPTY_CONTENT_URL
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "EagerImage":
+        return cls(
+            height=data.get("height", 0),
+            width=data.get("width", 0),
+            url=data.get("url", EMPTY_CONTENT_URL)
+        )
+
+
+@dataclass
+class EagerArtist:
+    url: str = EMPTY_CONTENT_URL
+    id: str = EMPTY_CONTENT_ID
+    name: str = EMPTY_CONTENT_TEXT
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "EagerArtist":
+        return cls(
+            url=data.get("url", EMPTY_CONTENT_URL),
+            id=data.get("id", EMPTY_CONTENT_ID),
+            name=data.get("name", EMPTY_CONTENT_TEXT)
+        )
+
+
+@dataclass
+class EagerAlbum:
+    album_type: str = EMPTY_CONTENT_TEXT
+    artists: list[EagerArtist] = field(default_factory=list)
+    url: str = EMPTY_CONTENT_URL
+    id: str = EMPTY_CONTENT_ID
+    images: list[EagerImage] = field(default_factory=list)
+    is_playable: bool = False
+    name: str = EMPTY_CONTENT_TEXT
+    release_date: str = EMPTY_CONTENT_TEXT
+    total_tracks: Union[int, str] = 0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "EagerAlbum":
+        return cls(
+            album_type=data.get("album_type", EMPTY_CONTENT_TEXT),
+            artists=[EagerArtist.from_dict(artist) for artist in data.get("artists", [])],
+            url=data.get("external_urls", {}).get("spotify", EMPTY_CONTENT_URL),
+            id=data.get("id", EMPTY_CONTENT_ID),
+            images=[EagerImage.from_dict(image) for image in data.get("images", [])],
+            is_playable=data.get("is_playable", False),
+            name=data.get("name", EMPTY_CONTENT_TEXT),
+            release_date=data.get("release_date", EMPTY_CONTENT_TEXT),
+            total_tracks=data.get("total_tracks", EMPTY_CONTENT_TEXT)
+        )
+
+
+@dataclass
+class EagerTrack:
+    id: str = EMPTY_CONTENT_ID
+    name: str = EMPTY_CONTENT_TEXT
+    artists: list[EagerArtist] = field(default_factory=list)
+    album: EagerAlbum = field(default_factory=EagerAlbum)
+    duration_ms: Union[int, str] = 0
+    url: str = EMPTY_CONTENT_URL
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "EagerTrack":
+        return cls(
+            id=data.get("id", EMPTY_CONTENT_ID),
+            name=data.get("name", EMPTY_CONTENT_TEXT),
+            artists=[EagerArtist.from_dict(artist) for artist in data.get("artists", [])],
+            album=EagerAlbum.from_dict(data.get("album", {})),
+            duration_ms=data.get("duration_ms", 0),
+            url=data.get("external_urls", {}).get("spotify", EMPTY_CONTENT_URL)
+        )
+
+
+def artist_payload(index: int) -> dict[str, Any]:
+    return {
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{index:022d}"},
+        "href": f"https://api.spotify.com/v1/artists/{index:022d}",
+        "id": f"{index:022d}",
+        "name": f"Artist {index}",
+        "type": "artist",
+        "uri": f"spotify:artist:{index:022d}"
+    }
+
+
+def album_payload(index: int) -> dict[str, Any]:
+    return {
+        "album_type": "album",
+        "artists": [artist_payload(index)],
+        "available_markets": ["DE", "FR", "GB", "US", "RU"] * 30,
+        "external_urls": {"spotify": f"https://open.spotify.com/album/{index:022d}"},
+        "href": f"https://api.spotify.com/v1/albums/{index:022d}",
+        "id": f"{index:022d}",
+        "images": [
+            {"height": size, "width": size, "url": f"https://i.scdn.co/image/{index:040d}{size}"}
+            for size in (640, 300, 64)
+        ],
+        "name": f"Album {index}",
+        "release_date": "2024-01-01",
+        "release_date_precision": "day",
+        "total_tracks": 12,
+        "type": "album",
+        "uri": f"spotify:album:{index:022d}"
+    }
+
+
+def track_payload(index: int, with_album: bool) -> dict[str, Any]:
+    data = {
+        "artists": [artist_payload(index), artist_payload(index + 1)],
+        "available_markets": ["DE", "FR", "GB", "US", "RU"] * 30,
+        "disc_number": 1,
+        "duration_ms": 180_000 + index,
+        "explicit": False,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{index:022d}"},
+        "href": f"https://api.spotify.com/v1/tracks/{index:022d}",
+        "id": f"{index:022d}",
+        "is_local": False,
+        "name": f"Track {index}",
+        "preview_url": None,
+        "track_number": index % 12 + 1,
+        "type": "track",
+        "uri": f"spotify:track:{index:022d}"
+    }
+
+    if with_album:
+        data["album"] = album_payload(index)
+
+    return data
+
+
+def render(tracks: list) -> None:
+    # То, что бот использует при выводе списка треков альбома
+    for track in tracks:
+        _ = track.id, track.name, [artist.name for artist in track.artists]
+
+
+def measure(name: str, items: list[dict[str, Any]], model: Callable, repeat: int = 200) -> tuple[float, int]:
+    def parse_and_render():
+        render([model(item) for item in items])
+
+    seconds = min(timeit.repeat(parse_and_render, number=repeat, repeat=3)) / repeat
+
+    tracemalloc.start()
+
+    snapshot_before = tracemalloc.take_snapshot()
+
+    kept = [model(item) for item in items]
+
+    render(kept)
+
+    snapshot_after = tracemalloc.take_snapshot()
+
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, "filename"))
+
+    print(f"{name:<40} {seconds * 1_000_000:>10.1f} мкс {allocated / 1024:>10.1f} КиБ")
+
+    return seconds, allocated
+
+
+def compare(title: str, items: list[dict[str, Any]]):
+    print(f"\n{title} ({len(items)} элементов)")
+
+    eager_time, eager_memory = measure("  жадные dataclass", items, EagerTrack.from_dict)
+    lazy_time, lazy_memory = measure("  ленивые модели со __slots__", items, SpotifyTrack.from_dict)
+
+    print(f"  ускорение разбора: x{eager_time / lazy_time:.1f}, экономия памяти: {1 - lazy_memory / max(eager_memory, 1):.0%}")
+
+
+def main(page_size: Optional[int] = None):
+    page_size = page_size or PAGE_SIZE
+
+    compare("Треки альбома (/albums/{id}/tracks)", [track_payload(index, with_album=False) for index in range(page_size)])
+    compare("Страница поиска (/search?type=track)", [track_payload(index, with_album=True) for index in range(page_size)])
+
+
+if __name__ == "__main__":
+    main()
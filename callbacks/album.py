@@ -2,9 +2,10 @@ from enum import StrEnum
 
 from aiogram.filters.callback_data import CallbackData
 
-class SpotifyTrackCBActions(StrEnum):
+class SpotifyAlbumCBActions(StrEnum):
     DOWNLOAD = "download"
 
 
-class SpotifyTrackCB(CallbackData, prefix="spotify_album"):
-    action: SpotifyTrackCBActions
+class SpotifyAlbumCB(CallbackData, prefix="spotify_album"):
+    action: SpotifyAlbumCBActions
+    album_id: str
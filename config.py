@@ -3,6 +3,8 @@ from dataclasses import dataclass
 
 from dotenv import load_dotenv
 
+from enums.transcode_profile import TranscodeProfile
+
 load_dotenv()
 
 
@@ -15,19 +17,35 @@ class Config:
     SPOTIFY_CLIENT_ID: str = os.getenv("SPOTIFY_CLIENT_ID")
     SPOTIFY_CLIENT_SECRET: str = os.getenv("SPOTIFY_CLIENT_SECRET")
 
+    SPOTIFY_AUTH_URL: str = os.getenv("SPOTIFY_AUTH_URL", "https://accounts.spotify.com/api/token")
+    SPOTIFY_API_URL: str = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com/v1")
+
+    SPOTIFY_PREFETCH_ALBUMS: bool = os.getenv("SPOTIFY_PREFETCH_ALBUMS", "").lower() in ("1", "true", "yes")
+
+    SPOTDL_WORKER_POOL_ENABLED: bool = os.getenv("SPOTDL_WORKER_POOL_ENABLED", "1").lower() in ("1", "true", "yes")
+
 
 config = Config()
 
 SPOTIFY_TRACK_URL_REGEX = r"https?://open\.spotify\.com/track/"
+SPOTIFY_TRACK_ID_REGEX = r"https?://open\.spotify\.com/track/([A-Za-z0-9]+)"
+SPOTIFY_ID_REGEX = r"^[0-9A-Za-z]{22}$"
 URL_QUOTE_REGEX = r"%[0-9A-Fa-f]{2}"
+MARKDOWN_LINK_REGEX = r"\[([^\]]*)\]\([^)]*\)"
 
 EMPTY_CONTENT_TEXT = "Неизвестно"
 EMPTY_CONTENT_ID = "0"
 EMPTY_CONTENT_URL = "https://t.me/TrackStarInfo_bot"
 
+# Лимиты Telegram на длину текста после разбора разметки (в единицах UTF-16)
+TELEGRAM_MESSAGE_TEXT_MAX_LENGTH = 4096
+TELEGRAM_CAPTION_MAX_LENGTH = 1024
+
 HANDLER_ERROR_MESSAGE_TEXT = "Произошла ошибка, попробуйте позже..."
 HANDLER_ERROR_LOGGER_TEXT = "Ошибка в обработчике:"
 
+DEADLINE_EXCEEDED_MESSAGE_TEXT = "Запрос выполнялся слишком долго, попробуйте позже..."
+
 STORAGE_DIR_PATH = "./storage/"
 
 DATA_DIR_PATH = STORAGE_DIR_PATH + "data/"
@@ -36,16 +54,133 @@ TEMP_DIR_PATH = STORAGE_DIR_PATH + "temp/"
 
 DOWNLOADS_DIR_PATH = TEMP_DIR_PATH + "downloads/"
 
+DOWNLOAD_JOBS_DIR_PATH = DOWNLOADS_DIR_PATH + "jobs/"
+
+DOWNLOAD_RESULTS_DIR_PATH = DOWNLOADS_DIR_PATH + "results/"
+
 LOGS_DIR_PATH = DATA_DIR_PATH + "logs/"
 
 LOGS_FILE_PATH = LOGS_DIR_PATH + "logs.log"
 
+# Логгеры проекта пишут статистику и предупреждения (INFO), сторонние библиотеки - только ошибки
+LOGS_PROJECT_LOGGER_NAMES = ("__main__", "handlers", "middlewares", "services", "utils")
+
 DB_DIR_PATH = DATA_DIR_PATH + "db/"
 
 DB_FILE_PATH = DB_DIR_PATH + "db.sqlite"
 
+CACHE_DB_FILE_PATH = DB_DIR_PATH + "cache.sqlite"
+
+AUDIO_CACHE_DIR_PATH = DATA_DIR_PATH + "audio/"
+
+HTTP_POOL_MAXSIZE = 10
+
+HTTP_SESSION_IDLE_TIMEOUT = 60
+
+HTTP_DEFAULT_RETRY_AFTER = 1.0
+
+HTTP_REQUEST_TIMEOUT = 15
+
+SPOTIFY_TOKEN_REFRESH_MARGIN = 300
+
+SPOTIFY_TOKEN_REFRESH_RETRY_DELAY = 5
+
+SPOTIFY_SEARCH_CACHE_MAX_ENTRIES = 10_000
+
+SPOTIFY_SEARCH_CACHE_TTL = 60 * 60
+
+SPOTIFY_SEARCH_CACHE_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+
+SPOTIFY_ENTITY_CACHE_MAX_ENTRIES = 50_000
+
+SPOTIFY_ENTITY_CACHE_TTL = 24 * 60 * 60
+
+SPOTIFY_ENTITY_CACHE_MAX_STALE = 7 * 24 * 60 * 60
+
+SPOTIFY_ENTITY_CACHE_MAX_MEMORY_BYTES = 128 * 1024 * 1024
+
+SPOTIFY_BATCH_WINDOW = 0.01
+
+SPOTIFY_BATCH_MAX_TRACKS = 50
+
+SPOTIFY_BATCH_MAX_ALBUMS = 20
+
+SPOTIFY_ALBUM_TRACKS_PAGE_LIMIT = 50
+
+SPOTIFY_ALBUM_TRACKS_MAX_CONCURRENCY = 4
+
+SPOTIFY_RATE_LIMIT_PER_SECOND = 10.0
+
+SPOTIFY_RATE_LIMIT_BURST = 20
+
+SPOTIFY_MAX_CONCURRENCY = 16
+
+SPOTIFY_MIN_CONCURRENCY = 1
+
+SPOTIFY_RATE_LIMIT_MAX_RETRIES = 3
+
+SPOTIFY_REQUEST_TIMEOUT = 5
+
+SPOTIFY_CIRCUIT_FAILURE_THRESHOLD = 5
+
+SPOTIFY_CIRCUIT_RECOVERY_TIMEOUT = 30
+
+SPOTIFY_HEDGE_PERCENTILE = 0.95
+
+SPOTIFY_HEDGE_MIN_SAMPLES = 20
+
+SPOTIFY_HEDGE_MIN_DELAY = 0.05
+
+SPOTIFY_LATENCY_WINDOW = 200
+
+SPOTIFY_PREFETCH_MAX_CONCURRENT = 8
+
+SPOTIFY_PREFETCH_MAX_ENTRIES = 10_000
+
+UPDATE_DEADLINE = 30
+
+SPOTDL_TIMEOUT = 250
+
+SPOTDL_KILL_TIMEOUT = 5
+
+SPOTDL_OUTPUT_TAIL_LINES = 50
+
+SPOTDL_WORKER_MAX_JOBS = 50
+
+SPOTDL_WORKER_START_TIMEOUT = 60
+
+SPOTDL_WORKER_RESTART_DELAY = 5
+
+SPOTDL_WORKER_HEALTHCHECK_INTERVAL = 30
+
+SPOTDL_WORKER_PING_TIMEOUT = 5
+
+DB_BUSY_TIMEOUT = 5
+
+DOWNLOAD_MAX_WORKERS = 4
+
+DOWNLOAD_JOB_MAX_ATTEMPTS = 3
+
+DOWNLOAD_PROGRESS_EDIT_INTERVAL = 3
+
+ALBUM_DOWNLOAD_MAX_PARALLEL = 2
+
+TELEGRAM_RETRY_AFTER_MAX_ATTEMPTS = 3
+
+AUDIO_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+TRANSCODE_MAX_WORKERS = 2
+
+TRANSCODE_TIMEOUT = 120
+
 SETTINGS_PARAM_VALUE_TRUE_FALSE_TEXT_DICT = {
     True: "✅",
     False: "❌",
     None: "?"
 }
+
+SETTINGS_TRANSCODE_PROFILE_TEXT_DICT = {
+    TranscodeProfile.ORIGINAL: "Исходный (MP3)",
+    TranscodeProfile.MP3_128: "MP3 128 кбит/с",
+    TranscodeProfile.OPUS_96: "Opus 96 кбит/с"
+}
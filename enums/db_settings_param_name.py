@@ -7,3 +7,4 @@ class DBParamName(StrEnum):
 
 class DBSettingsParamName(StrEnum):
     SEND_INFORMATION_IMAGE = "send_information_image"
+    TRANSCODE_PROFILE = "transcode_profile"
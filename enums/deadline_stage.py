@@ -0,0 +1,8 @@
+from enum import StrEnum
+
+
+class DeadlineStage(StrEnum):
+    HANDLER = "handler"
+    SPOTIFY = "spotify"
+    DATABASE = "database"
+    DOWNLOAD = "download"
@@ -0,0 +1,6 @@
+from enum import IntEnum
+
+
+class RequestPriority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
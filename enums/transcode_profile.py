@@ -0,0 +1,7 @@
+from enum import StrEnum
+
+
+class TranscodeProfile(StrEnum):
+    ORIGINAL = "original"
+    MP3_128 = "mp3_128"
+    OPUS_96 = "opus_96"
@@ -1,5 +1,7 @@
 from pathlib import Path
 from typing import Union, Optional
+
+import aiohttp
 import requests
 
 
@@ -33,6 +35,33 @@ class DownloadedFilesNotFoundError(DownloadsError):
         super().__init__(f"Скачанные файлы не найдены: {file_paths_str}.")
 
 
+class SpotdlWorkerError(DownloadsError):
+    """Процесс-обработчик скачиваний недоступен."""
+
+    def __init__(self, exception_text: str):
+        super().__init__(f"Процесс-обработчик скачиваний недоступен.\nТекст ошибки: {exception_text}")
+
+
+class TranscodeError(DownloadsError):
+    """Ошибка перекодирования."""
+
+    def __init__(self, file_path: Union[str, Path], exception_text: str):
+        super().__init__(f"Ошибка при перекодировании файла: {file_path}.\nТекст ошибки: {exception_text}")
+
+
+class DeadlineExceededError(Exception):
+    """Исчерпан бюджет времени на обработку обновления."""
+
+    def __init__(self, stage: str, budget: float, stages: Optional[dict[str, float]] = None):
+        self.stage = stage
+        self.budget = budget
+        self.stages = stages or {}
+
+        stages_str = ", ".join(f"{name}: {seconds:.2f} сек." for name, seconds in self.stages.items())
+
+        super().__init__(f"Исчерпан бюджет времени ({budget:g} сек.) на этапе: {stage}.{f'\nЗатрачено по этапам: {stages_str}' if stages_str else ''}")
+
+
 class RemoteError(Exception):
     """Базовые исключения, связанные с удалёнными запросами."""
 
@@ -56,8 +85,32 @@ class RemoteConnectionError(RemoteError):
 class RemoteHTTPError(RemoteError):
     """Ошибка HTTP-запроса."""
 
-    def __init__(self, exception: requests.exceptions.HTTPError):
-        super().__init__(f"Ошибка HTTP-запроса.\nКод ошибки: {getattr(exception.response, "status_code")}.\nТекст ошибки: {str(exception)}")
+    def __init__(self, exception: Union[requests.exceptions.HTTPError, aiohttp.ClientResponseError]):
+        if isinstance(exception, aiohttp.ClientResponseError):
+            self.status_code: Optional[int] = exception.status
+        else:
+            self.status_code: Optional[int] = getattr(exception.response, "status_code", None)
+
+        super().__init__(f"Ошибка HTTP-запроса.\nКод ошибки: {self.status_code}.\nТекст ошибки: {str(exception)}")
+
+
+class RemoteRateLimitError(RemoteHTTPError):
+    """Превышен лимит запросов (HTTP 429)."""
+
+    def __init__(self, exception: Union[requests.exceptions.HTTPError, aiohttp.ClientResponseError], retry_after: float):
+        self.retry_after = retry_after
+
+        super().__init__(exception)
+
+
+class RemoteCircuitOpenError(RemoteError):
+    """Эндпоинт временно отключён после серии ошибок."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+        super().__init__(f"Сервис временно недоступен: {endpoint}.\nПовторная попытка через {retry_in:.0f} сек.")
 
 
 class RemoteRequestException(RemoteError):
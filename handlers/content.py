@@ -1,24 +1,29 @@
 import asyncio
-import shutil
-import subprocess
-from pathlib import Path
 from typing import Callable, Optional
 
 from aiogram import Router, F
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
-from aiogram.types import Message, BufferedInputFile, CallbackQuery
+from aiogram.types import Message, CallbackQuery
 
+from callbacks.album import SpotifyAlbumCB, SpotifyAlbumCBActions
 from callbacks.track import SpotifyTrackCB, SpotifyTrackCBActions
-from config import DOWNLOADS_DIR_PATH, SPOTIFY_TRACK_URL_REGEX
+from config import SPOTIFY_TRACK_URL_REGEX, TELEGRAM_CAPTION_MAX_LENGTH, TELEGRAM_MESSAGE_TEXT_MAX_LENGTH
 from enums.command_name import CommandName
 from enums.db_settings_param_name import DBSettingsParamName
-from errors import DownloadError, DownloadedFilesNotFoundError
+from enums.deadline_stage import DeadlineStage
+from enums.transcode_profile import TranscodeProfile
 from keyboards.album import spotify_album_kb
 from keyboards.track import spotify_track_kb
+from services.album_download import album_downloader
+from services.audio_cache import audio_cache, audio_cache_key
 from services.db import UserSettingsRepository, db_sender
-from services.spotify import SpotifyTrack, SpotifyAlbum, spotify_client
-from utils.downloads import download_track_spotify, DownloadedTrackFile
+from services.download_queue import download_queue
+from services.spotify import SpotifyTrack, SpotifyAlbum, async_spotify_client
+from services.spotify_prefetch import album_prefetcher
+from services.transcoder import transcoder
+from utils.deadline import deadline_stage
+from utils.urls import extract_spotify_track_id
 from utils.message_text import ContentMessageTextTrack, ContentMessageTextAlbum, MessageTextCommandError, MessageCommandAndArgs
 
 router = Router()
@@ -26,66 +31,109 @@ router = Router()
 
 async def download_spotify_track(
         spotify_url: str,
+        chat_id: int,
         send_audio: Callable,
-        send_text: Callable
+        send_text: Callable,
+        profile: TranscodeProfile = TranscodeProfile.ORIGINAL
     ):
 
+    track_id = extract_spotify_track_id(spotify_url)
+
+    if not track_id:
+        await send_text("Не удалось распознать ссылку на трек")
+
+        return
+
+    cached = await audio_cache.get(audio_cache_key(track_id, profile))
+
+    if cached is not None and await audio_cache.send(cached, send_audio):
+        return
+
     temp_message: Message = await send_text(
         "Скачивание трека"
         "\nЭто может занять некоторое время..."
     )
 
-    download_dir = Path(DOWNLOADS_DIR_PATH)
-    download_dir.mkdir(parents=True, exist_ok=True)
-
-    try:
-        track: DownloadedTrackFile = await asyncio.to_thread(
-            download_track_spotify,
-            url=spotify_url,
-            output_dir=str(download_dir)
-        )
-
-        await send_audio(
-            audio=BufferedInputFile(track.file_bytes, filename=track.filename),
-            title=track.title,
-            performer="Spotify"
-        )
+    # Трек отправит очередь скачиваний; одинаковые запросы объединяются в одну задачу
+    added = await download_queue.submit(
+        track_id,
+        spotify_url,
+        chat_id,
+        status_message_id=temp_message.message_id,
+        profile=profile
+    )
 
+    if not added:
         await temp_message.delete()
-    except subprocess.TimeoutExpired:
-        await send_text("Скачивание заняло слишком много времени")
-    except DownloadError:
-        raise
-    except DownloadedFilesNotFoundError:
-        raise
-    finally:
-        for item in download_dir.iterdir():
-            if item.is_file():
-                item.unlink()
-            else:
-                shutil.rmtree(item)
 
 
 @router.message(F.text.regexp(SPOTIFY_TRACK_URL_REGEX))
-async def download_track_spotify_handler(message: Message, spotify_url: Optional[str] = None):
+async def download_track_spotify_handler(
+        message: Message,
+        spotify_url: Optional[str] = None,
+        user_id: Optional[int] = None
+):
     if not spotify_url:
         spotify_url = message.text.strip()
 
+    user_id = user_id if user_id else message.from_user.id
+
     await download_spotify_track(
         spotify_url=spotify_url,
+        chat_id=message.chat.id,
         send_text=message.answer,
-        send_audio=message.answer_audio
+        send_audio=message.answer_audio,
+        profile=await get_transcode_profile(user_id)
     )
 
 
+async def get_send_information_image(user_id: int) -> bool:
+    db_user_settings_repo = UserSettingsRepository(db_sender)
+
+    async with deadline_stage(DeadlineStage.DATABASE):
+        return await asyncio.to_thread(
+            db_user_settings_repo.get_settings_param_value,
+            user_id,
+            DBSettingsParamName.SEND_INFORMATION_IMAGE
+        )
+
+
+async def get_transcode_profile(user_id: int) -> TranscodeProfile:
+    # Без ffmpeg перекодирование недоступно - отправляется исходный файл
+    if not transcoder.available:
+        return TranscodeProfile.ORIGINAL
+
+    db_user_settings_repo = UserSettingsRepository(db_sender)
+
+    async with deadline_stage(DeadlineStage.DATABASE):
+        profile = await asyncio.to_thread(
+            db_user_settings_repo.get_settings_param_value,
+            user_id,
+            DBSettingsParamName.TRANSCODE_PROFILE
+        )
+
+    try:
+        return TranscodeProfile(profile)
+    except ValueError:
+        return TranscodeProfile.ORIGINAL
+
+
 async def search_track_handler(message: Message, query: Optional[str] = None, track_id: Optional[str] = None):
     if track_id:
-        tracks: list[SpotifyTrack] = [spotify_client.search_track_by_id(track_id)]
+        track, send_information_image = await asyncio.gather(
+            async_spotify_client.search_track_by_id(track_id, stale_while_revalidate=True),
+            get_send_information_image(message.from_user.id)
+        )
+
+        tracks: list[SpotifyTrack] = [track]
     else:
         if not query:
             query = message.text
 
-        tracks: list[SpotifyTrack] = spotify_client.search_track(query, limit=1)
+        tracks, send_information_image = await asyncio.gather(
+            async_spotify_client.search_track(query, limit=1),
+            get_send_information_image(message.from_user.id)
+        )
 
     for track in tracks:
         if not track:
@@ -105,13 +153,6 @@ async def search_track_handler(message: Message, query: Optional[str] = None, tr
 
         text = ContentMessageTextTrack(track).text
 
-        db_user_settings_repo = UserSettingsRepository(db_sender)
-
-        send_information_image: bool = db_user_settings_repo.get_settings_param_value(
-            message.from_user.id,
-            DBSettingsParamName.SEND_INFORMATION_IMAGE
-        )
-
         if send_information_image:
             await message.answer_photo(
                 photo=track.image_url,
@@ -124,19 +165,42 @@ async def search_track_handler(message: Message, query: Optional[str] = None, tr
                 reply_markup=spotify_track_kb(track)
             )
 
+        album_prefetcher.schedule(track.album.id)
+
 
 async def search_album_handler(
         message: Message, query: Optional[str] = None,
         album_id: Optional[str] = None,
         user_id: Optional[int] = None
 ):
+    user_id = user_id if user_id else message.from_user.id
+
+    # Метаданные альбома, список треков и настройки пользователя загружаются параллельно,
+    # а текст карточки собирается уже из полученных данных
     if album_id:
-        albums: list[SpotifyAlbum] = [spotify_client.search_album_by_id(album_id)]
+        album, album_tracks, send_information_image = await asyncio.gather(
+            async_spotify_client.search_album_by_id(album_id, stale_while_revalidate=True),
+            async_spotify_client.get_tracks_by_album_id(album_id, stale_while_revalidate=True),
+            get_send_information_image(user_id)
+        )
+
+        albums: list[SpotifyAlbum] = [album]
+        albums_tracks: list[list[SpotifyTrack]] = [album_tracks]
     else:
         if not query:
             query = message.text
 
-        albums: list[SpotifyAlbum] = spotify_client.search_album(query, limit=1)
+        albums, send_information_image = await asyncio.gather(
+            async_spotify_client.search_album(query, limit=1),
+            get_send_information_image(user_id)
+        )
+
+        albums_tracks: list[list[SpotifyTrack]] = await asyncio.gather(*(
+            async_spotify_client.get_tracks_by_album_id(album.id, stale_while_revalidate=True)
+            for album in albums if album
+        ))
+
+    albums_tracks_iter = iter(albums_tracks)
 
     for album in albums:
         if not album:
@@ -154,20 +218,17 @@ async def search_album_handler(
             if index < artists_len - 1:
                 artists_str += "\n"
 
-        text = ContentMessageTextAlbum(album).text
+        text = ContentMessageTextAlbum(
+            album,
+            tracks=next(albums_tracks_iter),
+            max_length=TELEGRAM_CAPTION_MAX_LENGTH if send_information_image else TELEGRAM_MESSAGE_TEXT_MAX_LENGTH
+        ).text
 
         # await message.edit_caption(
         #     caption=text,
         #     reply_markup=spotify_album_kb(album)
         # )
 
-        db_settings_repo = UserSettingsRepository(db_sender)
-
-        send_information_image: bool = db_settings_repo.get_settings_param_value(
-            user_id if user_id else message.from_user.id,
-            DBSettingsParamName.SEND_INFORMATION_IMAGE
-        )
-
         if send_information_image:
             await message.answer_photo(
                 photo=album.image_url,
@@ -212,23 +273,46 @@ async def track_command(message: Message):
         )
 
 
-@router.callback_query(SpotifyTrackCB.filter())
-async def spotify_track_handler(callback: CallbackQuery, callback_data: SpotifyTrackCB):
+@router.callback_query(SpotifyTrackCB.filter(F.action == SpotifyTrackCBActions.ALBUM))
+async def spotify_track_album_handler(callback: CallbackQuery, callback_data: SpotifyTrackCB):
+    album_prefetcher.record_view(callback_data.album_id)
+
+    await search_album_handler(callback.message, user_id=callback.from_user.id, album_id=callback_data.album_id)
+
+    try:
+        await callback.answer()
+    except TelegramBadRequest:
+        pass
+
+
+@router.callback_query(SpotifyTrackCB.filter(F.action == SpotifyTrackCBActions.DOWNLOAD))
+async def spotify_track_download_handler(callback: CallbackQuery, callback_data: SpotifyTrackCB):
     spotify_url = f"https://open.spotify.com/track/{callback_data.track_id}"
 
-    match callback_data.action:
-        case SpotifyTrackCBActions.ALBUM:
-            await search_album_handler(callback.message, user_id=callback.from_user.id, album_id=callback_data.album_id)
-        case SpotifyTrackCBActions.DOWNLOAD:
-            # await download_spotify_track(
-            #     spotify_url=spotify_url,
-            #     send_text=callback.message.answer,
-            #     send_audio=callback.message.answer_audio
-            # )
+    # await download_spotify_track(
+    #     spotify_url=spotify_url,
+    #     send_text=callback.message.answer,
+    #     send_audio=callback.message.answer_audio
+    # )
 
-            await download_track_spotify_handler(callback.message, spotify_url=spotify_url)
+    await download_track_spotify_handler(callback.message, spotify_url=spotify_url, user_id=callback.from_user.id)
 
     try:
         await callback.answer()
     except TelegramBadRequest:
         pass
+
+
+@router.callback_query(SpotifyAlbumCB.filter(F.action == SpotifyAlbumCBActions.DOWNLOAD))
+async def spotify_album_download_handler(callback: CallbackQuery, callback_data: SpotifyAlbumCB):
+    # Альбом скачивается в фоне: треки отправляются по мере готовности
+    started = album_downloader.start(
+        callback_data.album_id,
+        callback.message.chat.id,
+        profile=await get_transcode_profile(callback.from_user.id)
+    )
+
+    try:
+        await callback.answer(None if started else "Альбом уже скачивается")
+    except TelegramBadRequest:
+        pass
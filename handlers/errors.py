@@ -1,13 +1,28 @@
 from aiogram import Router
+from aiogram.filters import ExceptionTypeFilter
 from aiogram.types import ErrorEvent
 import logging
 
-from config import HANDLER_ERROR_MESSAGE_TEXT, HANDLER_ERROR_LOGGER_TEXT
+from config import HANDLER_ERROR_MESSAGE_TEXT, HANDLER_ERROR_LOGGER_TEXT, DEADLINE_EXCEEDED_MESSAGE_TEXT
+from errors import DeadlineExceededError
 
 router = Router()
 
 logger = logging.getLogger(__name__)
 
+@router.errors(ExceptionTypeFilter(DeadlineExceededError))
+async def deadline_exceeded_handler(event: ErrorEvent):
+    message = event.update.message or (event.update.callback_query and event.update.callback_query.message)
+
+    if message:
+        try:
+            await message.answer(DEADLINE_EXCEEDED_MESSAGE_TEXT)
+        except Exception:
+            pass
+
+    logger.warning(str(event.exception))
+
+
 @router.errors()
 async def errors_handler_user(event: ErrorEvent):
     if event.update.message:
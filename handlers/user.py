@@ -9,16 +9,19 @@ import binascii
 
 from callbacks.menu import MenuCB, MenuCBActions
 from callbacks.settings import SettingsCB, SettingsCBActions
-from config import SETTINGS_PARAM_VALUE_TRUE_FALSE_TEXT_DICT
+from config import SETTINGS_PARAM_VALUE_TRUE_FALSE_TEXT_DICT, SETTINGS_TRANSCODE_PROFILE_TEXT_DICT
 from enums.command_name import CommandName
 from enums.payload_command import PayloadCommand
 from enums.db_settings_param_name import DBSettingsParamName
+from enums.transcode_profile import TranscodeProfile
 from handlers.content import search_track_handler, search_album_handler
 from keyboards.main_menu import main_menu_kb, MainMenuButtonName
 from keyboards.menu import menu_kb
 from keyboards.settings import settings_kb
 from services.db import UsersRepository, db_sender, register_user, UserSettingsRepository
+from services.transcoder import transcoder
 from utils.message_text import ContentMessageTextSettings, ContentMessageTextMenu, ContentMessageTextHelp
+from utils.urls import is_spotify_id
 
 router = Router()
 
@@ -54,6 +57,11 @@ async def handle_deep_link(message: Message, command: CommandObject):
         payload_data_len = len(payload_data)
 
         if payload_data_len > 0:
+            if payload_command in (PayloadCommand.TRACK, PayloadCommand.ALBUM) and not is_spotify_id(payload_data[0]):
+                await message.answer("Некорректная ссылка!")
+
+                return
+
             if payload_command == PayloadCommand.TRACK:
                 await search_track_handler(message, track_id=payload_data[0])
 
@@ -115,8 +123,26 @@ async def settings_command(message: Message, user_id: Optional[int] = None, call
 
     send_information_image_text = SETTINGS_PARAM_VALUE_TRUE_FALSE_TEXT_DICT.get(settings.get(DBSettingsParamName.SEND_INFORMATION_IMAGE))
 
+    transcode_profile = settings.get(DBSettingsParamName.TRANSCODE_PROFILE)
+
+    if transcoder.available:
+        transcode_profile_text = SETTINGS_TRANSCODE_PROFILE_TEXT_DICT.get(transcode_profile, "?")
+
+        # Кнопка переключает профили по кругу
+        transcode_profiles = list(TranscodeProfile)
+
+        transcode_profile_new_value = transcode_profiles[
+            (transcode_profiles.index(transcode_profile) + 1) % len(transcode_profiles)
+        ] if transcode_profile in transcode_profiles else TranscodeProfile.ORIGINAL
+    else:
+        # Без ffmpeg треки отправляются в исходном формате, а кнопка скрыта
+        transcode_profile_text = f"{SETTINGS_TRANSCODE_PROFILE_TEXT_DICT.get(TranscodeProfile.ORIGINAL)} (перекодирование недоступно)"
+
+        transcode_profile_new_value = None
+
     settings_str = (
         f"🖼️ *Показывать обложку*: {send_information_image_text}",
+        f"🎧 *Формат аудио*: {transcode_profile_text}"
     )
 
     text = ContentMessageTextSettings(settings_str).text
@@ -126,7 +152,8 @@ async def settings_command(message: Message, user_id: Optional[int] = None, call
             await message.edit_text(
                 text=text,
                 reply_markup=settings_kb(
-                    send_information_image_param_new_value=not send_information_image
+                    send_information_image_param_new_value=not send_information_image,
+                    transcode_profile_param_new_value=transcode_profile_new_value
                 )
             )
         except TelegramBadRequest:
@@ -135,7 +162,8 @@ async def settings_command(message: Message, user_id: Optional[int] = None, call
         await message.answer(
             text=text,
             reply_markup=settings_kb(
-                send_information_image_param_new_value=not send_information_image
+                send_information_image_param_new_value=not send_information_image,
+                transcode_profile_param_new_value=transcode_profile_new_value
             )
         )
 
@@ -1,8 +1,8 @@
 from aiogram.types import InlineKeyboardMarkup, CopyTextButton, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from callbacks.album import SpotifyAlbumCB, SpotifyAlbumCBActions
 from enums.payload_command import PayloadCommand
-# from callbacks.track import SpotifyTrackCB, SpotifyTrackCBActions
 from services.spotify import SpotifyAlbum
 from utils.urls import generate_content_share_url
 
@@ -10,8 +10,6 @@ from utils.urls import generate_content_share_url
 def spotify_album_kb(album: SpotifyAlbum) -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
 
-    # album_id = album.url.rstrip("/").split("/")[-1]
-
     kb.row(
         InlineKeyboardButton(
             text="Открыть в Spotify",
@@ -25,11 +23,11 @@ def spotify_album_kb(album: SpotifyAlbum) -> InlineKeyboardMarkup:
         )
     )
 
-    # kb.row(
-    #     InlineKeyboardButton(
-    #         text="Скачать",
-    #         callback_data=SpotifyTrackCB(action=SpotifyTrackCBActions.DOWNLOAD, track_id=album_id).pack()
-    #     )
-    # )
+    kb.row(
+        InlineKeyboardButton(
+            text="Скачать",
+            callback_data=SpotifyAlbumCB(action=SpotifyAlbumCBActions.DOWNLOAD, album_id=album.id).pack()
+        )
+    )
 
     return kb.as_markup()
\ No newline at end of file
@@ -5,10 +5,12 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from callbacks.settings import SettingsCB, SettingsCBActions
 from enums.db_settings_param_name import DBSettingsParamName
+from enums.transcode_profile import TranscodeProfile
 
 
 def settings_kb(
-        send_information_image_param_new_value: Optional[bool] = None
+        send_information_image_param_new_value: Optional[bool] = None,
+        transcode_profile_param_new_value: Optional[TranscodeProfile] = None
 ) -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
 
@@ -23,6 +25,19 @@ def settings_kb(
         )
     )
 
+    # Без ffmpeg формат не переключается
+    if transcode_profile_param_new_value is not None:
+        kb.row(
+            InlineKeyboardButton(
+                text=f"Формат аудио",
+                callback_data=SettingsCB(
+                    action=SettingsCBActions.UPDATE_SETTING_PARAM_VALUE,
+                    param=DBSettingsParamName.TRANSCODE_PROFILE,
+                    new_param_value=transcode_profile_param_new_value
+                ).pack()
+            )
+        )
+
     kb.row(
         InlineKeyboardButton(
             text="🔁 По умолчанию 🔁",
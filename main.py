@@ -3,14 +3,65 @@ import logging
 from pathlib import Path
 
 from bot import bot, dp
-from config import LOGS_DIR_PATH, LOGS_FILE_PATH
+from config import LOGS_DIR_PATH, LOGS_FILE_PATH, LOGS_PROJECT_LOGGER_NAMES
+from errors import RemoteError
+from middlewares import DeadlineMiddleware
 
 from handlers import (
     errors_router,
     content_router,
     user_router
 )
-from services.db import UserSettingsRepository, db_sender, UsersRepository
+from services.album_download import album_downloader
+from services.audio_cache import audio_cache
+from services.db import UserSettingsRepository, db_sender, UsersRepository, SpotifyEntitiesRepository, AudioCacheRepository, \
+    DownloadJobsRepository, cache_db_sender
+from services.download_engine import download_engine
+from services.download_queue import download_queue
+from services.spotdl_pool import spotdl_worker_pool
+from services.spotify import async_spotify_client
+from services.spotify_prefetch import album_prefetcher
+from services.transcoder import transcoder
+from utils.http_sessions import http_session_pool, log_connection_stats
+
+logger = logging.getLogger(__name__)
+
+async def on_startup():
+    await asyncio.to_thread(download_engine.clear_stale)
+
+    await spotdl_worker_pool.start()
+
+    await download_queue.start()
+
+    try:
+        await async_spotify_client.token_manager.refresh()
+    except RemoteError as ex:
+        logger.warning("Не удалось получить токен Spotify при запуске: %s", ex)
+
+
+async def on_shutdown():
+    await album_downloader.close()
+    await download_queue.close()
+    await spotdl_worker_pool.close()
+    await album_prefetcher.close()
+    await async_spotify_client.close()
+
+    log_connection_stats("Spotify (async)", async_spotify_client.connection_stats)
+    log_connection_stats("HTTP (sync)", http_session_pool.stats)
+
+    logger.info("Кеш поиска Spotify: %s", async_spotify_client.search_cache.stats)
+    logger.info("Кеш сущностей Spotify: %s", async_spotify_client.entity_cache.memory_cache.stats)
+    logger.info("Планировщик запросов Spotify: %s", async_spotify_client.scheduler.stats)
+    logger.info("Эндпоинты Spotify: %s", async_spotify_client.endpoint_guards.stats)
+    logger.info("Предзагрузка альбомов: %s", album_prefetcher.stats)
+    logger.info("Скачивания: %s", download_engine.stats)
+    logger.info("Пул процессов spotdl: %s", spotdl_worker_pool.stats)
+    logger.info("Очередь скачиваний: %s", download_queue.stats)
+    logger.info("Кеш аудио: %s", audio_cache.stats)
+    logger.info("Перекодирование: %s", transcoder.stats)
+    logger.info("Скачивание альбомов: %s", album_downloader.stats)
+
+    http_session_pool.close()
 
 
 async def main():
@@ -20,6 +71,13 @@ async def main():
         user_router
     )
 
+    # Внутренний middleware: бюджет отсчитывается только для обновлений, дошедших до обработчика
+    dp.message.middleware(DeadlineMiddleware())
+    dp.callback_query.middleware(DeadlineMiddleware())
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
     await dp.start_polling(bot)
 
 
@@ -36,7 +94,14 @@ if __name__ == "__main__":
         ]
     )
 
+    # Статистика компонентов выводится с уровнем INFO
+    for logger_name in LOGS_PROJECT_LOGGER_NAMES:
+        logging.getLogger(logger_name).setLevel(logging.INFO)
+
     UsersRepository(db_sender).create_table()
     UserSettingsRepository(db_sender).create_table()
+    DownloadJobsRepository(db_sender).create_table()
+    SpotifyEntitiesRepository(cache_db_sender).create_table()
+    AudioCacheRepository(cache_db_sender).create_table()
 
     asyncio.run(main())
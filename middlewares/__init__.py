@@ -0,0 +1,5 @@
+from .deadline import DeadlineMiddleware
+
+__all__ = [
+    "DeadlineMiddleware"
+]
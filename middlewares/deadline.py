@@ -0,0 +1,28 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from config import UPDATE_DEADLINE
+from utils.deadline import deadline_scope
+
+
+class DeadlineMiddleware(BaseMiddleware):
+    """
+    Задаёт бюджет времени на обработку обновления.
+
+    Запросы к Spotify, БД и скачивание внутри обработчика получают
+    оставшееся время и отменяются по его истечении.
+    """
+
+    def __init__(self, budget: float = UPDATE_DEADLINE):
+        self.__budget = budget
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        async with deadline_scope(self.__budget):
+            return await handler(event, data)
@@ -0,0 +1,244 @@
+import asyncio
+import functools
+import logging
+import time
+from dataclasses import dataclass
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+from bot import bot
+from config import ALBUM_DOWNLOAD_MAX_PARALLEL, DOWNLOAD_PROGRESS_EDIT_INTERVAL
+from enums.request_priority import RequestPriority
+from enums.transcode_profile import TranscodeProfile
+from errors import RemoteError
+from services.audio_cache import AudioCache, audio_cache, audio_cache_key
+from services.download_queue import DownloadQueue, download_queue
+from services.spotify import AsyncSpotifyClient, SpotifyTrack, async_spotify_client
+from utils.deadline import no_deadline
+from utils.telegram import retry_after_flood_control
+
+logger = logging.getLogger(__name__)
+
+ALBUM_DOWNLOAD_STARTED_TEXT = "Скачивание альбома\nЭто может занять некоторое время..."
+ALBUM_DOWNLOAD_PROGRESS_TEXT = "Скачивание альбома: {done} из {total}\nЭто может занять некоторое время..."
+ALBUM_DOWNLOAD_FINISHED_TEXT = "Альбом скачан: {delivered} из {total}"
+ALBUM_DOWNLOAD_FAILED_TEXT = "Не удалось получить треки альбома"
+ALBUM_DOWNLOAD_ERROR_TEXT = "Не удалось скачать альбом"
+
+
+@dataclass
+class AlbumDownloadStats:
+    """Статистика скачивания альбомов."""
+
+    started: int = 0
+    rejected: int = 0
+    completed: int = 0
+    tracks_cached: int = 0
+    tracks_delivered: int = 0
+    tracks_failed: int = 0
+
+
+class AlbumDownloadProgress:
+    """Сообщение о прогрессе скачивания альбома, редактируемое не чаще раза в interval секунд."""
+
+    def __init__(
+            self,
+            telegram_bot: Bot,
+            chat_id: int,
+            message_id: int,
+            total: int,
+            interval: float = DOWNLOAD_PROGRESS_EDIT_INTERVAL
+    ):
+        self.__bot = telegram_bot
+        self.__chat_id = chat_id
+        self.__message_id = message_id
+        self.__interval = interval
+
+        self.total = total
+        self.done = 0
+        self.delivered = 0
+
+        self.__edited_at = 0.0
+
+    async def track_done(self, delivered: bool):
+        self.done += 1
+
+        if delivered:
+            self.delivered += 1
+
+        now = time.monotonic()
+
+        if now - self.__edited_at < self.__interval:
+            return
+
+        self.__edited_at = now
+
+        await self.edit(ALBUM_DOWNLOAD_PROGRESS_TEXT.format(done=self.done, total=self.total))
+
+    async def edit(self, text: str):
+        try:
+            await retry_after_flood_control(
+                lambda: self.__bot.edit_message_text(text, chat_id=self.__chat_id, message_id=self.__message_id)
+            )
+        except TelegramAPIError:
+            pass
+
+
+class AlbumDownloader:
+    """
+    Скачивание альбома целиком.
+
+    Список треков получается один раз, после чего треки ставятся в общую очередь
+    скачиваний с фоновым приоритетом (одиночные треки не ждут альбомы), причём
+    от одного альбома в работе не более max_parallel треков. Каждый трек
+    отправляется, как только готов; треки из кеша отправляются сразу.
+    Прогресс показывается в одном редактируемом сообщении.
+    """
+
+    def __init__(
+            self,
+            client: AsyncSpotifyClient,
+            queue: DownloadQueue,
+            cache: AudioCache,
+            telegram_bot: Bot,
+            max_parallel: int = ALBUM_DOWNLOAD_MAX_PARALLEL
+    ):
+        self.__client = client
+        self.__queue = queue
+        self.__cache = cache
+        self.__bot = telegram_bot
+        self.__max_parallel = max_parallel
+
+        self.__tasks: dict[tuple[str, int], asyncio.Task] = {}
+
+        self.__stats = AlbumDownloadStats()
+
+    @property
+    def stats(self) -> AlbumDownloadStats:
+        return self.__stats
+
+    def start(self, album_id: str, chat_id: int, profile: TranscodeProfile = TranscodeProfile.ORIGINAL) -> bool:
+        """
+        Запускает скачивание альбома в фоне.
+
+        Args:
+            album_id: ID альбома Spotify
+            chat_id: Чат, в который нужно отправить треки
+            profile: Профиль перекодирования треков
+
+        Returns:
+            False, если этот альбом уже скачивается для этого чата
+        """
+
+        key = (album_id, chat_id)
+
+        if key in self.__tasks:
+            self.__stats.rejected += 1
+
+            return False
+
+        self.__stats.started += 1
+
+        # Скачивание альбома дольше бюджета обновления, которое его запустило
+        with no_deadline():
+            self.__tasks[key] = asyncio.create_task(self.__download_album(album_id, chat_id, profile))
+
+        return True
+
+    async def close(self):
+        # Треки, уже поставленные в очередь, будут отправлены и после перезапуска
+        for task in list(self.__tasks.values()):
+            task.cancel()
+
+        await asyncio.gather(*self.__tasks.values(), return_exceptions=True)
+
+    async def __download_album(self, album_id: str, chat_id: int, profile: TranscodeProfile):
+        progress = None
+
+        try:
+            status_message = await retry_after_flood_control(
+                lambda: self.__bot.send_message(chat_id, ALBUM_DOWNLOAD_STARTED_TEXT)
+            )
+
+            # Пока треки не получены, сообщение о прогрессе ничего не считает
+            progress = AlbumDownloadProgress(self.__bot, chat_id, status_message.message_id, total=0)
+
+            try:
+                tracks = await self.__client.get_tracks_by_album_id(album_id, stale_while_revalidate=True)
+            except RemoteError as ex:
+                logger.warning("Не удалось получить треки альбома %s: %s", album_id, ex)
+
+                await progress.edit(ALBUM_DOWNLOAD_FAILED_TEXT)
+
+                return
+
+            progress.total = len(tracks)
+
+            semaphore = asyncio.Semaphore(self.__max_parallel)
+
+            await asyncio.gather(*(
+                self.__download_track(track, chat_id, profile, semaphore, progress)
+                for track in tracks
+            ))
+
+            await progress.edit(ALBUM_DOWNLOAD_FINISHED_TEXT.format(delivered=progress.delivered, total=progress.total))
+
+            self.__stats.completed += 1
+        except TelegramAPIError as ex:
+            logger.warning("Не удалось скачать альбом %s в чат %s: %s", album_id, chat_id, ex)
+        except Exception:
+            logger.exception("Ошибка при скачивании альбома %s в чат %s", album_id, chat_id)
+
+            if progress is not None:
+                await progress.edit(ALBUM_DOWNLOAD_ERROR_TEXT)
+        finally:
+            self.__tasks.pop((album_id, chat_id), None)
+
+    async def __download_track(
+            self,
+            track: SpotifyTrack,
+            chat_id: int,
+            profile: TranscodeProfile,
+            semaphore: asyncio.Semaphore,
+            progress: AlbumDownloadProgress
+    ):
+        # Семафор справедлив (FIFO), поэтому треки берутся в работу в порядке альбома
+        async with semaphore:
+            delivered = await self.__send_cached(track, chat_id, profile)
+
+            if delivered:
+                self.__stats.tracks_cached += 1
+            else:
+                delivered = await self.__queue.download(
+                    track.id,
+                    f"https://open.spotify.com/track/{track.id}",
+                    chat_id,
+                    priority=RequestPriority.BACKGROUND,
+                    profile=profile
+                )
+
+        if delivered:
+            self.__stats.tracks_delivered += 1
+        else:
+            self.__stats.tracks_failed += 1
+
+        await progress.track_done(delivered)
+
+    async def __send_cached(self, track: SpotifyTrack, chat_id: int, profile: TranscodeProfile) -> bool:
+        cached = await self.__cache.get(audio_cache_key(track.id, profile))
+
+        if cached is None:
+            return False
+
+        try:
+            return await retry_after_flood_control(
+                lambda: self.__cache.send(cached, functools.partial(self.__bot.send_audio, chat_id))
+            )
+        except TelegramAPIError as ex:
+            logger.warning("Не удалось отправить трек %s из кеша в чат %s: %s", track.id, chat_id, ex)
+
+            return False
+
+
+album_downloader = AlbumDownloader(async_spotify_client, download_queue, audio_cache, bot)
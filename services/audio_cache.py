@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from config import AUDIO_CACHE_DIR_PATH, AUDIO_CACHE_MAX_BYTES
+from enums.deadline_stage import DeadlineStage
+from enums.transcode_profile import TranscodeProfile
+from services.db import AudioCacheRepository, cache_db_sender
+from utils.deadline import deadline_stage
+from utils.downloads import DownloadedTrackFile
+
+logger = logging.getLogger(__name__)
+
+
+def audio_cache_key(track_id: str, profile: TranscodeProfile = TranscodeProfile.ORIGINAL) -> str:
+    """Ключ кеша аудио: исходный трек хранится под ID трека, перекодированные - под ID трека и профилем."""
+
+    if profile == TranscodeProfile.ORIGINAL:
+        return track_id
+
+    return f"{track_id}-{profile}"
+
+
+def sent_audio_file_id(message: Message) -> Optional[str]:
+    """
+    file_id отправленного аудио. Telegram может прислать файл не как audio, а как
+    document (например, Opus в контейнере OGG) или voice.
+    """
+
+    media = message.audio or message.document or message.voice
+
+    return media.file_id if media else None
+
+
+@dataclass
+class CachedAudio:
+    """Запись кеша аудио: file_id в Telegram и (если ещё не вытеснен) файл на диске."""
+
+    track_id: str
+    file_id: Optional[str]
+    path: Optional[Path]
+    filename: str
+    title: str
+
+
+@dataclass
+class AudioCacheStats:
+    """Статистика кеша аудио."""
+
+    hits: int = 0
+    misses: int = 0
+    stored: int = 0
+    evicted: int = 0
+    evicted_bytes: int = 0
+
+
+class AudioCache:
+    """
+    Кеш скачанных треков по ID трека Spotify (и профилю перекодирования, см. audio_cache_key).
+
+    Хранит file_id, полученный от Telegram после первой отправки, чтобы повторно
+    отправлять трек без скачивания и загрузки. Сами файлы хранятся на диске в
+    пределах max_bytes: при превышении удаляются давно не использованные файлы,
+    а их file_id остаются в кеше. Файлы, которые сейчас отправляются или
+    перекодируются (см. pin), не вытесняются.
+    """
+
+    def __init__(
+            self,
+            repository: AudioCacheRepository,
+            files_dir: str = AUDIO_CACHE_DIR_PATH,
+            max_bytes: int = AUDIO_CACHE_MAX_BYTES
+    ):
+        self.__repository = repository
+        self.__files_dir = Path(files_dir)
+        self.__max_bytes = max_bytes
+
+        self.__evict_lock = asyncio.Lock()
+
+        # Закреплённые файлы кеша: путь -> количество пользователей
+        self.__pinned: dict[str, int] = {}
+
+        self.__stats = AudioCacheStats()
+
+    @property
+    def stats(self) -> AudioCacheStats:
+        return self.__stats
+
+    async def get(self, track_id: str) -> Optional[CachedAudio]:
+        async with deadline_stage(DeadlineStage.DATABASE):
+            row = await asyncio.to_thread(self.__repository.get_audio, track_id)
+
+            if not row or not (row["file_id"] or row["path"]):
+                self.__stats.misses += 1
+
+                return None
+
+            self.__stats.hits += 1
+
+            await asyncio.to_thread(self.__repository.touch_audio, track_id, time.time())
+
+        path = Path(row["path"]) if row["path"] else None
+
+        return CachedAudio(
+            track_id=track_id,
+            file_id=row["file_id"],
+            path=path,
+            filename=row["filename"],
+            title=row["title"]
+        )
+
+    async def store(self, track_id: str, track: DownloadedTrackFile, file_id: Optional[str]):
+        """
+        Забирает скачанный файл в кеш и запоминает его file_id.
+
+        Args:
+            track_id: Ключ кеша (см. audio_cache_key)
+            track: Скачанный трек (файл переносится в директорию кеша)
+            file_id: file_id отправленного аудио в Telegram
+        """
+
+        path, size = await asyncio.to_thread(self.__move_to_cache, track_id, track.path)
+
+        await asyncio.to_thread(
+            self.__repository.set_audio,
+            track_id,
+            file_id,
+            str(path),
+            track.filename,
+            track.title,
+            size,
+            time.time()
+        )
+
+        self.__stats.stored += 1
+
+        await self.__evict()
+
+    async def send(self, cached: CachedAudio, send_audio: Callable) -> bool:
+        """
+        Отправляет трек из кеша: по file_id, а если он недействителен - файлом с диска.
+
+        Args:
+            cached: Запись кеша
+            send_audio: Функция отправки аудио (Message.answer_audio, Bot.send_audio и т.п.)
+
+        Returns:
+            False, если отправить трек из кеша не удалось и его нужно скачать заново
+        """
+
+        if cached.file_id:
+            try:
+                await send_audio(
+                    audio=cached.file_id,
+                    title=cached.title,
+                    performer="Spotify"
+                )
+
+                return True
+            except TelegramBadRequest:
+                # file_id больше не действителен - отправим файл заново
+                await self.set_file_id(cached.track_id, None)
+
+        if cached.path:
+            # Файл закрепляется до проверки, чтобы его не вытеснили посреди загрузки
+            with self.pin(cached.path):
+                # FSInputFile открывает файл только во время загрузки, поэтому его наличие проверяется заранее
+                if not await asyncio.to_thread(cached.path.is_file):
+                    # Файл удалён в обход кеша, а file_id нет или он недействителен - запись бесполезна
+                    logger.warning("Файл кеша %s не найден, запись %s удалена", cached.path, cached.track_id)
+
+                    await asyncio.to_thread(self.__repository.delete_audio, cached.track_id)
+
+                    return False
+
+                # Файл читается с диска частями во время загрузки, а не целиком в память
+                message: Message = await send_audio(
+                    audio=FSInputFile(cached.path, filename=cached.filename),
+                    title=cached.title,
+                    performer="Spotify"
+                )
+
+            file_id = sent_audio_file_id(message)
+
+            if file_id:
+                await self.set_file_id(cached.track_id, file_id)
+
+            return True
+
+        return False
+
+    @contextmanager
+    def pin(self, path: Path) -> Iterator[None]:
+        """Защищает файл кеша от вытеснения, пока он отправляется или перекодируется."""
+
+        key = str(path)
+
+        self.__pinned[key] = self.__pinned.get(key, 0) + 1
+
+        try:
+            yield
+        finally:
+            self.__pinned[key] -= 1
+
+            if not self.__pinned[key]:
+                del self.__pinned[key]
+
+    async def set_file_id(self, track_id: str, file_id: Optional[str]):
+        await asyncio.to_thread(self.__repository.set_file_id, track_id, file_id)
+
+    async def __evict(self):
+        async with self.__evict_lock:
+            await asyncio.to_thread(self.__evict_sync)
+
+    def __move_to_cache(self, track_id: str, source: Path) -> tuple[Path, int]:
+        self.__files_dir.mkdir(parents=True, exist_ok=True)
+
+        path = self.__files_dir / f"{track_id}{source.suffix}"
+
+        os.replace(source, path)
+
+        return path, path.stat().st_size
+
+    def __evict_sync(self):
+        total_size = self.__repository.get_total_size()
+
+        while total_size > self.__max_bytes:
+            # Закреплённые файлы пропускаются, поэтому выбирается с запасом на них
+            rows = self.__repository.get_least_recently_used_files(limit=16 + len(self.__pinned))
+
+            evicted_before = self.__stats.evicted
+
+            for row in rows:
+                if row["path"] in self.__pinned:
+                    continue
+
+                try:
+                    Path(row["path"]).unlink(missing_ok=True)
+                except OSError as ex:
+                    logger.warning("Не удалось удалить файл кеша %s: %s", row["path"], ex)
+
+                    continue
+
+                self.__repository.clear_path(row["track_id"])
+
+                total_size -= row["size"]
+
+                self.__stats.evicted += 1
+                self.__stats.evicted_bytes += row["size"]
+
+                if total_size <= self.__max_bytes:
+                    break
+
+            # Ни один файл не удалось удалить (или все закреплены) - не крутимся впустую
+            if self.__stats.evicted == evicted_before:
+                break
+
+
+audio_cache = AudioCache(AudioCacheRepository(cache_db_sender))
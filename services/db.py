@@ -4,13 +4,15 @@ from pathlib import Path
 from typing import Any, Optional
 import logging
 
-from config import DB_FILE_PATH
+from config import DB_FILE_PATH, CACHE_DB_FILE_PATH, DB_BUSY_TIMEOUT
 from enums.db_settings_param_name import DBSettingsParamName, DBParamName
+from enums.transcode_profile import TranscodeProfile
 from errors import (
     # DatabaseNotFoundError,
     DatabaseIntegrityError,
     DatabaseQueryError,
 )
+from utils.deadline import remaining_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -32,11 +34,14 @@ class SQLiteQuerySender:
 
         self.__prepare_db_file_path()
 
+        # Ожидание блокировки БД не дольше остатка бюджета обновления
+        timeout = remaining_timeout(DB_BUSY_TIMEOUT)
+
         conn: Optional[sqlite3.Connection] = None
         cursor: Optional[sqlite3.Cursor] = None
 
         try:
-            conn = sqlite3.connect(self.__db_path)
+            conn = sqlite3.connect(self.__db_path, timeout=timeout)
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
@@ -74,6 +79,50 @@ class SQLiteQuerySender:
             if conn is not None:
                 conn.close()
 
+    def execute_transaction(self, queries: list[str]):
+        """
+        Выполняет несколько запросов в одной транзакции: либо все, либо ни одного.
+
+        Args:
+            queries: Запросы без параметров (в том числе DDL)
+        """
+
+        self.__prepare_db_file_path()
+
+        timeout = remaining_timeout(DB_BUSY_TIMEOUT)
+
+        conn: Optional[sqlite3.Connection] = None
+
+        try:
+            # Транзакция управляется явно: иначе sqlite3 фиксирует DDL-запросы по одному
+            conn = sqlite3.connect(self.__db_path, timeout=timeout, isolation_level=None)
+
+            conn.execute("BEGIN")
+
+            try:
+                for query in queries:
+                    conn.execute(query)
+            except BaseException:
+                conn.execute("ROLLBACK")
+
+                raise
+
+            conn.execute("COMMIT")
+
+        except sqlite3.IntegrityError as ex:
+            logger.exception(ex)
+
+            raise DatabaseIntegrityError(str(ex))
+
+        except sqlite3.Error as ex:
+            logger.exception(ex)
+
+            raise DatabaseQueryError(str(ex))
+
+        finally:
+            if conn is not None:
+                conn.close()
+
     def __prepare_db_file_path(self):
         db_path = Path(self.__db_path)
 
@@ -155,7 +204,8 @@ class UserSettingsRepository(BaseRepository):
         query = f"""
             CREATE TABLE IF NOT EXISTS user_settings (
                 {DBParamName.USER_ID} INTEGER PRIMARY KEY,
-                {DBSettingsParamName.SEND_INFORMATION_IMAGE} BOOL NOT NULL DEFAULT TRUE
+                {DBSettingsParamName.SEND_INFORMATION_IMAGE} BOOL NOT NULL DEFAULT TRUE,
+                {DBSettingsParamName.TRANSCODE_PROFILE} TEXT NOT NULL DEFAULT '{TranscodeProfile.ORIGINAL}'
             );
         """
 
@@ -164,9 +214,21 @@ class UserSettingsRepository(BaseRepository):
             commit=True
         )
 
+        columns = self._sender.execute(
+            query="PRAGMA table_info(user_settings)",
+            fetchall=True
+        )
+
+        # Таблицы, созданные до появления перекодирования
+        if DBSettingsParamName.TRANSCODE_PROFILE not in {column["name"] for column in columns}:
+            self._sender.execute(
+                query=f"ALTER TABLE user_settings ADD COLUMN {DBSettingsParamName.TRANSCODE_PROFILE} TEXT NOT NULL DEFAULT '{TranscodeProfile.ORIGINAL}'",
+                commit=True
+            )
+
     def get_settings(self, user_id: int) -> dict:
         query = f"""
-            SELECT {DBSettingsParamName.SEND_INFORMATION_IMAGE}
+            SELECT {DBSettingsParamName.SEND_INFORMATION_IMAGE}, {DBSettingsParamName.TRANSCODE_PROFILE}
             FROM user_settings
             WHERE {DBParamName.USER_ID} = ?
         """
@@ -194,17 +256,19 @@ class UserSettingsRepository(BaseRepository):
         self,
         user_id: int,
         show_information_image: bool = True,
+        transcode_profile: TranscodeProfile = TranscodeProfile.ORIGINAL
     ) -> None:
         query = f"""
-            INSERT INTO user_settings ({DBParamName.USER_ID}, {DBSettingsParamName.SEND_INFORMATION_IMAGE})
-            VALUES (?, ?)
+            INSERT INTO user_settings ({DBParamName.USER_ID}, {DBSettingsParamName.SEND_INFORMATION_IMAGE}, {DBSettingsParamName.TRANSCODE_PROFILE})
+            VALUES (?, ?, ?)
             ON CONFLICT(user_id) DO UPDATE SET
-                {DBSettingsParamName.SEND_INFORMATION_IMAGE} = excluded.{DBSettingsParamName.SEND_INFORMATION_IMAGE}
+                {DBSettingsParamName.SEND_INFORMATION_IMAGE} = excluded.{DBSettingsParamName.SEND_INFORMATION_IMAGE},
+                {DBSettingsParamName.TRANSCODE_PROFILE} = excluded.{DBSettingsParamName.TRANSCODE_PROFILE}
         """
 
         self._sender.execute(
             query=query,
-            params=[user_id, int(show_information_image)],
+            params=[user_id, int(show_information_image), str(transcode_profile)],
             commit=True
         )
 
@@ -236,8 +300,386 @@ class UserSettingsRepository(BaseRepository):
         if set_default:
             self.set_user_default_settings(user_id)
 
+class SpotifyEntitiesRepository(BaseRepository):
+    def __init__(self, sender: SQLiteQuerySender):
+        super().__init__(sender)
+
+    def create_table(self):
+        query = """
+            CREATE TABLE IF NOT EXISTS spotify_entities (
+                content_type TEXT NOT NULL,
+                content_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                etag TEXT,
+                PRIMARY KEY (content_type, content_id)
+            );
+        """
+
+        self._sender.execute(
+            query=query,
+            commit=True
+        )
+
+        columns = self._sender.execute(
+            query="PRAGMA table_info(spotify_entities)",
+            fetchall=True
+        )
+
+        # Таблицы, созданные до появления ETag
+        if "etag" not in {column["name"] for column in columns}:
+            self._sender.execute(
+                query="ALTER TABLE spotify_entities ADD COLUMN etag TEXT",
+                commit=True
+            )
+
+    def get_entity(self, content_type: str, content_id: str) -> dict:
+        query = """
+            SELECT payload, fetched_at, etag
+            FROM spotify_entities
+            WHERE content_type = ? AND content_id = ?
+        """
+
+        return self._sender.execute(
+            query=query,
+            params=[content_type, content_id],
+            fetchone=True
+        )
+
+    def set_entity(self, content_type: str, content_id: str, payload: str, fetched_at: float, etag: Optional[str] = None):
+        query = """
+            INSERT INTO spotify_entities (content_type, content_id, payload, fetched_at, etag)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(content_type, content_id) DO UPDATE SET
+                payload = excluded.payload,
+                fetched_at = excluded.fetched_at,
+                etag = excluded.etag
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[content_type, content_id, payload, fetched_at, etag],
+            commit=True
+        )
+
+    def touch_entity(self, content_type: str, content_id: str, fetched_at: float):
+        query = """
+            UPDATE spotify_entities
+            SET fetched_at = ?
+            WHERE content_type = ? AND content_id = ?
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[fetched_at, content_type, content_id],
+            commit=True
+        )
+
+class AudioCacheRepository(BaseRepository):
+    def __init__(self, sender: SQLiteQuerySender):
+        super().__init__(sender)
+
+    def create_table(self):
+        query = """
+            CREATE TABLE IF NOT EXISTS audio_cache (
+                track_id TEXT NOT NULL PRIMARY KEY,
+                file_id TEXT,
+                path TEXT,
+                filename TEXT NOT NULL,
+                title TEXT NOT NULL,
+                size INTEGER NOT NULL DEFAULT 0,
+                last_used_at REAL NOT NULL
+            );
+        """
+
+        self._sender.execute(
+            query=query,
+            commit=True
+        )
+
+        self._sender.execute(
+            query="CREATE INDEX IF NOT EXISTS audio_cache_last_used_at ON audio_cache (last_used_at)",
+            commit=True
+        )
+
+    def get_audio(self, track_id: str) -> dict:
+        query = """
+            SELECT track_id, file_id, path, filename, title, size
+            FROM audio_cache
+            WHERE track_id = ?
+        """
+
+        return self._sender.execute(
+            query=query,
+            params=[track_id],
+            fetchone=True
+        )
+
+    def set_audio(self, track_id: str, file_id: Optional[str], path: Optional[str], filename: str, title: str, size: int, last_used_at: float):
+        query = """
+            INSERT INTO audio_cache (track_id, file_id, path, filename, title, size, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(track_id) DO UPDATE SET
+                file_id = excluded.file_id,
+                path = excluded.path,
+                filename = excluded.filename,
+                title = excluded.title,
+                size = excluded.size,
+                last_used_at = excluded.last_used_at
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[track_id, file_id, path, filename, title, size, last_used_at],
+            commit=True
+        )
+
+    def set_file_id(self, track_id: str, file_id: Optional[str]):
+        query = """
+            UPDATE audio_cache
+            SET file_id = ?
+            WHERE track_id = ?
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[file_id, track_id],
+            commit=True
+        )
+
+    def touch_audio(self, track_id: str, last_used_at: float):
+        query = """
+            UPDATE audio_cache
+            SET last_used_at = ?
+            WHERE track_id = ?
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[last_used_at, track_id],
+            commit=True
+        )
+
+    def clear_path(self, track_id: str):
+        query = """
+            UPDATE audio_cache
+            SET path = NULL, size = 0
+            WHERE track_id = ?
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[track_id],
+            commit=True
+        )
+
+    def delete_audio(self, track_id: str):
+        query = """
+            DELETE FROM audio_cache
+            WHERE track_id = ?
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[track_id],
+            commit=True
+        )
+
+    def get_total_size(self) -> int:
+        query = """
+            SELECT COALESCE(SUM(size), 0) AS total_size
+            FROM audio_cache
+            WHERE path IS NOT NULL
+        """
+
+        return self._sender.execute(
+            query=query,
+            fetchone=True
+        ).get("total_size", 0)
+
+    def get_least_recently_used_files(self, limit: int) -> list[dict]:
+        query = """
+            SELECT track_id, path, size
+            FROM audio_cache
+            WHERE path IS NOT NULL
+            ORDER BY last_used_at
+            LIMIT ?
+        """
+
+        return self._sender.execute(
+            query=query,
+            params=[limit],
+            fetchall=True
+        )
+
+class DownloadJobsRepository(BaseRepository):
+    def __init__(self, sender: SQLiteQuerySender):
+        super().__init__(sender)
+
+    def create_table(self):
+        query = """
+            CREATE TABLE IF NOT EXISTS download_jobs (
+                track_id TEXT NOT NULL PRIMARY KEY,
+                url TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            );
+        """
+
+        self._sender.execute(
+            query=query,
+            commit=True
+        )
+
+        waiters_table_query = f"""
+            CREATE TABLE IF NOT EXISTS download_waiters (
+                track_id TEXT NOT NULL,
+                chat_id INTEGER NOT NULL,
+                status_message_id INTEGER,
+                profile TEXT NOT NULL DEFAULT '{TranscodeProfile.ORIGINAL}',
+                created_at REAL NOT NULL,
+                PRIMARY KEY (track_id, chat_id, profile)
+            );
+        """
+
+        self._sender.execute(
+            query=waiters_table_query,
+            commit=True
+        )
+
+        columns = self._sender.execute(
+            query="PRAGMA table_info(download_waiters)",
+            fetchall=True
+        )
+
+        # Таблицы, созданные до появления перекодирования (или профиля в первичном ключе):
+        # первичный ключ в SQLite не изменить, поэтому таблица пересоздаётся
+        if "profile" not in {column["name"] for column in columns if column["pk"]}:
+            profile_column = "profile" if "profile" in {column["name"] for column in columns} else f"'{TranscodeProfile.ORIGINAL}'"
+
+            # Одной транзакцией: прерванная миграция не оставляет схему наполовину перестроенной
+            self._sender.execute_transaction([
+                "ALTER TABLE download_waiters RENAME TO download_waiters_old",
+                waiters_table_query,
+                f"""
+                    INSERT OR IGNORE INTO download_waiters (track_id, chat_id, status_message_id, profile, created_at)
+                    SELECT track_id, chat_id, status_message_id, {profile_column}, created_at
+                    FROM download_waiters_old
+                """,
+                "DROP TABLE download_waiters_old"
+            ])
+
+    def add_job(self, track_id: str, url: str, priority: int, created_at: float):
+        # Повторный запрос того же трека может только повысить приоритет задачи
+        query = """
+            INSERT INTO download_jobs (track_id, url, priority, created_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(track_id) DO UPDATE SET
+                priority = MIN(priority, excluded.priority)
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[track_id, url, priority, created_at],
+            commit=True
+        )
+
+    def add_waiter(
+            self,
+            track_id: str,
+            chat_id: int,
+            status_message_id: Optional[int],
+            profile: TranscodeProfile,
+            created_at: float
+    ) -> bool:
+        query = """
+            INSERT OR IGNORE INTO download_waiters (track_id, chat_id, status_message_id, profile, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """
+
+        return self._sender.execute(
+            query=query,
+            params=[track_id, chat_id, status_message_id, str(profile), created_at],
+            commit=True
+        ) > 0
+
+    def get_job(self, track_id: str) -> dict:
+        query = """
+            SELECT track_id, url, priority, attempts
+            FROM download_jobs
+            WHERE track_id = ?
+        """
+
+        return self._sender.execute(
+            query=query,
+            params=[track_id],
+            fetchone=True
+        )
+
+    def get_jobs(self) -> list[dict]:
+        query = """
+            SELECT track_id, url, priority, attempts
+            FROM download_jobs
+            ORDER BY priority, created_at
+        """
+
+        return self._sender.execute(
+            query=query,
+            fetchall=True
+        )
+
+    def increment_attempts(self, track_id: str):
+        query = """
+            UPDATE download_jobs
+            SET attempts = attempts + 1
+            WHERE track_id = ?
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[track_id],
+            commit=True
+        )
+
+    def get_waiters(self, track_id: str) -> list[dict]:
+        query = """
+            SELECT chat_id, status_message_id, profile
+            FROM download_waiters
+            WHERE track_id = ?
+            ORDER BY created_at
+        """
+
+        return self._sender.execute(
+            query=query,
+            params=[track_id],
+            fetchall=True
+        )
+
+    def delete_waiter(self, track_id: str, chat_id: int, profile: str):
+        query = """
+            DELETE FROM download_waiters
+            WHERE track_id = ? AND chat_id = ? AND profile = ?
+        """
+
+        self._sender.execute(
+            query=query,
+            params=[track_id, chat_id, profile],
+            commit=True
+        )
+
+    def delete_job(self, track_id: str):
+        for table in ("download_waiters", "download_jobs"):
+            self._sender.execute(
+                query=f"DELETE FROM {table} WHERE track_id = ?",
+                params=[track_id],
+                commit=True
+            )
+
 db_sender = SQLiteQuerySender(DB_FILE_PATH)
 
+cache_db_sender = SQLiteQuerySender(CACHE_DB_FILE_PATH)
+
 
 def register_user(sender: SQLiteQuerySender, user_id: int):
     UsersRepository(sender).add_user(user_id)
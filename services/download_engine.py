@@ -0,0 +1,175 @@
+import asyncio
+import dataclasses
+import logging
+import os
+import shutil
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+
+from config import DOWNLOAD_JOBS_DIR_PATH, DOWNLOAD_RESULTS_DIR_PATH, DOWNLOAD_MAX_WORKERS
+from enums.deadline_stage import DeadlineStage
+from services.spotdl_pool import SpotdlWorkerPool, spotdl_worker_pool
+from utils.deadline import deadline_stage
+from utils.downloads import download_track_spotify, DownloadedTrackFile, DownloadProgress
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DownloadStats:
+    """Статистика скачиваний."""
+
+    started: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    max_queued: int = 0
+
+
+class DownloadEngine:
+    """
+    Параллельное скачивание треков.
+
+    Каждое скачивание выполняется в собственной временной директории, поэтому
+    одновременные скачивания не видят и не удаляют файлы друг друга. Одновременно
+    выполняется не более max_workers процессов spotdl, остальные ждут своей очереди;
+    пул потоков при этом не занимается. Отмена ожидающего завершает его процесс.
+    Готовый файл атомарно переносится (os.replace) в директорию результатов и
+    принадлежит вызывающему до выхода из блока download().
+
+    Скачивание выполняется пулом долгоживущих процессов spotdl, а пока пул
+    недоступен - отдельным запуском CLI spotdl.
+    """
+
+    def __init__(
+            self,
+            jobs_dir: str = DOWNLOAD_JOBS_DIR_PATH,
+            results_dir: str = DOWNLOAD_RESULTS_DIR_PATH,
+            max_workers: int = DOWNLOAD_MAX_WORKERS,
+            worker_pool: SpotdlWorkerPool = spotdl_worker_pool
+    ):
+        self.__worker_pool = worker_pool
+        self.__jobs_dir = Path(jobs_dir)
+        self.__results_dir = Path(results_dir)
+        self.__semaphore = asyncio.Semaphore(max_workers)
+
+        self.__queued = 0
+
+        self.__stats = DownloadStats()
+
+    @property
+    def stats(self) -> DownloadStats:
+        return self.__stats
+
+    def clear_stale(self):
+        """Удаляет рабочие директории и результаты, оставшиеся после прошлого запуска."""
+
+        for directory in (self.__jobs_dir, self.__results_dir):
+            shutil.rmtree(directory, ignore_errors=True)
+
+            directory.mkdir(parents=True, exist_ok=True)
+
+    @asynccontextmanager
+    async def download(
+            self,
+            url: str,
+            on_progress: Optional[Callable[[DownloadProgress], None]] = None
+    ) -> AsyncIterator[DownloadedTrackFile]:
+        """
+        Скачивает трек и отдаёт его на время выполнения блока.
+
+        Args:
+            url: Ссылка на трек
+            on_progress: Обработчик прогресса скачивания
+
+        Returns:
+            Экземпляр типа DownloadedTrackFile, файл которого удаляется после выхода из блока
+
+        Raises:
+            subprocess.TimeoutExpired: Скачивание не уложилось в отведённое время
+            DownloadError: Ошибка при скачивании
+            DownloadedFilesNotFoundError: Скачанные файлы не найдены
+        """
+
+        async with deadline_stage(DeadlineStage.DOWNLOAD):
+            track = await self.__job(url, uuid.uuid4().hex, on_progress)
+
+        try:
+            yield track
+        finally:
+            self.__discard(track)
+
+    async def __job(
+            self,
+            url: str,
+            job_id: str,
+            on_progress: Optional[Callable[[DownloadProgress], None]]
+    ) -> DownloadedTrackFile:
+        self.__queued += 1
+        self.__stats.max_queued = max(self.__stats.max_queued, self.__queued)
+
+        started = False
+
+        try:
+            async with self.__semaphore:
+                self.__queued -= 1
+
+                started = True
+
+                self.__stats.started += 1
+
+                try:
+                    track = await self.__run_job(url, job_id, on_progress)
+                except asyncio.CancelledError:
+                    self.__stats.cancelled += 1
+
+                    raise
+                except Exception:
+                    self.__stats.failed += 1
+
+                    raise
+
+                self.__stats.completed += 1
+
+                return track
+        finally:
+            if not started:
+                self.__queued -= 1
+
+    async def __run_job(
+            self,
+            url: str,
+            job_id: str,
+            on_progress: Optional[Callable[[DownloadProgress], None]]
+    ) -> DownloadedTrackFile:
+        workspace = self.__jobs_dir / job_id
+
+        try:
+            if self.__worker_pool.available:
+                track = await self.__worker_pool.download(url=url, output_dir=str(workspace), on_progress=on_progress)
+            else:
+                track = await download_track_spotify(url=url, output_dir=str(workspace), on_progress=on_progress)
+
+            self.__results_dir.mkdir(parents=True, exist_ok=True)
+
+            result_path = self.__results_dir / f"{job_id}{track.path.suffix}"
+
+            # Перенос без await: отмена не может оставить файл между директориями
+            os.replace(track.path, result_path)
+
+            return dataclasses.replace(track, path=result_path)
+        finally:
+            await asyncio.to_thread(shutil.rmtree, workspace, ignore_errors=True)
+
+    @staticmethod
+    def __discard(track: DownloadedTrackFile):
+        try:
+            track.path.unlink(missing_ok=True)
+        except OSError as ex:
+            logger.warning("Не удалось удалить файл %s: %s", track.path, ex)
+
+
+download_engine = DownloadEngine()
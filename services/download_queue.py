@@ -0,0 +1,490 @@
+import asyncio
+import functools
+import itertools
+import logging
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from bot import bot
+from config import DOWNLOAD_MAX_WORKERS, DOWNLOAD_JOB_MAX_ATTEMPTS, DOWNLOAD_PROGRESS_EDIT_INTERVAL
+from enums.request_priority import RequestPriority
+from enums.transcode_profile import TranscodeProfile
+from errors import DownloadsError, TranscodeError
+from services.audio_cache import AudioCache, audio_cache, audio_cache_key, sent_audio_file_id
+from services.db import DownloadJobsRepository, db_sender
+from services.download_engine import DownloadEngine, download_engine
+from services.transcoder import Transcoder, transcoder
+from utils.downloads import DownloadedTrackFile, DownloadProgress
+from utils.telegram import retry_after_flood_control
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_FAILED_TEXT = "Не удалось скачать трек"
+DOWNLOAD_TIMEOUT_TEXT = "Скачивание заняло слишком много времени"
+DOWNLOAD_PROGRESS_TEXT = "Скачивание трека: {percent}%\nЭто может занять некоторое время..."
+
+
+@dataclass
+class DownloadQueueStats:
+    """Статистика очереди скачиваний."""
+
+    submitted: int = 0
+    merged: int = 0
+    resumed: int = 0
+    completed: int = 0
+    failed: int = 0
+    delivered: int = 0
+
+
+class DownloadQueue:
+    """
+    Очередь скачиваний с объединением одинаковых треков.
+
+    Задачи и ожидающие их чаты хранятся в SQLite, поэтому переживают перезапуск
+    бота. Повторные запросы того же трека (двойное нажатие, несколько
+    пользователей) присоединяются к уже существующей задаче: трек скачивается и
+    загружается в Telegram один раз, остальным чатам он отправляется по file_id.
+    Задачи выполняются по приоритету: интерактивные раньше фоновых.
+
+    Каждый чат получает трек в своём профиле перекодирования: трек скачивается
+    один раз (или берётся из кеша), а перекодируется один раз на профиль.
+    Если перекодировать не удалось, отправляется исходный файл.
+    """
+
+    def __init__(
+            self,
+            repository: DownloadJobsRepository,
+            telegram_bot: Bot,
+            engine: DownloadEngine,
+            cache: AudioCache,
+            audio_transcoder: Transcoder,
+            workers: int = DOWNLOAD_MAX_WORKERS,
+            max_attempts: int = DOWNLOAD_JOB_MAX_ATTEMPTS
+    ):
+        self.__repository = repository
+        self.__bot = telegram_bot
+        self.__engine = engine
+        self.__cache = cache
+        self.__transcoder = audio_transcoder
+        self.__workers_count = workers
+        self.__max_attempts = max_attempts
+
+        self.__heap: asyncio.PriorityQueue[tuple[int, int, str]] = asyncio.PriorityQueue()
+        self.__sequence = itertools.count()
+
+        # Состояние в памяти: задачи в очереди (с текущим приоритетом) и выполняемые
+        self.__queued: dict[str, int] = {}
+        self.__running: set[str] = set()
+
+        # Согласует добавление ожидающих с завершением задачи, чтобы никто не остался без трека
+        self.__lock = asyncio.Lock()
+
+        self.__workers: list[asyncio.Task] = []
+
+        # Ожидающие отправки трека в чат (см. download()): (ID трека, чат, профиль) -> futures
+        self.__deliveries: dict[tuple[str, int, str], list[asyncio.Future[bool]]] = {}
+
+        self.__progress_edited_at: dict[str, float] = {}
+        self.__progress_tasks: set[asyncio.Task] = set()
+
+        self.__stats = DownloadQueueStats()
+
+    @property
+    def stats(self) -> DownloadQueueStats:
+        return self.__stats
+
+    async def start(self):
+        """Возобновляет сохранённые задачи и запускает обработчики очереди."""
+
+        jobs = await asyncio.to_thread(self.__repository.get_jobs)
+
+        for job in jobs:
+            self.__push(job["track_id"], job["priority"])
+
+        self.__stats.resumed += len(jobs)
+
+        self.__workers = [asyncio.create_task(self.__worker()) for _ in range(self.__workers_count)]
+
+    async def close(self):
+        # Незавершённые задачи остаются в БД и будут возобновлены при следующем запуске
+        for task in (*self.__workers, *self.__progress_tasks):
+            task.cancel()
+
+        await asyncio.gather(*self.__workers, *self.__progress_tasks, return_exceptions=True)
+
+        self.__workers = []
+
+    async def submit(
+            self,
+            track_id: str,
+            url: str,
+            chat_id: int,
+            status_message_id: Optional[int] = None,
+            priority: RequestPriority = RequestPriority.INTERACTIVE,
+            profile: TranscodeProfile = TranscodeProfile.ORIGINAL
+    ) -> bool:
+        """
+        Ставит трек в очередь скачивания для чата.
+
+        Args:
+            track_id: ID трека Spotify
+            url: Ссылка на трек
+            chat_id: Чат, в который нужно отправить трек
+            status_message_id: Сообщение о скачивании, которое удаляется после отправки трека
+            priority: Приоритет задачи
+            profile: Профиль перекодирования трека для этого чата
+
+        Returns:
+            False, если этот чат уже ожидает этот трек в этом профиле
+        """
+
+        now = time.time()
+
+        async with self.__lock:
+            await asyncio.to_thread(self.__repository.add_job, track_id, url, int(priority), now)
+
+            added = await asyncio.to_thread(self.__repository.add_waiter, track_id, chat_id, status_message_id, profile, now)
+
+            if not added:
+                return False
+
+            self.__stats.submitted += 1
+
+            if track_id in self.__running:
+                self.__stats.merged += 1
+            elif track_id in self.__queued:
+                self.__stats.merged += 1
+
+                if priority < self.__queued[track_id]:
+                    self.__push(track_id, int(priority))
+            else:
+                self.__push(track_id, int(priority))
+
+        return True
+
+    async def download(
+            self,
+            track_id: str,
+            url: str,
+            chat_id: int,
+            priority: RequestPriority = RequestPriority.INTERACTIVE,
+            profile: TranscodeProfile = TranscodeProfile.ORIGINAL
+    ) -> bool:
+        """
+        Ставит трек в очередь скачивания для чата и ждёт, пока он будет отправлен.
+
+        Если чат уже ожидает этот трек в этом профиле, ждёт существующую задачу.
+
+        Args:
+            track_id: ID трека Spotify
+            url: Ссылка на трек
+            chat_id: Чат, в который нужно отправить трек
+            priority: Приоритет задачи
+            profile: Профиль перекодирования трека для этого чата
+
+        Returns:
+            True, если трек отправлен в чат
+        """
+
+        key = (track_id, chat_id, str(profile))
+
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+
+        # Регистрируется до постановки в очередь, чтобы не пропустить быструю отправку
+        self.__deliveries.setdefault(key, []).append(future)
+
+        try:
+            await self.submit(track_id, url, chat_id, priority=priority, profile=profile)
+
+            return await future
+        finally:
+            futures = self.__deliveries.get(key, [])
+
+            if future in futures:
+                futures.remove(future)
+
+            if not futures:
+                self.__deliveries.pop(key, None)
+
+    def __push(self, track_id: str, priority: int):
+        self.__queued[track_id] = priority
+
+        self.__heap.put_nowait((priority, next(self.__sequence), track_id))
+
+    async def __worker(self):
+        while True:
+            priority, _, track_id = await self.__heap.get()
+
+            # Устаревшая запись: задача уже выполнена или поставлена повторно с более высоким приоритетом
+            if self.__queued.get(track_id) != priority:
+                continue
+
+            del self.__queued[track_id]
+
+            self.__running.add(track_id)
+
+            # Отметка о выполнении снимается вместе с удалением задачи из БД (под блокировкой),
+            # иначе трек, запрошенный в этот момент, остался бы без задачи
+            try:
+                await self.__process(track_id)
+            except Exception as ex:
+                logger.exception("Ошибка при выполнении задачи скачивания %s", track_id)
+
+                await self.__fail(track_id, DOWNLOAD_FAILED_TEXT, ex)
+
+    async def __process(self, track_id: str):
+        job = await asyncio.to_thread(self.__repository.get_job, track_id)
+
+        if not job:
+            # Ожидающие задачи, которой больше нет, получают отказ, а не ждут вечно
+            await self.__fail(track_id, DOWNLOAD_FAILED_TEXT)
+
+            return
+
+        if job["attempts"] >= self.__max_attempts:
+            await self.__fail(track_id, DOWNLOAD_FAILED_TEXT)
+
+            return
+
+        await asyncio.to_thread(self.__repository.increment_attempts, track_id)
+
+        # Перекодированные файлы по профилям и их file_id после отправки
+        outputs: dict[TranscodeProfile, DownloadedTrackFile] = {}
+        file_ids: dict[TranscodeProfile, Optional[str]] = {}
+
+        try:
+            async with self.__source(track_id, job["url"]) as (track, file_id, downloaded):
+                outputs[TranscodeProfile.ORIGINAL] = track
+                file_ids[TranscodeProfile.ORIGINAL] = file_id
+
+                await self.__deliver(track_id, outputs, file_ids)
+
+                await self.__store(track_id, outputs, file_ids, downloaded)
+        except subprocess.TimeoutExpired as ex:
+            await self.__fail(track_id, DOWNLOAD_TIMEOUT_TEXT, ex)
+        except DownloadsError as ex:
+            await self.__fail(track_id, DOWNLOAD_FAILED_TEXT, ex)
+        else:
+            self.__stats.completed += 1
+        finally:
+            self.__progress_edited_at.pop(track_id, None)
+
+            # Перекодированные файлы, не забранные в кеш
+            for profile, output in outputs.items():
+                if profile != TranscodeProfile.ORIGINAL:
+                    output.path.unlink(missing_ok=True)
+
+    @asynccontextmanager
+    async def __source(self, track_id: str, url: str) -> AsyncIterator[tuple[DownloadedTrackFile, Optional[str], bool]]:
+        """
+        Исходный трек, его file_id и признак скачивания: файл из кеша, если он есть
+        (трек нужно только перекодировать), иначе скачанный.
+        """
+
+        cached = await self.__cache.get(track_id)
+
+        if cached is not None and cached.path is not None:
+            # Файл кеша не вытесняется, пока его перекодируют и отправляют
+            with self.__cache.pin(cached.path):
+                if await asyncio.to_thread(cached.path.is_file):
+                    yield DownloadedTrackFile(path=cached.path, filename=cached.filename, title=cached.title), cached.file_id, False
+
+                    return
+
+        async with self.__engine.download(url, on_progress=functools.partial(self.__on_progress, track_id)) as track:
+            yield track, None, True
+
+    async def __store(
+            self,
+            track_id: str,
+            outputs: dict[TranscodeProfile, DownloadedTrackFile],
+            file_ids: dict[TranscodeProfile, Optional[str]],
+            downloaded: bool
+    ):
+        for profile, output in outputs.items():
+            if profile == TranscodeProfile.ORIGINAL and not downloaded:
+                # Исходный файл уже в кеше, мог измениться только file_id
+                await self.__cache.set_file_id(track_id, file_ids.get(profile))
+            else:
+                await self.__cache.store(audio_cache_key(track_id, profile), output, file_ids.get(profile))
+
+    def __on_progress(self, track_id: str, progress: DownloadProgress):
+        if progress.percent is None:
+            return
+
+        # Сообщения о скачивании редактируются не чаще раза в DOWNLOAD_PROGRESS_EDIT_INTERVAL секунд
+        now = time.monotonic()
+
+        if now - self.__progress_edited_at.get(track_id, 0.0) < DOWNLOAD_PROGRESS_EDIT_INTERVAL:
+            return
+
+        self.__progress_edited_at[track_id] = now
+
+        task = asyncio.create_task(self.__edit_status_messages(track_id, DOWNLOAD_PROGRESS_TEXT.format(percent=progress.percent)))
+
+        self.__progress_tasks.add(task)
+
+        task.add_done_callback(self.__progress_tasks.discard)
+
+    async def __edit_status_messages(self, track_id: str, text: str):
+        waiters = await asyncio.to_thread(self.__repository.get_waiters, track_id)
+
+        for waiter in waiters:
+            if not waiter["status_message_id"]:
+                continue
+
+            try:
+                await self.__bot.edit_message_text(text, chat_id=waiter["chat_id"], message_id=waiter["status_message_id"])
+            except TelegramAPIError:
+                pass
+
+    async def __deliver(
+            self,
+            track_id: str,
+            outputs: dict[TranscodeProfile, DownloadedTrackFile],
+            file_ids: dict[TranscodeProfile, Optional[str]]
+    ):
+        # Профили, которые не удалось перекодировать: их чаты получают исходный файл
+        failed_profiles: set[TranscodeProfile] = set()
+
+        while True:
+            async with self.__lock:
+                waiters = await asyncio.to_thread(self.__repository.get_waiters, track_id)
+
+                if not waiters:
+                    await asyncio.to_thread(self.__repository.delete_job, track_id)
+
+                    self.__running.discard(track_id)
+
+                    return
+
+            # Чаты, присоединившиеся во время отправки, получат трек на следующем круге
+            for waiter in waiters:
+                profile = self.__waiter_profile(waiter, failed_profiles)
+
+                if profile not in outputs:
+                    try:
+                        outputs[profile] = await self.__transcoder.transcode(outputs[TranscodeProfile.ORIGINAL], profile)
+                    except (subprocess.TimeoutExpired, TranscodeError) as ex:
+                        logger.warning("Не удалось перекодировать трек %s в %s: %s", track_id, profile, ex)
+
+                        failed_profiles.add(profile)
+
+                        profile = TranscodeProfile.ORIGINAL
+
+                file_ids[profile] = await self.__send(track_id, waiter, outputs[profile], file_ids.get(profile))
+
+                await asyncio.to_thread(self.__repository.delete_waiter, track_id, waiter["chat_id"], waiter["profile"])
+
+    def __waiter_profile(self, waiter: dict, failed_profiles: set[TranscodeProfile]) -> TranscodeProfile:
+        try:
+            profile = TranscodeProfile(waiter["profile"])
+        except ValueError:
+            return TranscodeProfile.ORIGINAL
+
+        if not self.__transcoder.available or profile in failed_profiles:
+            return TranscodeProfile.ORIGINAL
+
+        return profile
+
+    async def __send(self, track_id: str, waiter: dict, track: DownloadedTrackFile, file_id: Optional[str]) -> Optional[str]:
+        chat_id = waiter["chat_id"]
+
+        delivered = False
+
+        try:
+            if file_id:
+                try:
+                    await retry_after_flood_control(
+                        lambda: self.__bot.send_audio(chat_id, audio=file_id, title=track.title, performer="Spotify")
+                    )
+                except TelegramBadRequest as ex:
+                    # file_id (например, из кеша) больше не действителен - файл загружается заново
+                    logger.warning("file_id трека %s недействителен: %s", track_id, ex)
+
+                    file_id = None
+
+            if not file_id:
+                # Первая отправка загружает файл (частями с диска), остальные чаты получают его по file_id
+                message: Message = await retry_after_flood_control(
+                    lambda: self.__bot.send_audio(
+                        chat_id,
+                        audio=FSInputFile(track.path, filename=track.filename),
+                        title=track.title,
+                        performer="Spotify"
+                    )
+                )
+
+                file_id = sent_audio_file_id(message)
+
+            self.__stats.delivered += 1
+
+            delivered = True
+        except TelegramAPIError as ex:
+            logger.warning("Не удалось отправить трек в чат %s: %s", chat_id, ex)
+
+        if delivered:
+            await self.__delete_status_message(waiter)
+        else:
+            # Без трека пользователь должен увидеть, что скачивание не удалось
+            await self.__edit_status_message(waiter, DOWNLOAD_FAILED_TEXT)
+
+        self.__resolve(track_id, waiter, delivered)
+
+        return file_id
+
+    async def __fail(self, track_id: str, text: str, exception: Optional[BaseException] = None):
+        self.__stats.failed += 1
+
+        if exception is not None:
+            logger.warning("Задача скачивания %s завершилась ошибкой: %s", track_id, exception)
+
+        async with self.__lock:
+            waiters = await asyncio.to_thread(self.__repository.get_waiters, track_id)
+
+            await asyncio.to_thread(self.__repository.delete_job, track_id)
+
+            self.__running.discard(track_id)
+
+        for waiter in waiters:
+            try:
+                await self.__bot.send_message(waiter["chat_id"], text)
+            except TelegramAPIError as ex:
+                logger.warning("Не удалось уведомить чат %s: %s", waiter["chat_id"], ex)
+
+            await self.__delete_status_message(waiter)
+
+            self.__resolve(track_id, waiter, False)
+
+    def __resolve(self, track_id: str, waiter: dict, delivered: bool):
+        for future in self.__deliveries.pop((track_id, waiter["chat_id"], waiter["profile"]), []):
+            if not future.done():
+                future.set_result(delivered)
+
+    async def __edit_status_message(self, waiter: dict, text: str):
+        if not waiter["status_message_id"]:
+            return
+
+        try:
+            await self.__bot.edit_message_text(text, chat_id=waiter["chat_id"], message_id=waiter["status_message_id"])
+        except TelegramAPIError:
+            pass
+
+    async def __delete_status_message(self, waiter: dict):
+        if not waiter["status_message_id"]:
+            return
+
+        try:
+            await self.__bot.delete_message(waiter["chat_id"], waiter["status_message_id"])
+        except TelegramAPIError:
+            pass
+
+
+download_queue = DownloadQueue(DownloadJobsRepository(db_sender), bot, download_engine, audio_cache, transcoder)
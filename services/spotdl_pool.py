@@ -0,0 +1,338 @@
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from config import (
+    config,
+    DOWNLOAD_MAX_WORKERS,
+    SPOTDL_TIMEOUT,
+    SPOTDL_WORKER_MAX_JOBS,
+    SPOTDL_WORKER_START_TIMEOUT,
+    SPOTDL_WORKER_RESTART_DELAY,
+    SPOTDL_WORKER_HEALTHCHECK_INTERVAL,
+    SPOTDL_WORKER_PING_TIMEOUT
+)
+from errors import DownloadError, SpotdlWorkerError
+from utils.deadline import remaining_timeout
+from utils.downloads import DownloadedTrackFile, DownloadProgress, collect_downloaded_track, stop_process
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT_PATH = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class SpotdlPoolStats:
+    """Статистика пула обработчиков spotdl."""
+
+    workers_started: int = 0
+    workers_failed: int = 0
+    recycled: int = 0
+    unhealthy: int = 0
+    jobs: int = 0
+
+
+class SpotdlWorker:
+    """Долгоживущий процесс с загруженным spotdl (utils/spotdl_worker.py)."""
+
+    def __init__(self):
+        self.__process: Optional[asyncio.subprocess.Process] = None
+        self.__jobs = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.__process is not None and self.__process.returncode is None
+
+    @property
+    def jobs(self) -> int:
+        return self.__jobs
+
+    async def start(self, timeout: float = SPOTDL_WORKER_START_TIMEOUT):
+        """
+        Запускает процесс и ждёт, пока в нём загрузится spotdl.
+
+        Raises:
+            SpotdlWorkerError: Процесс не запустился или spotdl недоступен
+        """
+
+        self.__process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "utils.spotdl_worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=PROJECT_ROOT_PATH,
+            start_new_session=True
+        )
+
+        try:
+            message = await asyncio.wait_for(self.__receive(), timeout=timeout)
+        except (TimeoutError, SpotdlWorkerError):
+            await self.stop()
+
+            raise SpotdlWorkerError("процесс не ответил при запуске")
+        except asyncio.CancelledError:
+            await self.stop()
+
+            raise
+
+        if message.get("type") != "ready":
+            await self.stop()
+
+            raise SpotdlWorkerError(message.get("error", str(message)))
+
+    async def request(self, message: dict[str, Any]) -> dict[str, Any]:
+        """
+        Отправляет задание процессу и ждёт ответ.
+
+        Raises:
+            SpotdlWorkerError: Процесс завершился или нарушил протокол
+        """
+
+        if not self.alive:
+            raise SpotdlWorkerError("процесс не запущен")
+
+        try:
+            self.__process.stdin.write((json.dumps(message, ensure_ascii=False) + "\n").encode())
+
+            await self.__process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as ex:
+            raise SpotdlWorkerError(str(ex))
+
+        response = await self.__receive()
+
+        if message["type"] == "download":
+            self.__jobs += 1
+
+        return response
+
+    async def stop(self):
+        if self.__process is not None and self.__process.returncode is None:
+            await stop_process(self.__process)
+
+    async def __receive(self) -> dict[str, Any]:
+        line = await self.__process.stdout.readline()
+
+        if not line:
+            raise SpotdlWorkerError("процесс завершился")
+
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise SpotdlWorkerError(f"некорректный ответ: {line[:200]!r}")
+
+
+class SpotdlWorkerPool:
+    """
+    Пул долгоживущих процессов spotdl.
+
+    Каждый процесс загружает spotdl как библиотеку один раз и выполняет задания,
+    поэтому скачивание не тратит время на запуск интерпретатора и импорты.
+    Простаивающие процессы периодически проверяются (ping), а после max_jobs
+    скачиваний перезапускаются. Процесс, не уложившийся во время или отменённый
+    посреди скачивания, останавливается и заменяется новым.
+
+    Если spotdl нельзя загрузить как библиотеку, пул остаётся недоступным и
+    скачивание выполняется через CLI (utils.downloads.download_track_spotify).
+    """
+
+    def __init__(
+            self,
+            size: int = DOWNLOAD_MAX_WORKERS,
+            max_jobs: int = SPOTDL_WORKER_MAX_JOBS,
+            enabled: bool = config.SPOTDL_WORKER_POOL_ENABLED
+    ):
+        self.__size = size
+        self.__max_jobs = max_jobs
+        self.__enabled = enabled
+
+        self.__idle: asyncio.Queue[SpotdlWorker] = asyncio.Queue()
+
+        # Пул доступен, как только запустился первый процесс; замена процессов его не прерывает
+        self.__ready = False
+
+        self.__tasks: set[asyncio.Task] = set()
+        self.__closed = False
+
+        self.__stats = SpotdlPoolStats()
+
+    @property
+    def available(self) -> bool:
+        return self.__enabled and self.__ready and not self.__closed
+
+    @property
+    def stats(self) -> SpotdlPoolStats:
+        return self.__stats
+
+    async def start(self):
+        """Запускает процессы в фоне: пул становится доступен, как только готов первый из них."""
+
+        if not self.__enabled:
+            return
+
+        self.__spawn(self.__start_workers())
+        self.__spawn(self.__health_check_loop())
+
+    async def close(self):
+        self.__closed = True
+
+        for task in list(self.__tasks):
+            task.cancel()
+
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+
+        workers = []
+
+        while not self.__idle.empty():
+            workers.append(self.__idle.get_nowait())
+
+        await asyncio.gather(*(worker.stop() for worker in workers), return_exceptions=True)
+
+    async def download(
+            self,
+            url: str,
+            output_dir: str,
+            on_progress: Optional[Callable[[DownloadProgress], None]] = None
+    ) -> DownloadedTrackFile:
+        """
+        Скачивает трек в указанную директорию одним из процессов пула.
+
+        Args:
+            url: Ссылка на трек
+            output_dir: Директория для скачивания
+            on_progress: Обработчик прогресса скачивания
+
+        Returns:
+            Экземпляр типа DownloadedTrackFile с информацией о скачанном файле трека
+
+        Raises:
+            DeadlineExceededError: Исчерпан бюджет времени обновления
+            subprocess.TimeoutExpired: Скачивание не уложилось в отведённое время
+            DownloadError: Ошибка при скачивании
+            DownloadedFilesNotFoundError: Скачанные файлы не найдены
+        """
+
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+        timeout = remaining_timeout(SPOTDL_TIMEOUT)
+
+        message = {"type": "download", "url": url, "output_dir": str(Path(output_dir).resolve())}
+
+        worker: Optional[SpotdlWorker] = None
+        healthy = False
+
+        try:
+            # Ожидание свободного процесса входит в то же время, что и скачивание
+            async with asyncio.timeout(timeout):
+                worker = await self.__idle.get()
+
+                response = await worker.request(message)
+
+            healthy = True
+        except TimeoutError:
+            raise subprocess.TimeoutExpired(["spotdl_worker", url], timeout) from None
+        except SpotdlWorkerError as ex:
+            logger.warning("Процесс spotdl не выполнил задание %s: %s", url, ex)
+
+            raise DownloadError(url)
+        finally:
+            if worker is not None:
+                self.__stats.jobs += 1
+
+                # Процесс, прерванный посреди задания, в неизвестном состоянии - заменяем
+                self.__release(worker, healthy)
+
+        if response.get("type") != "done":
+            logger.warning("spotdl не скачал %s: %s", url, response.get("error"))
+
+            raise DownloadError(url)
+
+        if on_progress is not None:
+            on_progress(DownloadProgress(line=f"Downloaded: {url}", percent=100))
+
+        return await asyncio.to_thread(collect_downloaded_track, Path(output_dir))
+
+    def __release(self, worker: SpotdlWorker, healthy: bool):
+        if self.__closed:
+            self.__spawn(worker.stop())
+        elif healthy and worker.alive and worker.jobs < self.__max_jobs:
+            self.__idle.put_nowait(worker)
+        else:
+            if not healthy:
+                self.__stats.unhealthy += 1
+            else:
+                self.__stats.recycled += 1
+
+            self.__spawn(self.__replace(worker))
+
+    async def __start_workers(self):
+        await asyncio.gather(*(self.__start_worker() for _ in range(self.__size)))
+
+    async def __start_worker(self):
+        while not self.__closed:
+            worker = SpotdlWorker()
+
+            try:
+                await worker.start()
+            except (SpotdlWorkerError, OSError) as ex:
+                self.__stats.workers_failed += 1
+
+                logger.warning("Не удалось запустить процесс spotdl: %s", ex)
+
+                # Если не запустился ни один процесс, spotdl недоступен как библиотека: скачивание идёт через CLI
+                if not self.__ready:
+                    return
+
+                await asyncio.sleep(SPOTDL_WORKER_RESTART_DELAY)
+
+                continue
+
+            self.__stats.workers_started += 1
+
+            self.__ready = True
+
+            self.__idle.put_nowait(worker)
+
+            return
+
+    async def __replace(self, worker: SpotdlWorker):
+        await worker.stop()
+
+        await self.__start_worker()
+
+    async def __health_check_loop(self):
+        while True:
+            await asyncio.sleep(SPOTDL_WORKER_HEALTHCHECK_INTERVAL)
+
+            # Проверяются только простаивающие процессы: занятые отвечают на задания
+            workers = []
+
+            while not self.__idle.empty():
+                workers.append(self.__idle.get_nowait())
+
+            results = await asyncio.gather(*(self.__ping(worker) for worker in workers))
+
+            for worker, healthy in zip(workers, results):
+                self.__release(worker, healthy)
+
+    @staticmethod
+    async def __ping(worker: SpotdlWorker) -> bool:
+        try:
+            response = await asyncio.wait_for(worker.request({"type": "ping"}), timeout=SPOTDL_WORKER_PING_TIMEOUT)
+        except (TimeoutError, SpotdlWorkerError):
+            return False
+
+        return response.get("type") == "pong"
+
+    def __spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+
+        self.__tasks.add(task)
+
+        task.add_done_callback(self.__tasks.discard)
+
+
+spotdl_worker_pool = SpotdlWorkerPool()
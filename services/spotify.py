@@ -1,139 +1,71 @@
-import json
+import asyncio
+import functools
+import threading
 import time
-from dataclasses import dataclass, field
-from typing import Any, Optional, Union
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Union
 import base64
+
+import aiohttp
 from propcache import cached_property
 
-from config import EMPTY_CONTENT_TEXT, config, EMPTY_CONTENT_URL, EMPTY_CONTENT_ID
+from config import (
+    config,
+    SPOTIFY_SEARCH_CACHE_MAX_ENTRIES,
+    SPOTIFY_SEARCH_CACHE_TTL,
+    SPOTIFY_SEARCH_CACHE_MAX_MEMORY_BYTES,
+    SPOTIFY_ALBUM_TRACKS_PAGE_LIMIT,
+    SPOTIFY_ALBUM_TRACKS_MAX_CONCURRENCY,
+    SPOTIFY_REQUEST_TIMEOUT
+)
 from enums.content_type import ContentType
+from enums.deadline_stage import DeadlineStage
+from enums.request_priority import RequestPriority
 from enums.request_type import RequestType
-from errors import RemoteResponseDataError
-from utils.send_requests import send_request
-from utils.time import convert_time_from_milliseconds
-
-@dataclass
-class SpotifyImage:
-    height: Union[int, str] = 0
-    width: Union[int, str] = 0
-    url: str = EMPTY_CONTENT_URL
-
-    @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "SpotifyImage":
-        return cls(
-            height=data.get("height", 0),
-            width=data.get("width", 0),
-            url=data.get("url", EMPTY_CONTENT_URL)
-        )
-
-
-@dataclass
-class SpotifyArtist:
-    url: str = EMPTY_CONTENT_URL
-    id: str = EMPTY_CONTENT_ID
-    name: str = EMPTY_CONTENT_TEXT
-
-    @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "SpotifyArtist":
-        return cls(
-            url=data.get("url", EMPTY_CONTENT_URL),
-            id=data.get("id", EMPTY_CONTENT_ID),
-            name=data.get("name", EMPTY_CONTENT_TEXT)
-        )
-
-
-@dataclass
-class SpotifyAlbum:
-    album_type: str = EMPTY_CONTENT_TEXT
-    artists: list[SpotifyArtist] = field(default_factory=list)
-    url: str = EMPTY_CONTENT_URL
-    id: str = EMPTY_CONTENT_ID
-    images: list[SpotifyImage] = field(default_factory=list)
-    is_playable: bool = False
-    name: str = EMPTY_CONTENT_TEXT
-    release_date: str = EMPTY_CONTENT_TEXT
-    total_tracks: Union[int, str] = 0
-
-    @property
-    def image_url(self) -> Optional[str]:
-        if self.images:
-            return self.images[0].url
-
-        return None
-
-    @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "SpotifyAlbum":
-        return cls(
-            album_type=data.get("album_type", EMPTY_CONTENT_TEXT),
-            artists=[SpotifyArtist.from_dict(artist) for artist in data.get("artists", [])],
-            url=data.get("external_urls", {}).get("spotify", EMPTY_CONTENT_URL),
-            id=data.get("id", EMPTY_CONTENT_ID),
-            images=[SpotifyImage.from_dict(image) for image in data.get("images", [])],
-            is_playable=data.get("is_playable", False),
-            name=data.get("name", EMPTY_CONTENT_TEXT),
-            release_date=data.get("release_date", EMPTY_CONTENT_TEXT),
-            total_tracks=data.get("total_tracks", EMPTY_CONTENT_TEXT)
-        )
-
-
-@dataclass
-class SpotifyTrack:
-    id: str = EMPTY_CONTENT_ID
-    name: str = EMPTY_CONTENT_TEXT
-    artists: list[SpotifyArtist] = field(default_factory=list)
-    album: SpotifyAlbum = field(default_factory=SpotifyAlbum)
-    duration_ms: Union[int, str] = 0
-    url: str = EMPTY_CONTENT_URL
-
-    @property
-    def duration(self) -> str:
-        if self.duration_ms:
-            return convert_time_from_milliseconds(self.duration_ms)
-
-        return EMPTY_CONTENT_TEXT
-
-    @property
-    def release_date(self) -> str:
-        if self.album:
-            return self.album.release_date
-
-        return EMPTY_CONTENT_TEXT
-
-    @property
-    def image_url(self) -> Optional[str]:
-        if self.album:
-            return self.album.image_url
-
-        return None
-
-    @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "SpotifyTrack":
-        return cls(
-            id=data.get("id", EMPTY_CONTENT_ID),
-            name=data.get("name", EMPTY_CONTENT_TEXT),
-            artists=[SpotifyArtist.from_dict(artist) for artist in data.get("artists", [])],
-            album=SpotifyAlbum.from_dict(data.get("album", {})),
-            duration_ms=data.get("duration_ms", 0),
-            url=data.get("external_urls", {}).get("spotify", EMPTY_CONTENT_URL)
-        )
-
-class SpotifyClient:
-    """Клиент Spotify."""
+from services.db import SpotifyEntitiesRepository, cache_db_sender
+from services.spotify_auth import SpotifyTokenManager
+from services.spotify_batcher import SpotifyIdBatcher
+from services.spotify_resilience import SpotifyEndpointGuards, is_outage_error
+from services.spotify_scheduler import SpotifyRequestScheduler, request_priority
+from services.spotify_cache import ALBUM_TRACKS_CACHE_KIND, CachedEntity, SpotifyEntityCache
+from services.spotify_models import SpotifyArtist, SpotifyImage, SpotifyAlbum, SpotifyTrack
+from utils import json_decode
+from utils.cache import TTLCache
+from utils.deadline import deadline_stage, no_deadline
+from utils.urls import is_spotify_id
+from errors import RemoteError, RemoteHTTPError, RemoteRequestException, RemoteResponseDataError
+from utils.http_sessions import HTTPConnectionStats, create_async_session
+from utils.send_requests import RemoteResponse, send_request, send_request_async
+
+logger = logging.getLogger(__name__)
+
+
+class BaseSpotifyClient:
+    """Общая часть синхронного и асинхронного клиентов Spotify."""
 
     def __init__(
             self,
             client_id: str = "",
             client_secret: str = "",
             auth_url: Optional[str] = "https://accounts.spotify.com/api/token",
-            search_url: Optional[str] = "https://api.spotify.com/v1/search"
+            search_url: Optional[str] = None,
+            api_url: Optional[str] = "https://api.spotify.com/v1",
+            search_cache: Optional[TTLCache[list[Union[SpotifyTrack, SpotifyAlbum]]]] = None
         ):
         self.__client_id = client_id
         self.__client_secret = client_secret
+        self.__api_url = api_url.rstrip("/")
         self.__auth_url = auth_url
-        self.__search_url = search_url
+        self.__search_url = search_url or f"{self.__api_url}/search"
 
-        self.__access_token: Optional[str] = None
-        self.__access_token_expires_at: float = 0.0
+        if search_cache is None:
+            search_cache = TTLCache(
+                max_entries=SPOTIFY_SEARCH_CACHE_MAX_ENTRIES,
+                ttl=SPOTIFY_SEARCH_CACHE_TTL,
+                max_memory_bytes=SPOTIFY_SEARCH_CACHE_MAX_MEMORY_BYTES
+            )
+
+        self.__search_cache = search_cache
 
     @property
     def client_id(self) -> str:
@@ -151,6 +83,14 @@ class SpotifyClient:
     def search_url(self) -> str:
         return self.__search_url
 
+    @property
+    def api_url(self) -> str:
+        return self.__api_url
+
+    @property
+    def search_cache(self) -> TTLCache[list[Union[SpotifyTrack, SpotifyAlbum]]]:
+        return self.__search_cache
+
     @cached_property
     def auth_token(self) -> str:
         auth = f"{self.__client_id}:{self.__client_secret}"
@@ -159,19 +99,144 @@ class SpotifyClient:
 
         return b64_auth
 
-    def search_by_id(self, content_id: str, content_type: ContentType) -> Union[SpotifyTrack, SpotifyAlbum]:
-        search_type_str = f"{content_type.value}s"
+    @cached_property
+    def _auth_headers(self) -> dict[str, str]:
+        headers = {
+            "Authorization": f"Basic {self.auth_token}"
+        }
+
+        return headers
+
+    @property
+    def _auth_data(self) -> dict[str, str]:
+        data = {
+            "grant_type": "client_credentials"
+        }
+
+        return data
+
+    @staticmethod
+    def _search_limit(limit: Optional[int]) -> Optional[int]:
+        if limit and isinstance(limit, int) and limit > 0:
+            return limit
+
+        return None
+
+    @classmethod
+    def _search_params(cls, name: str, content_type: ContentType, limit: Optional[int] = None) -> dict[str, str]:
+        params = {
+            "q": name,
+            "type": content_type.value
+        }
 
+        limit = cls._search_limit(limit)
+
+        if limit:
+            params["limit"] = str(limit)
+
+        return params
+
+    @classmethod
+    def _search_cache_key(cls, name: str, content_type: ContentType, limit: Optional[int] = None) -> tuple:
+        normalized_name = " ".join(name.casefold().split())
+
+        return normalized_name, content_type.value, cls._search_limit(limit)
+
+    def _by_id_url(self, content_id: str, content_type: ContentType) -> str:
+        return f"{self.__api_url}/{content_type.value}s/{content_id}"
+
+    def _by_ids_url(self, content_type: ContentType) -> str:
+        return f"{self.__api_url}/{content_type.value}s"
+
+    def _album_tracks_url(self, album_id: str) -> str:
+        return f"{self.__api_url}/albums/{album_id}/tracks"
+
+    @staticmethod
+    def _parse_by_id(data: dict[str, Any], content_type: ContentType) -> Union[SpotifyTrack, SpotifyAlbum]:
+        if content_type is ContentType.TRACK:
+            return SpotifyTrack.from_dict(data)
+        else:
+            return SpotifyAlbum.from_dict(data)
+
+    @staticmethod
+    def _album_tracks_params(offset: int = 0) -> dict[str, str]:
+        params = {
+            "offset": str(offset),
+            "limit": str(SPOTIFY_ALBUM_TRACKS_PAGE_LIMIT)
+        }
+
+        return params
+
+    @staticmethod
+    def _parse_album_tracks(data: dict[str, Any]) -> tuple[list[SpotifyTrack], int]:
+        try:
+            items = data["items"]
+            total = int(data.get("total", len(items)))
+        except Exception as ex:
+            raise RemoteResponseDataError(str(ex), str(data))
+
+        tracks = [SpotifyTrack.from_dict(track) for track in items]
+
+        return tracks, total
+
+    @staticmethod
+    def _album_tracks_payload(tracks: list[SpotifyTrack]) -> dict[str, Any]:
+        return {
+            "items": [track.data for track in tracks],
+            "total": len(tracks)
+        }
+
+    @classmethod
+    def _parse_cached(cls, data: dict[str, Any], kind: str) -> Union[SpotifyTrack, SpotifyAlbum, list[SpotifyTrack]]:
+        if kind == ALBUM_TRACKS_CACHE_KIND:
+            tracks, _ = cls._parse_album_tracks(data)
+
+            return tracks
+
+        return cls._parse_by_id(data, ContentType(kind))
+
+    @staticmethod
+    def _parse_search(data: dict[str, Any], content_type: ContentType) -> list[Union[SpotifyTrack, SpotifyAlbum]]:
+        items = []
+
+        try:
+            if content_type is ContentType.TRACK:
+                items = data["tracks"]["items"]
+            elif content_type is ContentType.ALBUM:
+                items = data["albums"]["items"]
+        except Exception as ex:
+            raise RemoteResponseDataError(str(ex), str(data))
+
+        artists = []
+
+        if items:
+            for item in items:
+                if content_type is ContentType.TRACK:
+                    artists.append(SpotifyTrack.from_dict(item))
+                elif content_type is ContentType.ALBUM:
+                    artists.append(SpotifyAlbum.from_dict(item))
+
+        return artists
+
+
+class SpotifyClient(BaseSpotifyClient):
+    """Клиент Spotify (синхронный)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.__access_token: Optional[str] = None
+        self.__access_token_expires_at: float = 0.0
+        self.__access_token_lock = threading.Lock()
+
+    def search_by_id(self, content_id: str, content_type: ContentType) -> Union[SpotifyTrack, SpotifyAlbum]:
         response = send_request(
             RequestType.GET,
-            f"https://api.spotify.com/v1/{search_type_str}/{content_id}",
+            self._by_id_url(content_id, content_type),
             headers=self.__search_headers
         )
 
-        if content_type is ContentType.TRACK:
-            return SpotifyTrack.from_dict(response.json())
-        else:
-            return SpotifyAlbum.from_dict(response.json())
+        return self._parse_by_id(json_decode.loads(response.content), content_type)
 
     def search_track(self, name: str, limit: Optional[int] = None) -> list[SpotifyTrack]:
         return self.search(name, content_type=ContentType.TRACK, limit=limit)
@@ -186,97 +251,528 @@ class SpotifyClient:
         return self.search_by_id(album_id, content_type=ContentType.ALBUM)
 
     def get_tracks_by_album_id(self, album_id: str) -> list[SpotifyTrack]:
-        response = send_request(
-            RequestType.GET,
-            f"https://api.spotify.com/v1/albums/{album_id}/tracks",
-            headers=self.__search_headers
-        )
+        tracks = []
+        total = 1
 
-        try:
-            data = response.json()["items"]
-        except Exception as ex:
-            raise RemoteResponseDataError(str(ex), response.json())
+        while len(tracks) < total:
+            response = send_request(
+                RequestType.GET,
+                self._album_tracks_url(album_id),
+                headers=self.__search_headers,
+                params=self._album_tracks_params(offset=len(tracks))
+            )
+
+            page, total = self._parse_album_tracks(json_decode.loads(response.content))
 
-        tracks = [SpotifyTrack.from_dict(track) for track in data]
+            if not page:
+                break
+
+            tracks.extend(page)
 
         return tracks
 
     def search(self, track_name: str, content_type: ContentType = Union[SpotifyTrack, SpotifyAlbum], limit: Optional[int] = None) -> list[Union[SpotifyTrack, SpotifyAlbum]]:
-        params = {
-            "q": track_name,
-            "type": content_type.value
-        }
+        cache_key = self._search_cache_key(track_name, content_type, limit)
 
-        if limit and isinstance(limit, int) and limit > 0:
-            params["limit"] = str(limit)
+        cached = self.search_cache.get(cache_key)
+
+        if cached is not None:
+            return list(cached)
 
         response = send_request(
             RequestType.GET,
-            "https://api.spotify.com/v1/search",
+            self.search_url,
             headers=self.__search_headers,
-            params=params
+            params=self._search_params(track_name, content_type, limit)
         )
 
-        items = []
+        result = self._parse_search(json_decode.loads(response.content), content_type)
 
-        try:
-            if content_type is ContentType.TRACK:
-                items = response.json()["tracks"]["items"]
-            elif content_type is ContentType.ALBUM:
-                items = response.json()["albums"]["items"]
-        except Exception as ex:
-            raise RemoteResponseDataError(str(ex), response.json())
+        self.search_cache.set(cache_key, result)
 
-        artists = []
+        return list(result)
 
-        if items:
-            for item in items:
-                if content_type is ContentType.TRACK:
-                    artists.append(SpotifyTrack.from_dict(item))
-                elif content_type is ContentType.ALBUM:
-                    artists.append(SpotifyAlbum.from_dict(item))
+    def __get_access_token(self):
+        if self.__access_token and time.time() < self.__access_token_expires_at:
+            return self.__access_token
 
-        return artists
+        with self.__access_token_lock:
+            if self.__access_token and time.time() < self.__access_token_expires_at:
+                return self.__access_token
 
-    @cached_property
-    def __auth_headers(self) -> dict[str, str]:
+            response = send_request(
+                RequestType.POST,
+                self.auth_url,
+                headers=self._auth_headers,
+                data=self._auth_data
+            )
+
+            try:
+                data = json_decode.loads(response.content)
+
+                self.__access_token = data["access_token"]
+                self.__access_token_expires_at = time.time() + data["expires_in"] - 10
+
+                return self.__access_token
+            except Exception as ex:
+                raise RemoteResponseDataError(str(ex), response.text)
+
+    @property
+    def __search_headers(self) -> dict[str, Any]:
         headers = {
-            "Authorization": f"Basic {self.auth_token}"
+            "Authorization": f"Bearer {self.__get_access_token()}"
         }
 
         return headers
 
+
+class AsyncSpotifyClient(BaseSpotifyClient):
+    """
+    Клиент Spotify (асинхронный).
+
+    Повторяет интерфейс SpotifyClient, но не блокирует цикл событий:
+    все запросы выполняются через общую сессию aiohttp с пулом соединений.
+    """
+
+    def __init__(
+            self,
+            *args,
+            session: Optional[aiohttp.ClientSession] = None,
+            entity_cache: Optional[SpotifyEntityCache] = None,
+            scheduler: Optional[SpotifyRequestScheduler] = None,
+            **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+
+        self.__session = session
+        self.__token_manager = SpotifyTokenManager(self.__fetch_access_token)
+
+        if entity_cache is None:
+            entity_cache = SpotifyEntityCache(SpotifyEntitiesRepository(cache_db_sender), parse=self._parse_cached)
+
+        self.__entity_cache = entity_cache
+
+        self.__batcher = SpotifyIdBatcher(self.__fetch_entities)
+
+        if scheduler is None:
+            scheduler = SpotifyRequestScheduler()
+
+        self.__scheduler = scheduler
+
+        self.__endpoint_guards = SpotifyEndpointGuards()
+
+        self.__revalidating: dict[tuple[str, str], asyncio.Task] = {}
+
+        # Выполняемые загрузки треков альбомов: ID альбома -> задача
+        self.__album_tracks_loading: dict[str, asyncio.Task] = {}
+
+        self.__connection_stats = HTTPConnectionStats()
+
     @property
-    def __auth_data(self) -> dict[str, str]:
-        data = {
-            "grant_type": "client_credentials"
-        }
+    def session(self) -> aiohttp.ClientSession:
+        if self.__session is None or self.__session.closed:
+            self.__session = create_async_session(stats=self.__connection_stats)
 
-        return data
+        return self.__session
 
-    def __get_access_token(self):
-        if self.__access_token and time.time() < self.__access_token_expires_at:
-            return self.__access_token
+    @property
+    def connection_stats(self) -> HTTPConnectionStats:
+        return self.__connection_stats
 
-        response = send_request(
-            RequestType.POST,
-            self.auth_url,
-            headers=self.__auth_headers,
-            data=self.__auth_data
+    @property
+    def token_manager(self) -> SpotifyTokenManager:
+        return self.__token_manager
+
+    @property
+    def entity_cache(self) -> SpotifyEntityCache:
+        return self.__entity_cache
+
+    @property
+    def batcher(self) -> SpotifyIdBatcher:
+        return self.__batcher
+
+    @property
+    def scheduler(self) -> SpotifyRequestScheduler:
+        return self.__scheduler
+
+    @property
+    def endpoint_guards(self) -> SpotifyEndpointGuards:
+        return self.__endpoint_guards
+
+    async def close(self):
+        await self.__token_manager.close()
+
+        for task in (*self.__revalidating.values(), *self.__album_tracks_loading.values()):
+            task.cancel()
+
+        if self.__session is not None and not self.__session.closed:
+            await self.__session.close()
+
+    async def search_by_id(
+            self,
+            content_id: str,
+            content_type: ContentType,
+            stale_while_revalidate: bool = False
+    ) -> Union[SpotifyTrack, SpotifyAlbum]:
+        # Некорректный ID испортил бы пакетный запрос для всех, кто в него попал
+        if not is_spotify_id(content_id):
+            raise RemoteRequestException(f"Некорректный ID: {content_id[:64]!r}")
+
+        async with deadline_stage(DeadlineStage.SPOTIFY):
+            return await self.__cached(
+                content_type,
+                content_id,
+                lambda: self.__batcher.load(content_type, content_id),
+                stale_while_revalidate=stale_while_revalidate
+            )
+
+    async def search_track(self, name: str, limit: Optional[int] = None) -> list[SpotifyTrack]:
+        return await self.search(name, content_type=ContentType.TRACK, limit=limit)
+
+    async def search_track_by_id(self, track_id: str, stale_while_revalidate: bool = False) -> SpotifyTrack:
+        return await self.search_by_id(track_id, content_type=ContentType.TRACK, stale_while_revalidate=stale_while_revalidate)
+
+    async def search_album(self, name: str, limit: Optional[int] = None) -> list[SpotifyAlbum]:
+        return await self.search(name, content_type=ContentType.ALBUM, limit=limit)
+
+    async def search_album_by_id(self, album_id: str, stale_while_revalidate: bool = False) -> SpotifyAlbum:
+        return await self.search_by_id(album_id, content_type=ContentType.ALBUM, stale_while_revalidate=stale_while_revalidate)
+
+    async def get_tracks_by_album_id(self, album_id: str, stale_while_revalidate: bool = False) -> list[SpotifyTrack]:
+        async with deadline_stage(DeadlineStage.SPOTIFY):
+            tracks = await self.__cached(
+                ALBUM_TRACKS_CACHE_KIND,
+                album_id,
+                lambda: self.__load_album_tracks(album_id),
+                stale_while_revalidate=stale_while_revalidate
+            )
+
+        return list(tracks)
+
+    async def iter_tracks_by_album_id(self, album_id: str) -> AsyncIterator[SpotifyTrack]:
+        """
+        Возвращает треки альбома по мере загрузки страниц.
+
+        Первая страница определяет общее количество треков, остальные
+        загружаются параллельно (не более SPOTIFY_ALBUM_TRACKS_MAX_CONCURRENCY
+        одновременно) и отдаются в исходном порядке. Полностью полученный
+        список сохраняется в кеш.
+        """
+
+        cached = await self.__entity_cache.get(ALBUM_TRACKS_CACHE_KIND, album_id)
+
+        if cached is not None and self.__entity_cache.is_fresh(cached):
+            for track in cached.entity:
+                yield track
+
+            return
+
+        tracks = []
+
+        async for track in self.__stream_album_tracks(album_id):
+            tracks.append(track)
+
+            yield track
+
+        await self.__entity_cache.set(ALBUM_TRACKS_CACHE_KIND, album_id, self._album_tracks_payload(tracks), tracks)
+
+    async def __load_album_tracks(self, album_id: str, etag: Optional[str] = None) -> list[SpotifyTrack]:
+        # Одновременные загрузки одного альбома (предзагрузка, карточка альбома, скачивание) объединяются в одну
+        task = self.__album_tracks_loading.get(album_id)
+
+        if task is None:
+            # Общая загрузка не ограничена бюджетом начавшего её обновления: каждый ждёт её в пределах своего
+            with no_deadline():
+                task = asyncio.create_task(self.__fetch_album_tracks(album_id, etag))
+
+            self.__album_tracks_loading[album_id] = task
+
+            task.add_done_callback(functools.partial(self.__on_album_tracks_loaded, album_id))
+
+        # shield: отмена одного из ожидающих не прерывает загрузку для остальных
+        return await asyncio.shield(task)
+
+    def __on_album_tracks_loaded(self, album_id: str, task: asyncio.Task):
+        self.__album_tracks_loading.pop(album_id, None)
+
+        # Ошибка считается полученной, даже если все ожидающие уже отменены
+        if not task.cancelled():
+            task.exception()
+
+    async def __fetch_album_tracks(self, album_id: str, etag: Optional[str] = None) -> list[SpotifyTrack]:
+        tracks = [track async for track in self.__stream_album_tracks(album_id)]
+
+        await self.__entity_cache.set(
+            ALBUM_TRACKS_CACHE_KIND,
+            album_id,
+            self._album_tracks_payload(tracks),
+            tracks,
+            etag=etag
         )
 
+        return tracks
+
+    async def __stream_album_tracks(self, album_id: str) -> AsyncIterator[SpotifyTrack]:
+        first_page, total = await self.__fetch_album_tracks_page(album_id, offset=0)
+
+        for track in first_page:
+            yield track
+
+        if not first_page:
+            return
+
+        semaphore = asyncio.Semaphore(SPOTIFY_ALBUM_TRACKS_MAX_CONCURRENCY)
+
+        async def fetch_page(offset: int) -> list[SpotifyTrack]:
+            async with semaphore:
+                page, _ = await self.__fetch_album_tracks_page(album_id, offset=offset)
+
+                return page
+
+        tasks = [
+            asyncio.create_task(fetch_page(offset))
+            for offset in range(len(first_page), total, SPOTIFY_ALBUM_TRACKS_PAGE_LIMIT)
+        ]
+
         try:
-            self.__access_token = response.json()["access_token"]
-            self.__access_token_expires_at = time.time() + response.json()["expires_in"] - 10
+            for task in tasks:
+                for track in await task:
+                    yield track
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+
+    async def __cached(
+            self,
+            kind: str,
+            content_id: str,
+            load: Callable[[], Awaitable[Any]],
+            stale_while_revalidate: bool = False
+    ) -> Any:
+        """
+        Возвращает сущность из кеша, при необходимости загружая её.
 
-            return self.__access_token
+        Свежая запись отдаётся сразу. Устаревшая запись перепроверяется
+        условным запросом (If-None-Match): ответ 304 лишь продлевает её срок. Устаревшая запись в режиме
+        stale_while_revalidate тоже отдаётся сразу, а обновляется в фоне.
+        Если Spotify недоступен, отдаётся последняя известная версия,
+        не старше max_stale.
+        """
+
+        cached = await self.__entity_cache.get(kind, content_id)
+
+        if cached is not None:
+            if self.__entity_cache.is_fresh(cached):
+                return cached.entity
+
+            # Устаревшая запись перепроверяется условным запросом по ID вместо пакетной загрузки
+            load = functools.partial(self.__revalidate_cached, kind, content_id, cached)
+
+            if stale_while_revalidate:
+                self.__revalidate(kind, content_id, load)
+
+                return cached.entity
+
+        try:
+            return await load()
+        except RemoteError as ex:
+            if cached is None or not is_outage_error(ex):
+                raise
+
+            logger.warning("Spotify недоступен, отдаются данные %s/%s из кеша: %s", kind, content_id, ex)
+
+            return cached.entity
+
+    async def __revalidate_cached(self, kind: str, content_id: str, cached: CachedEntity) -> Any:
+        if kind == ALBUM_TRACKS_CACHE_KIND:
+            endpoint = "album_tracks"
+            url = self._album_tracks_url(content_id)
+            params = self._album_tracks_params(offset=0)
+        else:
+            endpoint = f"{kind}s"
+            url = self._by_id_url(content_id, ContentType(kind))
+            params = None
+
+        response = await self.__get(endpoint, url, params=params, if_none_match=cached.etag)
+
+        if response.status_code == 304:
+            touched = await self.__entity_cache.touch(kind, content_id, cached)
+
+            return touched.entity
+
+        etag = response.headers.get("ETag")
+
+        if kind == ALBUM_TRACKS_CACHE_KIND:
+            tracks, total = self._parse_album_tracks(response.json())
+
+            if total > len(tracks):
+                return await self.__load_album_tracks(content_id, etag=etag)
+
+            entity = tracks
+            payload = self._album_tracks_payload(tracks)
+        else:
+            payload = response.json()
+            entity = self._parse_by_id(payload, ContentType(kind))
+
+        await self.__entity_cache.set(kind, content_id, payload, entity, etag=etag)
+
+        return entity
+
+    def __revalidate(self, kind: str, content_id: str, load: Callable[[], Awaitable[Any]]):
+        key = (kind, content_id)
+
+        if key in self.__revalidating:
+            return
+
+        async def revalidate():
+            try:
+                await load()
+            except RemoteError as ex:
+                logger.warning("Не удалось обновить %s/%s в кеше: %s", kind, content_id, ex)
+            finally:
+                self.__revalidating.pop(key, None)
+
+        # Фоновое обновление не должно вытеснять запросы пользователей и не ограничено бюджетом обновления
+        with request_priority(RequestPriority.BACKGROUND), no_deadline():
+            self.__revalidating[key] = asyncio.create_task(revalidate())
+
+    async def __fetch_album_tracks_page(self, album_id: str, offset: int) -> tuple[list[SpotifyTrack], int]:
+        response = await self.__get("album_tracks", self._album_tracks_url(album_id), params=self._album_tracks_params(offset=offset))
+
+        return self._parse_album_tracks(response.json())
+
+    async def search(self, track_name: str, content_type: ContentType = Union[SpotifyTrack, SpotifyAlbum], limit: Optional[int] = None) -> list[Union[SpotifyTrack, SpotifyAlbum]]:
+        cache_key = self._search_cache_key(track_name, content_type, limit)
+
+        cached = self.search_cache.get(cache_key)
+
+        if cached is not None:
+            return list(cached)
+
+        async with deadline_stage(DeadlineStage.SPOTIFY):
+            response = await self.__get("search", self.search_url, params=self._search_params(track_name, content_type, limit))
+
+        result = self._parse_search(response.json(), content_type)
+
+        self.search_cache.set(cache_key, result)
+
+        return list(result)
+
+    async def __fetch_entities(
+            self,
+            content_type: ContentType,
+            content_ids: list[str]
+    ) -> dict[str, Union[SpotifyTrack, SpotifyAlbum, RemoteError]]:
+        try:
+            response = await self.__get(f"{content_type.value}s", self._by_ids_url(content_type), params={"ids": ",".join(content_ids)})
+        except RemoteHTTPError as ex:
+            if ex.status_code != 400 or len(content_ids) < 2:
+                raise
+
+            # Один некорректный ID отклоняет весь пакет - запрашиваем ID по отдельности
+            return await self.__fetch_entities_one_by_one(content_type, content_ids)
+
+        try:
+            items = response.json()[f"{content_type.value}s"]
         except Exception as ex:
-            raise RemoteResponseDataError(str(ex), response.json())
+            raise RemoteResponseDataError(str(ex), response.content.decode(errors="replace"))
 
-    @property
-    def __search_headers(self) -> dict[str, Any]:
+        requested_ids = set(content_ids)
+
+        entities = {}
+        cache_updates = []
+
+        # Результаты сопоставляются по ID из ответа, а не по позиции в запросе
+        for data in items:
+            if not data:
+                continue
+
+            content_id = data.get("id")
+
+            if content_id not in requested_ids:
+                content_id = (data.get("linked_from") or {}).get("id")
+
+            if content_id not in requested_ids:
+                continue
+
+            entity = self._parse_by_id(data, content_type)
+
+            cache_updates.append(self.__entity_cache.set(content_type, content_id, data, entity))
+
+            entities[content_id] = entity
+
+        await asyncio.gather(*cache_updates)
+
+        return entities
+
+    async def __fetch_entities_one_by_one(
+            self,
+            content_type: ContentType,
+            content_ids: list[str]
+    ) -> dict[str, Union[SpotifyTrack, SpotifyAlbum, RemoteError]]:
+        results = await asyncio.gather(
+            *(self.__fetch_entities(content_type, [content_id]) for content_id in content_ids),
+            return_exceptions=True
+        )
+
+        entities = {}
+
+        for content_id, result in zip(content_ids, results):
+            if isinstance(result, RemoteError):
+                # Ошибка достаётся только ожидающим этого ID
+                entities[content_id] = result
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                entities.update(result)
+
+        return entities
+
+    async def __get(
+            self,
+            endpoint: str,
+            url: str,
+            params: Optional[dict[str, Any]] = None,
+            if_none_match: Optional[str] = None
+    ) -> RemoteResponse:
+        guard = self.__endpoint_guards[endpoint]
+
+        async def request() -> RemoteResponse:
+            headers = await self.__search_headers()
+
+            if if_none_match:
+                headers["If-None-Match"] = if_none_match
+
+            return await send_request_async(
+                self.session,
+                RequestType.GET,
+                url,
+                headers=headers,
+                params=params,
+                timeout=SPOTIFY_REQUEST_TIMEOUT
+            )
+
+        # Отключённый эндпоинт отвечает ошибкой сразу, не занимая очередь планировщика
+        return await guard.call(request, run=self.__scheduler.run)
+
+    async def __fetch_access_token(self) -> dict[str, Any]:
+        response = await send_request_async(
+            self.session,
+            RequestType.POST,
+            self.auth_url,
+            headers=self._auth_headers,
+            data=self._auth_data,
+            timeout=SPOTIFY_REQUEST_TIMEOUT
+        )
+
+        return response.json()
+
+    async def __search_headers(self) -> dict[str, Any]:
         headers = {
-            "Authorization": f"Bearer {self.__get_access_token()}"
+            "Authorization": f"Bearer {await self.__token_manager.get_token()}"
         }
 
         return headers
@@ -284,5 +780,14 @@ class SpotifyClient:
 
 spotify_client = SpotifyClient(
     client_id=config.SPOTIFY_CLIENT_ID,
-    client_secret=config.SPOTIFY_CLIENT_SECRET
+    client_secret=config.SPOTIFY_CLIENT_SECRET,
+    auth_url=config.SPOTIFY_AUTH_URL,
+    api_url=config.SPOTIFY_API_URL
+)
+
+async_spotify_client = AsyncSpotifyClient(
+    client_id=config.SPOTIFY_CLIENT_ID,
+    client_secret=config.SPOTIFY_CLIENT_SECRET,
+    auth_url=config.SPOTIFY_AUTH_URL,
+    api_url=config.SPOTIFY_API_URL
 )
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from config import SPOTIFY_TOKEN_REFRESH_MARGIN, SPOTIFY_TOKEN_REFRESH_RETRY_DELAY
+from errors import RemoteResponseDataError
+from utils.deadline import no_deadline
+
+logger = logging.getLogger(__name__)
+
+
+class SpotifyTokenManager:
+    """
+    Менеджер access-токена Spotify.
+
+    Обновляет токен в фоне за refresh_margin секунд до истечения срока.
+    Одновременно выполняется не более одного обновления, остальные
+    ожидающие получают его результат.
+    """
+
+    def __init__(
+            self,
+            fetch_token: Callable[[], Awaitable[dict[str, Any]]],
+            refresh_margin: float = SPOTIFY_TOKEN_REFRESH_MARGIN,
+            retry_delay: float = SPOTIFY_TOKEN_REFRESH_RETRY_DELAY
+    ):
+        self.__fetch_token = fetch_token
+        self.__refresh_margin = refresh_margin
+        self.__retry_delay = retry_delay
+
+        self.__access_token: Optional[str] = None
+        self.__expires_at: float = 0.0
+
+        self.__refresh_task: Optional[asyncio.Task] = None
+        self.__background_task: Optional[asyncio.Task] = None
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.__access_token
+
+    @property
+    def expires_at(self) -> float:
+        return self.__expires_at
+
+    @property
+    def is_valid(self) -> bool:
+        return bool(self.__access_token) and time.time() < self.__expires_at
+
+    async def get_token(self) -> str:
+        if self.is_valid:
+            return self.__access_token
+
+        return await self.refresh()
+
+    async def refresh(self) -> str:
+        if self.__refresh_task is None or self.__refresh_task.done():
+            # Обновление токена общее для всех ожидающих и не ограничено бюджетом одного обновления
+            with no_deadline():
+                self.__refresh_task = asyncio.create_task(self.__refresh())
+
+        self.__ensure_background_refresh()
+
+        # shield: отмена одного ожидающего не должна прерывать общее обновление
+        return await asyncio.shield(self.__refresh_task)
+
+    async def close(self):
+        for task in (self.__background_task, self.__refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+        self.__background_task = None
+        self.__refresh_task = None
+
+    async def __refresh(self) -> str:
+        data = await self.__fetch_token()
+
+        try:
+            access_token = data["access_token"]
+            expires_in = float(data["expires_in"])
+        except Exception as ex:
+            raise RemoteResponseDataError(str(ex), str(data))
+
+        self.__access_token = access_token
+        self.__expires_at = time.time() + expires_in
+
+        return access_token
+
+    def __ensure_background_refresh(self):
+        if self.__background_task is None or self.__background_task.done():
+            with no_deadline():
+                self.__background_task = asyncio.create_task(self.__background_refresh())
+
+    async def __background_refresh(self):
+        while True:
+            if self.__refresh_task is not None and not self.__refresh_task.done():
+                await asyncio.wait([self.__refresh_task])
+
+            delay = self.__expires_at - self.__refresh_margin - time.time()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+                continue
+
+            try:
+                await self.refresh()
+            except Exception as ex:
+                logger.warning("Не удалось обновить токен Spotify: %s", ex)
+
+                await asyncio.sleep(self.__retry_delay)
@@ -0,0 +1,128 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from config import SPOTIFY_BATCH_WINDOW, SPOTIFY_BATCH_MAX_TRACKS, SPOTIFY_BATCH_MAX_ALBUMS
+from enums.content_type import ContentType
+from errors import RemoteResponseDataError
+from utils.deadline import no_deadline
+
+DEFAULT_MAX_BATCH_SIZES = {
+    ContentType.TRACK: SPOTIFY_BATCH_MAX_TRACKS,
+    ContentType.ALBUM: SPOTIFY_BATCH_MAX_ALBUMS
+}
+
+
+class SpotifyIdBatcher:
+    """
+    Объединяет запросы сущностей Spotify по ID в пакетные запросы (по образцу dataloader).
+
+    Запросы, пришедшие в течение window секунд, отправляются одним обращением
+    к эндпоинту /v1/{tracks,albums}?ids=. Одинаковые ID, уже ожидающие ответа,
+    не запрашиваются повторно: все ожидающие получают общий результат.
+    fetch_batch может вернуть для отдельного ID исключение - оно достанется
+    только ожидающим этого ID.
+    """
+
+    def __init__(
+            self,
+            fetch_batch: Callable[[ContentType, list[str]], Awaitable[dict[str, Any]]],
+            window: float = SPOTIFY_BATCH_WINDOW,
+            max_batch_sizes: Optional[dict[ContentType, int]] = None
+    ):
+        self.__fetch_batch = fetch_batch
+        self.__window = window
+        self.__max_batch_sizes = max_batch_sizes or DEFAULT_MAX_BATCH_SIZES
+
+        self.__pending: dict[ContentType, dict[str, asyncio.Future]] = {}
+        self.__in_flight: dict[tuple[ContentType, str], asyncio.Future] = {}
+        self.__timers: dict[ContentType, asyncio.TimerHandle] = {}
+
+        self.__requests = 0
+        self.__fetched_ids = 0
+
+    @property
+    def requests(self) -> int:
+        """Количество запрошенных ID."""
+
+        return self.__requests
+
+    @property
+    def fetched_ids(self) -> int:
+        """Количество ID, отправленных в Spotify."""
+
+        return self.__fetched_ids
+
+    async def load(self, content_type: ContentType, content_id: str) -> Any:
+        self.__requests += 1
+
+        key = (content_type, content_id)
+
+        future = self.__in_flight.get(key)
+
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+
+            self.__in_flight[key] = future
+
+            pending = self.__pending.setdefault(content_type, {})
+            pending[content_id] = future
+
+            if len(pending) >= self.__max_batch_sizes.get(content_type, 1):
+                self.__dispatch(content_type)
+            elif content_type not in self.__timers:
+                self.__timers[content_type] = asyncio.get_running_loop().call_later(
+                    self.__window,
+                    self.__dispatch,
+                    content_type
+                )
+
+        # shield: отмена одного ожидающего не должна отменять общий результат
+        return await asyncio.shield(future)
+
+    def __dispatch(self, content_type: ContentType):
+        timer = self.__timers.pop(content_type, None)
+
+        if timer is not None:
+            timer.cancel()
+
+        batch = self.__pending.pop(content_type, None)
+
+        if batch:
+            # Пакет общий для нескольких обновлений, поэтому не ограничен бюджетом того, кто его открыл
+            with no_deadline():
+                asyncio.create_task(self.__run_batch(content_type, batch))
+
+    async def __run_batch(self, content_type: ContentType, batch: dict[str, asyncio.Future]):
+        self.__fetched_ids += len(batch)
+
+        try:
+            results = await self.__fetch_batch(content_type, list(batch))
+        except Exception as ex:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(ex)
+        else:
+            for content_id, future in batch.items():
+                if future.done():
+                    continue
+
+                result = results.get(content_id)
+
+                if result is None:
+                    future.set_exception(
+                        RemoteResponseDataError(f"{content_type.value} с ID {content_id} не найден")
+                    )
+                elif isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            for content_id, future in batch.items():
+                if self.__in_flight.get((content_type, content_id)) is future:
+                    del self.__in_flight[(content_type, content_id)]
+
+                if not future.done():
+                    future.cancel()
+                elif not future.cancelled():
+                    # Исключение могли не забрать, если все ожидающие были отменены
+                    future.exception()
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from config import (
+    SPOTIFY_ENTITY_CACHE_MAX_ENTRIES,
+    SPOTIFY_ENTITY_CACHE_TTL,
+    SPOTIFY_ENTITY_CACHE_MAX_STALE,
+    SPOTIFY_ENTITY_CACHE_MAX_MEMORY_BYTES
+)
+from errors import DatabaseError
+from services.db import SpotifyEntitiesRepository
+from utils import json_decode
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ALBUM_TRACKS_CACHE_KIND = "album_tracks"
+
+
+@dataclass
+class CachedEntity:
+    """Сущность Spotify из кеша."""
+
+    entity: Any
+    payload: dict[str, Any]
+    fetched_at: float
+    etag: Optional[str] = None
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class SpotifyEntityCache:
+    """
+    Двухуровневый кеш сущностей Spotify (треков, альбомов и списков треков альбомов) по ID.
+
+    Первый уровень хранит готовые модели в памяти процесса, второй - исходные
+    ответы API в SQLite, поэтому кеш переживает перезапуск бота.
+    Записи моложе ttl считаются свежими. Более старые записи хранятся до
+    max_stale и могут отдаваться, пока выполняется их обновление или пока
+    Spotify недоступен.
+    """
+
+    def __init__(
+            self,
+            repository: SpotifyEntitiesRepository,
+            parse: Callable[[dict[str, Any], str], Any],
+            ttl: float = SPOTIFY_ENTITY_CACHE_TTL,
+            max_stale: float = SPOTIFY_ENTITY_CACHE_MAX_STALE,
+            memory_cache: Optional[TTLCache[CachedEntity]] = None
+    ):
+        self.__repository = repository
+        self.__parse = parse
+        self.__ttl = ttl
+        self.__max_stale = max(max_stale, ttl)
+
+        if memory_cache is None:
+            memory_cache = TTLCache(
+                max_entries=SPOTIFY_ENTITY_CACHE_MAX_ENTRIES,
+                ttl=self.__max_stale,
+                max_memory_bytes=SPOTIFY_ENTITY_CACHE_MAX_MEMORY_BYTES
+            )
+
+        self.__memory_cache = memory_cache
+
+    @property
+    def ttl(self) -> float:
+        return self.__ttl
+
+    @property
+    def max_stale(self) -> float:
+        return self.__max_stale
+
+    @property
+    def memory_cache(self) -> TTLCache[CachedEntity]:
+        return self.__memory_cache
+
+    def is_fresh(self, cached: CachedEntity) -> bool:
+        return cached.age < self.__ttl
+
+    def is_servable(self, cached: CachedEntity) -> bool:
+        return cached.age < self.__max_stale
+
+    async def get(self, kind: str, content_id: str) -> Optional[CachedEntity]:
+        key = (str(kind), content_id)
+
+        cached = self.__memory_cache.get(key)
+
+        if cached is not None:
+            return cached
+
+        try:
+            row = await asyncio.to_thread(self.__repository.get_entity, str(kind), content_id)
+        except DatabaseError:
+            return None
+
+        if not row:
+            return None
+
+        payload = json_decode.loads(row["payload"])
+
+        cached = CachedEntity(
+            entity=self.__parse(payload, str(kind)),
+            payload=payload,
+            fetched_at=row["fetched_at"],
+            etag=row.get("etag")
+        )
+
+        if not self.is_servable(cached):
+            return None
+
+        self.__remember(key, cached)
+
+        return cached
+
+    async def set(
+            self,
+            kind: str,
+            content_id: str,
+            payload: dict[str, Any],
+            entity: Any,
+            etag: Optional[str] = None
+    ) -> CachedEntity:
+        cached = CachedEntity(
+            entity=entity,
+            payload=payload,
+            fetched_at=time.time(),
+            etag=etag
+        )
+
+        self.__remember((str(kind), content_id), cached)
+
+        try:
+            await asyncio.to_thread(
+                self.__repository.set_entity,
+                str(kind),
+                content_id,
+                json_decode.dumps(payload),
+                cached.fetched_at,
+                etag
+            )
+        except DatabaseError as ex:
+            logger.warning("Не удалось сохранить сущность Spotify в кеш: %s", ex)
+
+        return cached
+
+    async def touch(self, kind: str, content_id: str, cached: CachedEntity) -> CachedEntity:
+        """Продлевает срок свежести записи, подтверждённой ответом 304 Not Modified."""
+
+        touched = CachedEntity(
+            entity=cached.entity,
+            payload=cached.payload,
+            fetched_at=time.time(),
+            etag=cached.etag
+        )
+
+        self.__remember((str(kind), content_id), touched)
+
+        try:
+            await asyncio.to_thread(self.__repository.touch_entity, str(kind), content_id, touched.fetched_at)
+        except DatabaseError as ex:
+            logger.warning("Не удалось обновить запись кеша Spotify: %s", ex)
+
+        return touched
+
+    def __remember(self, key: tuple[str, str], cached: CachedEntity):
+        ttl_left = self.__max_stale - cached.age
+
+        if ttl_left > 0:
+            self.__memory_cache.set(key, cached, ttl=ttl_left)
@@ -0,0 +1,180 @@
+from typing import Any, Optional, Union
+
+from config import EMPTY_CONTENT_TEXT, EMPTY_CONTENT_URL, EMPTY_CONTENT_ID
+from utils.time import convert_time_from_milliseconds
+
+_NOT_LOADED = object()
+
+
+class SpotifyModel:
+    """
+    Базовая модель Spotify поверх исходного ответа API.
+
+    Хранит только исходный словарь: простые поля читаются из него напрямую,
+    вложенные модели создаются при первом обращении и запоминаются.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Optional[dict[str, Any]] = None):
+        self._data: dict[str, Any] = data if data is not None else {}
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return self._data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        return cls(data)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self._data.get('id')!r}, name={self._data.get('name')!r})"
+
+
+class SpotifyImage(SpotifyModel):
+    __slots__ = ()
+
+    @property
+    def height(self) -> Union[int, str]:
+        return self._data.get("height", 0)
+
+    @property
+    def width(self) -> Union[int, str]:
+        return self._data.get("width", 0)
+
+    @property
+    def url(self) -> str:
+        return self._data.get("url", EMPTY_CONTENT_URL)
+
+
+class SpotifyArtist(SpotifyModel):
+    __slots__ = ()
+
+    @property
+    def url(self) -> str:
+        return self._data.get("url", EMPTY_CONTENT_URL)
+
+    @property
+    def id(self) -> str:
+        return self._data.get("id", EMPTY_CONTENT_ID)
+
+    @property
+    def name(self) -> str:
+        return self._data.get("name", EMPTY_CONTENT_TEXT)
+
+
+class SpotifyAlbum(SpotifyModel):
+    __slots__ = ("_artists", "_images")
+
+    def __init__(self, data: Optional[dict[str, Any]] = None):
+        super().__init__(data)
+
+        self._artists = _NOT_LOADED
+        self._images = _NOT_LOADED
+
+    @property
+    def album_type(self) -> str:
+        return self._data.get("album_type", EMPTY_CONTENT_TEXT)
+
+    @property
+    def artists(self) -> list[SpotifyArtist]:
+        if self._artists is _NOT_LOADED:
+            self._artists = [SpotifyArtist(artist) for artist in self._data.get("artists", [])]
+
+        return self._artists
+
+    @property
+    def url(self) -> str:
+        return self._data.get("external_urls", {}).get("spotify", EMPTY_CONTENT_URL)
+
+    @property
+    def id(self) -> str:
+        return self._data.get("id", EMPTY_CONTENT_ID)
+
+    @property
+    def images(self) -> list[SpotifyImage]:
+        if self._images is _NOT_LOADED:
+            self._images = [SpotifyImage(image) for image in self._data.get("images", [])]
+
+        return self._images
+
+    @property
+    def is_playable(self) -> bool:
+        return self._data.get("is_playable", False)
+
+    @property
+    def name(self) -> str:
+        return self._data.get("name", EMPTY_CONTENT_TEXT)
+
+    @property
+    def release_date(self) -> str:
+        return self._data.get("release_date", EMPTY_CONTENT_TEXT)
+
+    @property
+    def total_tracks(self) -> Union[int, str]:
+        return self._data.get("total_tracks", EMPTY_CONTENT_TEXT)
+
+    @property
+    def image_url(self) -> Optional[str]:
+        # Берём первую обложку без создания моделей для всех вариантов размера
+        images = self._data.get("images")
+
+        if images:
+            return images[0].get("url", EMPTY_CONTENT_URL)
+
+        return None
+
+
+class SpotifyTrack(SpotifyModel):
+    __slots__ = ("_artists", "_album")
+
+    def __init__(self, data: Optional[dict[str, Any]] = None):
+        super().__init__(data)
+
+        self._artists = _NOT_LOADED
+        self._album = _NOT_LOADED
+
+    @property
+    def id(self) -> str:
+        return self._data.get("id", EMPTY_CONTENT_ID)
+
+    @property
+    def name(self) -> str:
+        return self._data.get("name", EMPTY_CONTENT_TEXT)
+
+    @property
+    def artists(self) -> list[SpotifyArtist]:
+        if self._artists is _NOT_LOADED:
+            self._artists = [SpotifyArtist(artist) for artist in self._data.get("artists", [])]
+
+        return self._artists
+
+    @property
+    def album(self) -> SpotifyAlbum:
+        if self._album is _NOT_LOADED:
+            self._album = SpotifyAlbum(self._data.get("album", {}))
+
+        return self._album
+
+    @property
+    def duration_ms(self) -> Union[int, str]:
+        return self._data.get("duration_ms", 0)
+
+    @property
+    def url(self) -> str:
+        return self._data.get("external_urls", {}).get("spotify", EMPTY_CONTENT_URL)
+
+    @property
+    def duration(self) -> str:
+        if self.duration_ms:
+            return convert_time_from_milliseconds(self.duration_ms)
+
+        return EMPTY_CONTENT_TEXT
+
+    @property
+    def release_date(self) -> str:
+        return self._data.get("album", {}).get("release_date", EMPTY_CONTENT_TEXT)
+
+    @property
+    def image_url(self) -> Optional[str]:
+        return self.album.image_url
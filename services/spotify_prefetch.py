@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from config import config, SPOTIFY_PREFETCH_MAX_CONCURRENT, SPOTIFY_PREFETCH_MAX_ENTRIES, SPOTIFY_ENTITY_CACHE_TTL
+from enums.request_priority import RequestPriority
+from errors import RemoteError
+from services.spotify import AsyncSpotifyClient, async_spotify_client
+from services.spotify_scheduler import request_priority
+from utils.cache import TTLCache
+from utils.deadline import no_deadline
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PrefetchStats:
+    """Статистика предзагрузки."""
+
+    scheduled: int = 0
+    skipped: int = 0
+    completed: int = 0
+    failed: int = 0
+    views: int = 0
+    hits: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        if self.views == 0:
+            return 0.0
+
+        return self.hits / self.views
+
+
+class AlbumPrefetcher:
+    """
+    Предзагрузка альбома и его треков в кеш при показе карточки трека.
+
+    Выполняется в фоне с низким приоритетом и не более max_concurrent
+    предзагрузок одновременно: лишние запросы отбрасываются, а не ставятся в очередь.
+    """
+
+    def __init__(
+            self,
+            client: AsyncSpotifyClient,
+            enabled: bool = config.SPOTIFY_PREFETCH_ALBUMS,
+            max_concurrent: int = SPOTIFY_PREFETCH_MAX_CONCURRENT
+    ):
+        self.__client = client
+        self.__enabled = enabled
+        self.__max_concurrent = max_concurrent
+
+        self.__tasks: dict[str, asyncio.Task] = {}
+        self.__prefetched: TTLCache[bool] = TTLCache(max_entries=SPOTIFY_PREFETCH_MAX_ENTRIES, ttl=SPOTIFY_ENTITY_CACHE_TTL)
+
+        self.__stats = PrefetchStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    @property
+    def stats(self) -> PrefetchStats:
+        return self.__stats
+
+    def schedule(self, album_id: str):
+        if not self.__enabled or not album_id:
+            return
+
+        if album_id in self.__tasks or len(self.__tasks) >= self.__max_concurrent:
+            self.__stats.skipped += 1
+
+            return
+
+        self.__stats.scheduled += 1
+
+        with request_priority(RequestPriority.BACKGROUND), no_deadline():
+            self.__tasks[album_id] = asyncio.create_task(self.__prefetch(album_id))
+
+    def record_view(self, album_id: str):
+        if not self.__enabled:
+            return
+
+        self.__stats.views += 1
+
+        if self.__prefetched.get(album_id):
+            self.__stats.hits += 1
+
+    async def close(self):
+        for task in list(self.__tasks.values()):
+            task.cancel()
+
+    async def __prefetch(self, album_id: str):
+        try:
+            await asyncio.gather(
+                self.__client.search_album_by_id(album_id),
+                self.__client.get_tracks_by_album_id(album_id)
+            )
+        except RemoteError as ex:
+            self.__stats.failed += 1
+
+            logger.info("Не удалось предзагрузить альбом %s: %s", album_id, ex)
+        else:
+            self.__stats.completed += 1
+
+            self.__prefetched.set(album_id, True)
+        finally:
+            self.__tasks.pop(album_id, None)
+
+
+album_prefetcher = AlbumPrefetcher(async_spotify_client)
@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from config import (
+    SPOTIFY_CIRCUIT_FAILURE_THRESHOLD,
+    SPOTIFY_CIRCUIT_RECOVERY_TIMEOUT,
+    SPOTIFY_HEDGE_PERCENTILE,
+    SPOTIFY_HEDGE_MIN_SAMPLES,
+    SPOTIFY_HEDGE_MIN_DELAY,
+    SPOTIFY_LATENCY_WINDOW
+)
+from enums.circuit_state import CircuitState
+from errors import RemoteCircuitOpenError, RemoteConnectionError, RemoteHTTPError, RemoteTimeoutError, \
+    RemoteRateLimitError
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+def is_endpoint_failure(exception: BaseException) -> bool:
+    """Признак ошибки, говорящей о проблемах самого эндпоинта (а не запроса)."""
+
+    if isinstance(exception, RemoteRateLimitError):
+        return False
+
+    if isinstance(exception, RemoteHTTPError):
+        return exception.status_code is None or exception.status_code >= 500
+
+    return isinstance(exception, (RemoteTimeoutError, RemoteConnectionError))
+
+
+def is_outage_error(exception: BaseException) -> bool:
+    """Признак того, что Spotify сейчас не может ответить (и можно отдать устаревшие данные)."""
+
+    return isinstance(exception, (RemoteCircuitOpenError, RemoteRateLimitError)) or is_endpoint_failure(exception)
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель эндпоинта.
+
+    После failure_threshold ошибок подряд эндпоинт отключается на recovery_timeout
+    секунд: запросы сразу завершаются ошибкой RemoteCircuitOpenError. Затем
+    пропускается один пробный запрос, по результату которого эндпоинт либо
+    включается, либо снова отключается.
+    """
+
+    def __init__(
+            self,
+            endpoint: str,
+            failure_threshold: int = SPOTIFY_CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout: float = SPOTIFY_CIRCUIT_RECOVERY_TIMEOUT
+    ):
+        self.__endpoint = endpoint
+        self.__failure_threshold = failure_threshold
+        self.__recovery_timeout = recovery_timeout
+
+        self.__state = CircuitState.CLOSED
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__probe_in_flight = False
+
+    @property
+    def state(self) -> CircuitState:
+        return self.__state
+
+    def check(self):
+        if self.__state is CircuitState.CLOSED:
+            return
+
+        now = time.monotonic()
+
+        if self.__state is CircuitState.OPEN:
+            retry_in = self.__opened_at + self.__recovery_timeout - now
+
+            if retry_in > 0:
+                raise RemoteCircuitOpenError(self.__endpoint, retry_in)
+
+            self.__state = CircuitState.HALF_OPEN
+            self.__probe_in_flight = False
+
+        if self.__probe_in_flight:
+            raise RemoteCircuitOpenError(self.__endpoint, 0)
+
+        self.__probe_in_flight = True
+
+    def on_success(self):
+        self.__failures = 0
+        self.__probe_in_flight = False
+
+        if self.__state is not CircuitState.CLOSED:
+            logger.warning("Эндпоинт Spotify %s снова доступен", self.__endpoint)
+
+        self.__state = CircuitState.CLOSED
+
+    def on_failure(self):
+        self.__failures += 1
+        self.__probe_in_flight = False
+
+        if self.__state is CircuitState.HALF_OPEN or self.__failures >= self.__failure_threshold:
+            if self.__state is not CircuitState.OPEN:
+                logger.warning("Эндпоинт Spotify %s отключён после %d ошибок", self.__endpoint, self.__failures)
+
+            self.__state = CircuitState.OPEN
+            self.__opened_at = time.monotonic()
+
+    def on_ignored(self):
+        self.__probe_in_flight = False
+
+
+class LatencyTracker:
+    """Скользящее окно задержек ответов эндпоинта."""
+
+    def __init__(self, window: int = SPOTIFY_LATENCY_WINDOW):
+        self.__latencies: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self.__latencies)
+
+    def add(self, latency: float):
+        self.__latencies.append(latency)
+
+    def percentile(self, value: float) -> Optional[float]:
+        if not self.__latencies:
+            return None
+
+        latencies = sorted(self.__latencies)
+
+        return latencies[min(int(len(latencies) * value), len(latencies) - 1)]
+
+
+@dataclass
+class EndpointStats:
+    """Статистика эндпоинта."""
+
+    requests: int = 0
+    failures: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    rejected: int = 0
+
+
+class EndpointGuard:
+    """
+    Защита одного эндпоинта: автоматический выключатель и хеджирование запросов.
+
+    Если запрос не завершился за время, превышающее hedge_percentile
+    последних задержек, параллельно отправляется его дубликат; используется
+    первый успешный ответ, второй запрос отменяется.
+    """
+
+    def __init__(
+            self,
+            endpoint: str,
+            hedge_percentile: float = SPOTIFY_HEDGE_PERCENTILE,
+            hedge_min_samples: int = SPOTIFY_HEDGE_MIN_SAMPLES,
+            hedge_min_delay: float = SPOTIFY_HEDGE_MIN_DELAY
+    ):
+        self.__endpoint = endpoint
+        self.__hedge_percentile = hedge_percentile
+        self.__hedge_min_samples = hedge_min_samples
+        self.__hedge_min_delay = hedge_min_delay
+
+        self.__breaker = CircuitBreaker(endpoint)
+        self.__latencies = LatencyTracker()
+
+        self.__stats = EndpointStats()
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.__breaker
+
+    @property
+    def stats(self) -> EndpointStats:
+        return self.__stats
+
+    @property
+    def hedge_delay(self) -> Optional[float]:
+        if len(self.__latencies) < self.__hedge_min_samples:
+            return None
+
+        return max(self.__latencies.percentile(self.__hedge_percentile), self.__hedge_min_delay)
+
+    def check(self):
+        try:
+            self.__breaker.check()
+        except RemoteCircuitOpenError:
+            self.__stats.rejected += 1
+
+            raise
+
+    async def call(
+            self,
+            request: Callable[[], Awaitable[T]],
+            run: Optional[Callable[[Callable[[], Awaitable[T]]], Awaitable[T]]] = None
+    ) -> T:
+        # run - исполнитель каждой попытки (основной и хеджирующей), например планировщик запросов
+        # Допуск и его снятие в одном месте: пробный запрос освобождается при любом исходе, включая отмену
+        self.check()
+
+        self.__stats.requests += 1
+
+        try:
+            result = await self.__hedged(request, run)
+        except Exception as ex:
+            if is_endpoint_failure(ex):
+                self.__stats.failures += 1
+
+                self.__breaker.on_failure()
+            else:
+                self.__breaker.on_ignored()
+
+            raise
+        except asyncio.CancelledError:
+            self.__breaker.on_ignored()
+
+            raise
+
+        self.__breaker.on_success()
+
+        return result
+
+    async def __hedged(
+            self,
+            request: Callable[[], Awaitable[T]],
+            run: Optional[Callable[[Callable[[], Awaitable[T]]], Awaitable[T]]]
+    ) -> T:
+        sent = asyncio.Event()
+
+        async def attempt() -> T:
+            sent.set()
+
+            started_at = time.monotonic()
+
+            try:
+                return await request()
+            finally:
+                # Учитываются и неудачные, и отменённые (проигравшие хедж) попытки: для отменённой
+                # это нижняя граница задержки. Без них из окна выпадает хвост, по которому считается перцентиль
+                self.__latencies.add(time.monotonic() - started_at)
+
+        tasks = [asyncio.create_task(run(attempt) if run else attempt())]
+
+        try:
+            hedge_delay = self.hedge_delay
+
+            if hedge_delay is not None:
+                # Задержка хеджирования отсчитывается от отправки запроса, а не от постановки в очередь
+                sent_task = asyncio.create_task(sent.wait())
+
+                try:
+                    await asyncio.wait([tasks[0], sent_task], return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    sent_task.cancel()
+
+                if not tasks[0].done():
+                    done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+
+                    if not done:
+                        self.__stats.hedged += 1
+
+                        # Дубликат проходит через тот же исполнитель и расходует его лимиты
+                        tasks.append(asyncio.create_task(run(attempt) if run else attempt()))
+
+            pending = set(tasks)
+            errors = []
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    exception = task.exception()
+
+                    if exception is None:
+                        if task is not tasks[0]:
+                            self.__stats.hedge_wins += 1
+
+                        return task.result()
+
+                    errors.append(exception)
+
+            raise errors[0]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+class SpotifyEndpointGuards:
+    """Набор защит по эндпоинтам Spotify."""
+
+    def __init__(self):
+        self.__guards: dict[str, EndpointGuard] = {}
+
+    def __getitem__(self, endpoint: str) -> EndpointGuard:
+        guard = self.__guards.get(endpoint)
+
+        if guard is None:
+            guard = EndpointGuard(endpoint)
+
+            self.__guards[endpoint] = guard
+
+        return guard
+
+    @property
+    def stats(self) -> dict[str, EndpointStats]:
+        return {endpoint: guard.stats for endpoint, guard in self.__guards.items()}
@@ -0,0 +1,212 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+
+from config import (
+    SPOTIFY_RATE_LIMIT_PER_SECOND,
+    SPOTIFY_RATE_LIMIT_BURST,
+    SPOTIFY_MAX_CONCURRENCY,
+    SPOTIFY_MIN_CONCURRENCY,
+    SPOTIFY_RATE_LIMIT_MAX_RETRIES
+)
+from enums.request_priority import RequestPriority
+from errors import RemoteRateLimitError
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+current_request_priority: ContextVar[RequestPriority] = ContextVar(
+    "current_request_priority",
+    default=RequestPriority.INTERACTIVE
+)
+
+
+@contextmanager
+def request_priority(value: RequestPriority) -> Iterator[None]:
+    """Задаёт приоритет запросов к Spotify внутри блока (и в задачах, созданных в нём)."""
+
+    token = current_request_priority.set(value)
+
+    try:
+        yield
+    finally:
+        current_request_priority.reset(token)
+
+
+@dataclass
+class SchedulerStats:
+    """Статистика планировщика."""
+
+    requests: int = 0
+    rate_limited: int = 0
+    retries: int = 0
+
+
+class SpotifyRequestScheduler:
+    """
+    Планировщик запросов к Spotify.
+
+    Ограничивает частоту запросов корзиной токенов, а количество одновременных
+    запросов - адаптивным лимитом: лимит плавно растёт при успешных ответах и
+    уменьшается вдвое при ответе 429, после которого все запросы ждут Retry-After.
+    Ожидающие запросы обслуживаются по приоритету: интерактивные раньше фоновых.
+    """
+
+    def __init__(
+            self,
+            rate: float = SPOTIFY_RATE_LIMIT_PER_SECOND,
+            burst: int = SPOTIFY_RATE_LIMIT_BURST,
+            max_concurrency: int = SPOTIFY_MAX_CONCURRENCY,
+            min_concurrency: int = SPOTIFY_MIN_CONCURRENCY,
+            max_retries: int = SPOTIFY_RATE_LIMIT_MAX_RETRIES
+    ):
+        self.__rate = rate
+        self.__burst = burst
+        self.__max_concurrency = max_concurrency
+        self.__min_concurrency = min_concurrency
+        self.__max_retries = max_retries
+
+        self.__tokens = float(burst)
+        self.__tokens_updated_at = time.monotonic()
+
+        self.__concurrency = float(max_concurrency)
+        self.__active = 0
+        self.__paused_until = 0.0
+
+        self.__waiters: list[tuple[int, int, asyncio.Future]] = []
+        self.__counter = itertools.count()
+        self.__wake_handle: Optional[asyncio.TimerHandle] = None
+
+        self.__stats = SchedulerStats()
+
+    @property
+    def concurrency(self) -> int:
+        return max(int(self.__concurrency), self.__min_concurrency)
+
+    @property
+    def active(self) -> int:
+        return self.__active
+
+    @property
+    def stats(self) -> SchedulerStats:
+        return self.__stats
+
+    async def run(self, request: Callable[[], Awaitable[T]], priority: Optional[RequestPriority] = None) -> T:
+        if priority is None:
+            priority = current_request_priority.get()
+
+        attempt = 0
+
+        while True:
+            await self.__acquire(priority)
+
+            try:
+                self.__stats.requests += 1
+
+                result = await request()
+            except RemoteRateLimitError as ex:
+                self.__on_rate_limited(ex.retry_after)
+
+                if attempt >= self.__max_retries:
+                    raise
+
+                attempt += 1
+
+                self.__stats.retries += 1
+
+                continue
+            finally:
+                self.__release()
+
+            self.__on_success()
+
+            return result
+
+    async def __acquire(self, priority: RequestPriority):
+        future = asyncio.get_running_loop().create_future()
+
+        heapq.heappush(self.__waiters, (int(priority), next(self.__counter), future))
+
+        self.__wake()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Слот мог быть выдан одновременно с отменой
+            if future.done() and not future.cancelled():
+                self.__release()
+
+            raise
+
+    def __release(self):
+        self.__active -= 1
+
+        self.__wake()
+
+    def __refill(self, now: float):
+        self.__tokens = min(
+            float(self.__burst),
+            self.__tokens + (now - self.__tokens_updated_at) * self.__rate
+        )
+
+        self.__tokens_updated_at = now
+
+    def __wake(self):
+        if self.__wake_handle is not None:
+            self.__wake_handle.cancel()
+
+            self.__wake_handle = None
+
+        now = time.monotonic()
+
+        self.__refill(now)
+
+        while self.__waiters and self.__active < self.concurrency:
+            if now < self.__paused_until:
+                self.__schedule_wake(self.__paused_until - now)
+
+                return
+
+            if self.__tokens < 1:
+                self.__schedule_wake((1 - self.__tokens) / self.__rate)
+
+                return
+
+            _, _, future = heapq.heappop(self.__waiters)
+
+            if future.done():
+                continue
+
+            self.__tokens -= 1
+            self.__active += 1
+
+            future.set_result(None)
+
+    def __schedule_wake(self, delay: float):
+        self.__wake_handle = asyncio.get_running_loop().call_later(delay, self.__wake)
+
+    def __on_success(self):
+        if self.__concurrency < self.__max_concurrency:
+            self.__concurrency = min(
+                float(self.__max_concurrency),
+                self.__concurrency + 1 / self.__concurrency
+            )
+
+    def __on_rate_limited(self, retry_after: float):
+        self.__stats.rate_limited += 1
+
+        self.__concurrency = max(float(self.__min_concurrency), self.__concurrency / 2)
+        self.__paused_until = max(self.__paused_until, time.monotonic() + retry_after)
+
+        logger.warning(
+            "Spotify вернул 429: пауза %.1f сек., лимит одновременных запросов %d",
+            retry_after,
+            self.concurrency
+        )
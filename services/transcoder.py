@@ -0,0 +1,99 @@
+import asyncio
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from config import DOWNLOAD_RESULTS_DIR_PATH, TRANSCODE_MAX_WORKERS
+from enums.transcode_profile import TranscodeProfile
+from utils.downloads import DownloadedTrackFile
+from utils.transcode import TRANSCODE_PROFILE_SPECS, transcode_audio
+
+
+@dataclass
+class TranscodeStats:
+    """Статистика перекодирования."""
+
+    started: int = 0
+    completed: int = 0
+    failed: int = 0
+    source_bytes: int = 0
+    output_bytes: int = 0
+
+
+class Transcoder:
+    """
+    Перекодирование скачанных треков в профили пользователей.
+
+    Одновременно выполняется не более max_workers процессов ffmpeg, остальные
+    ждут своей очереди. Результат записывается в директорию результатов
+    скачиваний и принадлежит вызывающему: его нужно забрать в кеш или удалить.
+    Без ffmpeg перекодирование недоступно.
+    """
+
+    def __init__(
+            self,
+            output_dir: str = DOWNLOAD_RESULTS_DIR_PATH,
+            max_workers: int = TRANSCODE_MAX_WORKERS
+    ):
+        self.__output_dir = Path(output_dir)
+        self.__semaphore = asyncio.Semaphore(max_workers)
+
+        self.__available = shutil.which("ffmpeg") is not None
+
+        self.__stats = TranscodeStats()
+
+    @property
+    def available(self) -> bool:
+        return self.__available
+
+    @property
+    def stats(self) -> TranscodeStats:
+        return self.__stats
+
+    async def transcode(self, track: DownloadedTrackFile, profile: TranscodeProfile) -> DownloadedTrackFile:
+        """
+        Перекодирует трек в указанный профиль.
+
+        Args:
+            track: Исходный трек (файл не изменяется)
+            profile: Профиль перекодирования (кроме ORIGINAL)
+
+        Returns:
+            Экземпляр типа DownloadedTrackFile с перекодированным файлом
+
+        Raises:
+            subprocess.TimeoutExpired: Перекодирование не уложилось в отведённое время
+            TranscodeError: Ошибка ffmpeg
+        """
+
+        spec = TRANSCODE_PROFILE_SPECS[profile]
+
+        self.__output_dir.mkdir(parents=True, exist_ok=True)
+
+        output_path = self.__output_dir / f"{uuid.uuid4().hex}{spec.extension}"
+
+        async with self.__semaphore:
+            self.__stats.started += 1
+
+            try:
+                await transcode_audio(track.path, output_path, profile)
+            except BaseException:
+                self.__stats.failed += 1
+
+                output_path.unlink(missing_ok=True)
+
+                raise
+
+        self.__stats.completed += 1
+        self.__stats.source_bytes += track.path.stat().st_size
+        self.__stats.output_bytes += output_path.stat().st_size
+
+        return DownloadedTrackFile(
+            path=output_path,
+            filename=f"{track.title}{spec.extension}",
+            title=track.title
+        )
+
+
+transcoder = Transcoder()
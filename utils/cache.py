@@ -0,0 +1,198 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    """Статистика кеша."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def requests(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_ratio(self) -> float:
+        if self.requests == 0:
+            return 0.0
+
+        return self.hits / self.requests
+
+
+@dataclass
+class _CacheEntry(Generic[V]):
+    value: V
+    expires_at: float
+    size: int
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    Приблизительно оценивает объём памяти, занимаемый объектом и всеми вложенными в него объектами.
+
+    Args:
+        obj: Объект
+
+    Returns:
+        Размер в байтах
+    """
+
+    seen: set[int] = set()
+    stack = [obj]
+
+    size = 0
+
+    while stack:
+        item = stack.pop()
+
+        if id(item) in seen:
+            continue
+
+        seen.add(id(item))
+
+        size += sys.getsizeof(item)
+
+        if isinstance(item, (str, bytes, bytearray, int, float, bool)) or item is None:
+            continue
+
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            if hasattr(item, "__dict__"):
+                stack.append(vars(item))
+
+            for cls in type(item).__mro__:
+                slots = getattr(cls, "__slots__", ())
+
+                if isinstance(slots, str):
+                    slots = (slots,)
+
+                for slot in slots:
+                    if hasattr(item, slot):
+                        stack.append(getattr(item, slot))
+
+    return size
+
+
+class TTLCache(Generic[V]):
+    """
+    Ограниченный по размеру кеш с TTL и вытеснением давно не использованных записей (LRU).
+
+    Ограничивается как количеством записей, так и оценкой занимаемой памяти.
+    """
+
+    def __init__(
+            self,
+            max_entries: int,
+            ttl: float,
+            max_memory_bytes: Optional[int] = None,
+            sizeof: Callable[[Any], int] = estimate_size
+    ):
+        self.__max_entries = max_entries
+        self.__ttl = ttl
+        self.__max_memory_bytes = max_memory_bytes
+        self.__sizeof = sizeof
+
+        self.__entries: OrderedDict[Hashable, _CacheEntry[V]] = OrderedDict()
+        self.__memory_usage = 0
+        self.__lock = threading.Lock()
+
+        self.__stats = CacheStats()
+
+    @property
+    def ttl(self) -> float:
+        return self.__ttl
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.__stats
+
+    @property
+    def memory_usage(self) -> int:
+        return self.__memory_usage
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if entry is None:
+                self.__stats.misses += 1
+
+                return None
+
+            if entry.expires_at <= time.monotonic():
+                self.__remove(key)
+
+                self.__stats.expirations += 1
+                self.__stats.misses += 1
+
+                return None
+
+            self.__entries.move_to_end(key)
+
+            self.__stats.hits += 1
+
+            return entry.value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None):
+        size = self.__sizeof(value) if self.__max_memory_bytes is not None else 0
+
+        if self.__max_memory_bytes is not None and size > self.__max_memory_bytes:
+            return
+
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+
+            self.__entries[key] = _CacheEntry(
+                value=value,
+                expires_at=time.monotonic() + (self.__ttl if ttl is None else ttl),
+                size=size
+            )
+
+            self.__memory_usage += size
+
+            self.__evict()
+
+    def delete(self, key: Hashable):
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+            self.__memory_usage = 0
+
+    def __remove(self, key: Hashable):
+        entry = self.__entries.pop(key)
+
+        self.__memory_usage -= entry.size
+
+    def __evict(self):
+        while self.__entries and (
+                len(self.__entries) > self.__max_entries
+                or (self.__max_memory_bytes is not None and self.__memory_usage > self.__max_memory_bytes)
+        ):
+            key = next(iter(self.__entries))
+
+            self.__remove(key)
+
+            self.__stats.evictions += 1
@@ -0,0 +1,186 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, Optional
+
+from enums.deadline_stage import DeadlineStage
+from errors import DeadlineExceededError
+
+
+class Deadline:
+    """
+    Бюджет времени на обработку одного обновления.
+
+    Хранит момент истечения и время, затраченное на каждый этап, чтобы при
+    исчерпании бюджета можно было сообщить, какой этап его израсходовал.
+    """
+
+    def __init__(self, budget: float):
+        self.__budget = budget
+        self.__started_at = time.monotonic()
+        self.__expires_at = self.__started_at + budget
+        self.__stages: dict[str, float] = {}
+        self.__exhausted_stage: Optional[DeadlineStage] = None
+
+    @property
+    def budget(self) -> float:
+        return self.__budget
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.__started_at
+
+    @property
+    def remaining(self) -> float:
+        return max(self.__expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.__expires_at
+
+    @property
+    def stages(self) -> dict[str, float]:
+        return dict(self.__stages)
+
+    @property
+    def exhausted_stage(self) -> Optional[DeadlineStage]:
+        return self.__exhausted_stage
+
+    def record(self, stage: DeadlineStage, seconds: float):
+        self.__stages[stage] = self.__stages.get(stage, 0.0) + seconds
+
+        if self.expired and self.__exhausted_stage is None:
+            self.__exhausted_stage = stage
+
+    def exceeded(self, stage: Optional[DeadlineStage] = None) -> DeadlineExceededError:
+        stage = stage or current_deadline_stage.get() or self.__exhausted_stage or DeadlineStage.HANDLER
+
+        return DeadlineExceededError(stage, self.__budget, self.stages)
+
+    def timeout(self, default: float) -> float:
+        """
+        Время ожидания для очередной операции: не больше default и не больше остатка бюджета.
+
+        Raises:
+            DeadlineExceededError: Бюджет уже исчерпан
+        """
+
+        if self.expired:
+            raise self.exceeded()
+
+        return min(default, self.remaining)
+
+
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+current_deadline_stage: ContextVar[Optional[DeadlineStage]] = ContextVar("current_deadline_stage", default=None)
+
+
+def remaining_timeout(default: float) -> float:
+    """
+    Время ожидания с учётом бюджета текущего обновления.
+
+    Args:
+        default: Время ожидания, если бюджет не задан или остаток больше
+
+    Returns:
+        Время ожидания в секундах
+
+    Raises:
+        DeadlineExceededError: Бюджет уже исчерпан
+    """
+
+    deadline = current_deadline.get()
+
+    if deadline is None:
+        return default
+
+    return deadline.timeout(default)
+
+
+def check_deadline():
+    """
+    Проверяет, не исчерпан ли бюджет текущего обновления.
+
+    Raises:
+        DeadlineExceededError: Бюджет исчерпан
+    """
+
+    deadline = current_deadline.get()
+
+    if deadline is not None and deadline.expired:
+        raise deadline.exceeded()
+
+
+@asynccontextmanager
+async def deadline_scope(budget: float) -> AsyncIterator[Deadline]:
+    """
+    Ограничивает выполнение блока бюджетом времени.
+
+    По истечении бюджета блок отменяется, а наружу выбрасывается
+    DeadlineExceededError с этапом, на котором закончилось время.
+    """
+
+    deadline = Deadline(budget)
+
+    token = current_deadline.set(deadline)
+
+    timeout = asyncio.timeout(budget)
+
+    try:
+        async with timeout:
+            yield deadline
+    except TimeoutError:
+        if timeout.expired():
+            raise deadline.exceeded() from None
+
+        raise
+    finally:
+        current_deadline.reset(token)
+
+
+@asynccontextmanager
+async def deadline_stage(stage: DeadlineStage) -> AsyncIterator[None]:
+    """
+    Отмечает этап обработки обновления для учёта затраченного времени.
+
+    Raises:
+        DeadlineExceededError: Бюджет исчерпан до начала этапа
+    """
+
+    deadline = current_deadline.get()
+
+    # Повторный вход в тот же этап (например, search_track_by_id -> search_by_id) не учитывается дважды
+    if deadline is None or current_deadline_stage.get() == stage:
+        yield
+
+        return
+
+    if deadline.expired:
+        raise deadline.exceeded(stage)
+
+    token = current_deadline_stage.set(stage)
+
+    started_at = time.monotonic()
+
+    try:
+        yield
+    finally:
+        deadline.record(stage, time.monotonic() - started_at)
+
+        current_deadline_stage.reset(token)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """Снимает бюджет времени внутри блока (и в задачах, созданных в нём) - для фоновой работы."""
+
+    deadline_token = current_deadline.set(None)
+    stage_token = current_deadline_stage.set(None)
+
+    try:
+        yield
+    finally:
+        current_deadline_stage.reset(stage_token)
+        current_deadline.reset(deadline_token)
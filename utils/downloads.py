@@ -1,10 +1,25 @@
-import shutil
+import asyncio
+import logging
+import os
+import re
+import signal
 import subprocess
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
 
-from config import EMPTY_CONTENT_TEXT
+from config import EMPTY_CONTENT_TEXT, SPOTDL_TIMEOUT, SPOTDL_KILL_TIMEOUT, SPOTDL_OUTPUT_TAIL_LINES
 from errors import DownloadError, DownloadedFilesNotFoundError
+from utils.deadline import remaining_timeout
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_PERCENT_REGEX = re.compile(r"(\d{1,3})(?:\.\d+)?\s*%")
+
+OUTPUT_LINE_SEPARATOR_REGEX = re.compile(rb"[\r\n]")
+
+OUTPUT_CHUNK_SIZE = 4096
 
 
 @dataclass
@@ -12,49 +27,191 @@ class DownloadedTrackFile:
     path: Path = field(default_factory=Path)
     filename: str = EMPTY_CONTENT_TEXT
     title: str = EMPTY_CONTENT_TEXT
-    file_bytes: bytes = field(default_factory=lambda: bytes)
 
 
-def download_track_spotify(url: str, output_dir: str) -> DownloadedTrackFile:
+@dataclass
+class DownloadProgress:
+    """Прогресс скачивания, разобранный из вывода spotdl."""
+
+    line: str
+    percent: Optional[int] = None
+
+
+def parse_download_progress(line: str) -> Optional[DownloadProgress]:
+    """
+    Разбирает строку вывода spotdl.
+
+    Args:
+        line: Строка вывода
+
+    Returns:
+        Экземпляр типа DownloadProgress или None, если строка не несёт информации о прогрессе
+    """
+
+    line = line.strip()
+
+    if not line:
+        return None
+
+    if line.startswith("Downloaded") or line.startswith("Skipping"):
+        return DownloadProgress(line=line, percent=100)
+
+    match = PROGRESS_PERCENT_REGEX.search(line)
+
+    if match:
+        return DownloadProgress(line=line, percent=min(int(match.group(1)), 100))
+
+    return DownloadProgress(line=line)
+
+
+async def download_track_spotify(
+        url: str,
+        output_dir: str,
+        on_progress: Optional[Callable[[DownloadProgress], None]] = None
+) -> DownloadedTrackFile:
     """
     Скачивает трек по ссылке в указанную директорию.
 
+    spotdl запускается как асинхронный подпроцесс, его вывод читается построчно
+    и передаётся в on_progress. При отмене или по истечении времени процесс
+    завершается (а если не завершился - принудительно останавливается).
+
+    Директория должна принадлежать только этому скачиванию: файлы в ней
+    не удаляются, а результат выбирается среди всех найденных mp3.
+
     Args:
         url: Ссылка на трек
         output_dir: Директория для скачивания
+        on_progress: Обработчик прогресса скачивания
 
     Returns:
         Экземпляр типа DownloadedTrackFile с информацией о скачанном файле трека
 
     Raises:
+        DeadlineExceededError: Исчерпан бюджет времени обновления
+        subprocess.TimeoutExpired: Скачивание не уложилось в отведённое время
         DownloadError: Ошибка при скачивании
-        DownloadedTrackFile: Скачанные файлы не найдены
+        DownloadedFilesNotFoundError: Скачанные файлы не найдены
     """
 
     download_dir = Path(output_dir)
 
     download_dir.mkdir(parents=True, exist_ok=True)
 
-    for item in download_dir.iterdir():
-        if item.is_file():
-            item.unlink()
-        else:
-            shutil.rmtree(item)
+    command = ["spotdl", "download", url, "--output", str(download_dir)]
 
-    result = subprocess.run(
-        ["spotdl", "download", url, "--output", str(download_dir)],
-        capture_output=True,
-        text=True,
-        timeout=250
+    timeout = remaining_timeout(SPOTDL_TIMEOUT)
+
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        # Своя группа процессов, чтобы при остановке завершить и дочерние процессы spotdl (ffmpeg)
+        start_new_session=True
     )
 
-    if result.returncode != 0:
+    # Хранится только хвост вывода - для диагностики ошибок
+    output_tail: deque[str] = deque(maxlen=SPOTDL_OUTPUT_TAIL_LINES)
+
+    try:
+        async with asyncio.timeout(timeout):
+            async for line in iter_output_lines(process.stdout):
+                output_tail.append(line)
+
+                progress = parse_download_progress(line)
+
+                if progress is not None and on_progress is not None:
+                    on_progress(progress)
+
+            return_code = await process.wait()
+    except TimeoutError:
+        raise subprocess.TimeoutExpired(command, timeout) from None
+    finally:
+        if process.returncode is None:
+            await stop_process(process)
+
+    if return_code != 0:
+        logger.warning("spotdl завершился с кодом %s:\n%s", return_code, "\n".join(output_tail))
+
         raise DownloadError(url)
 
-    mp3_files = list(download_dir.glob("*.mp3"))
+    return await asyncio.to_thread(collect_downloaded_track, download_dir)
 
-    if not mp3_files:
-        DownloadedFilesNotFoundError(mp3_files)
+
+async def iter_output_lines(stream: asyncio.StreamReader) -> AsyncIterator[str]:
+    """
+    Читает вывод подпроцесса построчно.
+
+    Строки разделяются и по переводу строки, и по возврату каретки: индикаторы
+    прогресса перерисовываются возвратом каретки и иначе копились бы в одну
+    бесконечную строку.
+    """
+
+    buffer = b""
+
+    while chunk := await stream.read(OUTPUT_CHUNK_SIZE):
+        *lines, buffer = OUTPUT_LINE_SEPARATOR_REGEX.split(buffer + chunk)
+
+        for line in lines:
+            if line:
+                yield line.decode(errors="replace").rstrip()
+
+    if buffer:
+        yield buffer.decode(errors="replace").rstrip()
+
+
+async def stop_process(process: asyncio.subprocess.Process, kill_timeout: float = SPOTDL_KILL_TIMEOUT):
+    """
+    Завершает подпроцесс вместе с его группой: сначала SIGTERM, затем SIGKILL,
+    если процесс не завершился за kill_timeout.
+
+    Args:
+        process: Подпроцесс
+        kill_timeout: Время ожидания завершения после SIGTERM
+    """
+
+    if not send_signal(process, signal.SIGTERM):
+        return
+
+    try:
+        # shield: ожидание завершения не должно прерываться повторной отменой, иначе останется зомби
+        await asyncio.shield(asyncio.wait_for(process.wait(), timeout=kill_timeout))
+    except TimeoutError:
+        send_signal(process, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+    except asyncio.CancelledError:
+        # Процесс не дожидаемся, но и не оставляем работать; отмена передаётся вызывающему
+        send_signal(process, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+
+        raise
+
+
+def send_signal(process: asyncio.subprocess.Process, signal_number: int) -> bool:
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal_number)
+        else:
+            process.send_signal(signal_number)
+    except ProcessLookupError:
+        return False
+
+    return True
+
+
+def collect_downloaded_track(download_dir: Path) -> DownloadedTrackFile:
+    """
+    Находит скачанный трек в директории скачивания.
+
+    Args:
+        download_dir: Директория скачивания
+
+    Returns:
+        Экземпляр типа DownloadedTrackFile с информацией о скачанном файле трека
+
+    Raises:
+        DownloadedFilesNotFoundError: Скачанные файлы не найдены
+    """
+
+    mp3_files = sorted(download_dir.glob("*.mp3"))
 
     # Обработка бага библиотеки
     for file in mp3_files:
@@ -65,17 +222,17 @@ def download_track_spotify(url: str, output_dir: str) -> DownloadedTrackFile:
 
             break
 
+    if not mp3_files:
+        raise DownloadedFilesNotFoundError([str(download_dir)])
+
     file_path = Path(mp3_files[-1])
 
     filename = file_path.name
 
     title = filename[0:filename.rfind(".")]
 
-    file_bytes = file_path.read_bytes()
-
     return DownloadedTrackFile(
         path=file_path,
         filename=filename,
-        title=title,
-        file_bytes=file_bytes
-    )
\ No newline at end of file
+        title=title
+    )
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_POOL_MAXSIZE, HTTP_SESSION_IDLE_TIMEOUT
+from utils import json_decode
+from utils.json_decode import ACCEPT_ENCODING
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HTTPConnectionStats:
+    """Счётчики переиспользования соединений."""
+
+    requests: int = 0
+    connections: int = 0
+
+    @property
+    def reused(self) -> int:
+        return max(self.requests - self.connections, 0)
+
+    @property
+    def reuse_ratio(self) -> float:
+        if self.requests == 0:
+            return 0.0
+
+        return self.reused / self.requests
+
+
+@dataclass
+class _HostSession:
+    session: requests.Session
+    last_used_at: float
+
+
+class HTTPSessionPool:
+    """
+    Пул keep-alive сессий requests, по одной на хост.
+
+    Каждая сессия держит собственный пул соединений urllib3, поэтому
+    повторные запросы к одному хосту не выполняют новое TCP/TLS-рукопожатие.
+    Сессии, не использовавшиеся дольше idle_timeout секунд, закрываются.
+    """
+
+    def __init__(
+            self,
+            pool_maxsize: int = HTTP_POOL_MAXSIZE,
+            idle_timeout: float = HTTP_SESSION_IDLE_TIMEOUT
+    ):
+        self.__pool_maxsize = pool_maxsize
+        self.__idle_timeout = idle_timeout
+
+        self.__sessions: dict[str, _HostSession] = {}
+        self.__lock = threading.Lock()
+
+        self.__closed_stats = HTTPConnectionStats()
+
+    @property
+    def pool_maxsize(self) -> int:
+        return self.__pool_maxsize
+
+    @property
+    def idle_timeout(self) -> float:
+        return self.__idle_timeout
+
+    @property
+    def stats(self) -> HTTPConnectionStats:
+        with self.__lock:
+            stats = HTTPConnectionStats(
+                requests=self.__closed_stats.requests,
+                connections=self.__closed_stats.connections
+            )
+
+            for host_session in self.__sessions.values():
+                self.__add_session_stats(stats, host_session.session)
+
+        return stats
+
+    def get(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc
+
+        now = time.monotonic()
+
+        with self.__lock:
+            self.__evict_idle(now)
+
+            host_session = self.__sessions.get(host)
+
+            if host_session is None:
+                host_session = _HostSession(session=self.__create_session(), last_used_at=now)
+
+                self.__sessions[host] = host_session
+            else:
+                host_session.last_used_at = now
+
+            return host_session.session
+
+    def close(self):
+        with self.__lock:
+            for host_session in self.__sessions.values():
+                self.__close_session(host_session.session)
+
+            self.__sessions.clear()
+
+    def __create_session(self) -> requests.Session:
+        session = requests.Session()
+
+        session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.__pool_maxsize
+        )
+
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        return session
+
+    def __evict_idle(self, now: float):
+        expired_hosts = [
+            host for host, host_session in self.__sessions.items()
+            if now - host_session.last_used_at > self.__idle_timeout
+        ]
+
+        for host in expired_hosts:
+            self.__close_session(self.__sessions.pop(host).session)
+
+    def __close_session(self, session: requests.Session):
+        self.__add_session_stats(self.__closed_stats, session)
+
+        session.close()
+
+    @staticmethod
+    def __add_session_stats(stats: HTTPConnectionStats, session: requests.Session):
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+
+            for key in pools.keys():
+                pool = pools.get(key)
+
+                if pool is None:
+                    continue
+
+                stats.requests += pool.num_requests
+                stats.connections += pool.num_connections
+
+
+def create_async_session(
+        stats: Optional[HTTPConnectionStats] = None,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        idle_timeout: float = HTTP_SESSION_IDLE_TIMEOUT
+) -> aiohttp.ClientSession:
+    """
+    Создаёт сессию aiohttp с ограниченным пулом keep-alive соединений на хост.
+
+    Args:
+        stats: Счётчики, в которые записываются запросы и новые соединения
+        pool_maxsize: Максимальное количество соединений к одному хосту
+        idle_timeout: Время жизни простаивающего соединения в секундах
+
+    Returns:
+        Экземпляр aiohttp.ClientSession
+    """
+
+    connector = aiohttp.TCPConnector(
+        limit=0,
+        limit_per_host=pool_maxsize,
+        keepalive_timeout=idle_timeout
+    )
+
+    trace_configs = []
+
+    if stats is not None:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session: aiohttp.ClientSession, context: SimpleNamespace, params):
+            stats.requests += 1
+
+        async def on_connection_create_end(session: aiohttp.ClientSession, context: SimpleNamespace, params):
+            stats.connections += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+
+        trace_configs.append(trace_config)
+
+    return aiohttp.ClientSession(
+        connector=connector,
+        trace_configs=trace_configs,
+        headers={"Accept-Encoding": ACCEPT_ENCODING},
+        json_serialize=json_decode.dumps
+    )
+
+
+def log_connection_stats(name: str, stats: HTTPConnectionStats):
+    logger.info(
+        "%s: запросов %d, новых соединений %d, переиспользовано %d (%.0f%%)",
+        name,
+        stats.requests,
+        stats.connections,
+        stats.reused,
+        stats.reuse_ratio * 100
+    )
+
+
+http_session_pool = HTTPSessionPool()
@@ -0,0 +1,53 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """
+    Разбирает JSON самым быстрым доступным парсером (orjson, если установлен).
+
+    Args:
+        data: Тело ответа
+
+    Returns:
+        Разобранный документ
+    """
+
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def dumps(data: Any) -> str:
+    """
+    Сериализует объект в JSON-строку самым быстрым доступным сериализатором.
+
+    Args:
+        data: Объект
+
+    Returns:
+        JSON-строка
+    """
+
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+
+    return json.dumps(data, ensure_ascii=False)
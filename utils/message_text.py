@@ -1,12 +1,25 @@
+import re
 from abc import ABC, abstractmethod
 from typing import Optional
 
+from config import MARKDOWN_LINK_REGEX, TELEGRAM_MESSAGE_TEXT_MAX_LENGTH
 from enums.command_name import CommandName
 from enums.payload_command import PayloadCommand
-from services.spotify import SpotifyArtist, SpotifyTrack, SpotifyAlbum, spotify_client
+from services.spotify import SpotifyArtist, SpotifyTrack, SpotifyAlbum
 from utils.urls import generate_content_share_url
 
 
+def visible_text_length(text: str) -> int:
+    """
+    Длина текста так, как её считает Telegram: после разбора Markdown (у ссылок
+    учитывается только текст) и в единицах UTF-16.
+    """
+
+    text = re.sub(MARKDOWN_LINK_REGEX, r"\1", text).replace("*", "")
+
+    return len(text.encode("utf-16-le")) // 2
+
+
 class MessageText(ABC):
     @property
     @abstractmethod
@@ -45,7 +58,12 @@ class ContentMessageText(ABC):
         return text
 
     @staticmethod
-    def tracks_text(tracks: list[SpotifyTrack]) -> str:
+    def tracks_text(tracks: list[SpotifyTrack], max_length: Optional[int] = None) -> str:
+        """
+        Список треков. Если задан max_length, в список попадает столько треков,
+        сколько помещается в max_length видимых символов, остальные сворачиваются в строку "... и ещё N".
+        """
+
         tracks_len = len(tracks)
 
         text = "🎶"
@@ -58,8 +76,22 @@ class ContentMessageText(ABC):
         text += f"*Трек{'и' if tracks_len > 1 else ''}*:"
 
         if tracks_len > 1:
+            length = visible_text_length(text)
+
             for index, track in enumerate(tracks):
-                text += f"\n   {index + 1}. - [{track.name}]({generate_content_share_url(PayloadCommand.TRACK, track.id)})"
+                line = f"\n   {index + 1}. - [{track.name}]({generate_content_share_url(PayloadCommand.TRACK, track.id)})"
+
+                length += visible_text_length(line)
+
+                # Для непоследнего трека оставляется место под строку с количеством оставшихся
+                rest_len = visible_text_length(f"\n   ... и ещё {tracks_len - index - 1}") if index < tracks_len - 1 else 0
+
+                if max_length is not None and length + rest_len > max_length:
+                    text += f"\n   ... и ещё {tracks_len - index}"
+
+                    break
+
+                text += line
         else:
             text += f" [{tracks[0].name}]({generate_content_share_url(PayloadCommand.TRACK, tracks[0].id)})"
 
@@ -133,18 +165,35 @@ class ContentMessageTextTrack(ContentMessageText):
 
 
 class ContentMessageTextAlbum(ContentMessageText):
-    def __init__(self, album: SpotifyAlbum):
+    def __init__(
+            self,
+            album: SpotifyAlbum,
+            tracks: list[SpotifyTrack],
+            max_length: int = TELEGRAM_MESSAGE_TEXT_MAX_LENGTH
+    ):
         super().__init__()
 
         self.__album = album
+        self.__tracks = tracks
+        self.__max_length = max_length
 
     @property
     def text(self) -> str:
-        tracks = spotify_client.get_tracks_by_album_id(self.__album.id)
+        total_tracks_text = f"🎵 *Треков*: {self.__album.total_tracks}"
+
+        # Список треков получает всю длину, оставшуюся от карточки (и перевода строки перед списком)
+        text_without_tracks = self._container(
+            name=self.__album.name,
+            artists=self.__album.artists,
+            release_date=self.__album.release_date,
+            data=(total_tracks_text,)
+        )
+
+        tracks_max_length = self.__max_length - visible_text_length(text_without_tracks) - 1
 
         data = (
-            f"🎵 *Треков*: {self.__album.total_tracks}",
-            self.tracks_text(tracks)
+            total_tracks_text,
+            self.tracks_text(self.__tracks, max_length=tracks_max_length)
         )
 
         text = self._container(
@@ -1,11 +1,70 @@
+import asyncio
+from dataclasses import dataclass, field
+
+import aiohttp
 import requests
-from typing import Any, Optional
+from typing import Any, Mapping, Optional
 
 from requests import Response
 
 from enums.request_type import RequestType
+from utils import json_decode
+from utils.deadline import remaining_timeout, check_deadline
+from utils.http_sessions import HTTPSessionPool, http_session_pool
+from config import HTTP_DEFAULT_RETRY_AFTER, HTTP_REQUEST_TIMEOUT
 from errors import RemoteResponseDataError, RemoteTimeoutError, RemoteConnectionError, RemoteHTTPError, \
-    RemoteRequestException
+    RemoteRequestException, RemoteRateLimitError
+
+
+_NOT_PARSED = object()
+
+
+@dataclass
+class RemoteResponse:
+    """Ответ асинхронного запроса с уже прочитанным телом."""
+
+    url: str = ""
+    status_code: int = 0
+    headers: Mapping[str, str] = field(default_factory=dict)
+    content: bytes = b""
+    _json: Any = field(default=_NOT_PARSED, init=False, repr=False, compare=False)
+
+    def json(self) -> Any:
+        """
+        Разобранное тело ответа.
+
+        Raises:
+            RemoteResponseDataError: Тело ответа - не JSON
+        """
+
+        # Тело разбирается один раз, повторные вызовы возвращают тот же документ
+        if self._json is _NOT_PARSED:
+            try:
+                self._json = json_decode.loads(self.content)
+            except ValueError as ex:
+                # Ошибки json и orjson (включая UnicodeDecodeError) - наследники ValueError
+                raise RemoteResponseDataError(str(ex), self.content[:200].decode(errors="replace"))
+
+        return self._json
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> float:
+    """
+    Получает время ожидания из заголовка Retry-After.
+
+    Args:
+        headers: Заголовки ответа
+
+    Returns:
+        Время ожидания в секундах
+    """
+
+    value = (headers or {}).get("Retry-After")
+
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return HTTP_DEFAULT_RETRY_AFTER
 
 
 def send_request(
@@ -14,7 +73,8 @@ def send_request(
         headers: Optional[dict[str, Any]] = None,
         data: Optional[dict[str, Any]] = None,
         params: Optional[dict[str, Any]] = None,
-        timeout: int = 250
+        timeout: float = HTTP_REQUEST_TIMEOUT,
+        session_pool: Optional[HTTPSessionPool] = None
 ) -> Response:
     """
     Отправляет POST/GET-запрос по указанному URL.
@@ -25,29 +85,39 @@ def send_request(
         headers: Заголовки
         data: Данные для POST-запроса
         params: Данные для GET-запроса
-        timeout: Время ожидания
+        timeout: Время ожидания (не больше остатка бюджета текущего обновления)
+        session_pool: Пул keep-alive сессий (по умолчанию общий пул модуля)
 
     Returns:
         Ответ в виде объекта requests.Response
 
     Raises:
+        DeadlineExceededError: Исчерпан бюджет времени обновления
         RemoteTimeoutError: Превышено время ожидания
         RemoteConnectionError: Ошибка подключения
+        RemoteRateLimitError: Превышен лимит запросов
         RemoteHTTPError: Ошибка HTTP-запроса
         RemoteRequestException: Ошибка запроса
         RemoteResponseDataError: Некорректные данные в ответе
     """
 
+    if session_pool is None:
+        session_pool = http_session_pool
+
+    timeout = remaining_timeout(timeout)
+
     try:
+        session = session_pool.get(url)
+
         if request_type == RequestType.POST:
-            response: Response = requests.post(
+            response: Response = session.post(
                 url=url,
                 headers=headers,
                 data=data,
                 timeout=timeout
             )
         else:
-            response: Response = requests.get(
+            response: Response = session.get(
                 url=url,
                 headers=headers,
                 params=params,
@@ -59,12 +129,17 @@ def send_request(
         return response
 
     except requests.exceptions.Timeout:
+        check_deadline()
+
         raise RemoteTimeoutError()
 
     except requests.exceptions.ConnectionError:
         raise RemoteConnectionError()
 
     except requests.exceptions.HTTPError as ex:
+        if ex.response is not None and ex.response.status_code == 429:
+            raise RemoteRateLimitError(ex, retry_after=parse_retry_after(ex.response.headers))
+
         raise RemoteHTTPError(ex)
 
     except requests.exceptions.RequestException as ex:
@@ -72,3 +147,79 @@ def send_request(
 
     except Exception as ex:
         raise RemoteResponseDataError(str(ex))
+
+
+async def send_request_async(
+        session: aiohttp.ClientSession,
+        request_type: RequestType,
+        url: str,
+        headers: Optional[dict[str, Any]] = None,
+        data: Optional[dict[str, Any]] = None,
+        params: Optional[dict[str, Any]] = None,
+        timeout: float = HTTP_REQUEST_TIMEOUT
+) -> RemoteResponse:
+    """
+    Асинхронно отправляет POST/GET-запрос по указанному URL через общую сессию.
+
+    Args:
+        session: Сессия aiohttp с пулом соединений
+        request_type: Тип запроса
+        url: URL для отправки запроса
+        headers: Заголовки
+        data: Данные для POST-запроса
+        params: Данные для GET-запроса
+        timeout: Время ожидания (не больше остатка бюджета текущего обновления)
+
+    Returns:
+        Ответ в виде объекта RemoteResponse
+
+    Raises:
+        DeadlineExceededError: Исчерпан бюджет времени обновления
+        RemoteTimeoutError: Превышено время ожидания
+        RemoteConnectionError: Ошибка подключения
+        RemoteRateLimitError: Превышен лимит запросов
+        RemoteHTTPError: Ошибка HTTP-запроса
+        RemoteRequestException: Ошибка запроса
+        RemoteResponseDataError: Некорректные данные в ответе
+    """
+
+    timeout = remaining_timeout(timeout)
+
+    try:
+        async with session.request(
+            method=request_type.value.upper(),
+            url=url,
+            headers=headers,
+            data=data if request_type == RequestType.POST else None,
+            params=params if request_type == RequestType.GET else None,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            response.raise_for_status()
+
+            return RemoteResponse(
+                url=str(response.url),
+                status_code=response.status,
+                headers=response.headers.copy(),
+                content=await response.read()
+            )
+
+    except asyncio.TimeoutError:
+        # Время вышло из-за бюджета обновления, а не из-за медленного ответа сервера
+        check_deadline()
+
+        raise RemoteTimeoutError()
+
+    except aiohttp.ClientResponseError as ex:
+        if ex.status == 429:
+            raise RemoteRateLimitError(ex, retry_after=parse_retry_after(ex.headers))
+
+        raise RemoteHTTPError(ex)
+
+    except aiohttp.ClientConnectionError:
+        raise RemoteConnectionError()
+
+    except aiohttp.ClientError as ex:
+        raise RemoteRequestException(str(ex))
+
+    except Exception as ex:
+        raise RemoteResponseDataError(str(ex))
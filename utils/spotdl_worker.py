@@ -0,0 +1,90 @@
+"""
+Процесс-обработчик скачиваний.
+
+Загружает spotdl один раз и выполняет задания, приходящие построчно в stdin
+в формате JSON. Ответы пишутся в stdout тем же форматом; всё, что печатает сам
+spotdl, перенаправляется в stderr, чтобы не смешиваться с протоколом.
+
+Запуск из корня проекта:
+    python -m utils.spotdl_worker
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+SPOTDL_OUTPUT_TEMPLATE = "{artists} - {title}.{output-ext}"
+
+
+def create_spotdl():
+    from spotdl import Spotdl
+
+    from config import config
+
+    return Spotdl(
+        client_id=config.SPOTIFY_CLIENT_ID,
+        client_secret=config.SPOTIFY_CLIENT_SECRET,
+        downloader_settings={
+            "simple_tui": True,
+            "log_level": "ERROR"
+        }
+    )
+
+
+def download(spotdl, url: str, output_dir: str) -> dict[str, Any]:
+    spotdl.downloader.settings["output"] = str(Path(output_dir) / SPOTDL_OUTPUT_TEMPLATE)
+
+    songs = spotdl.search([url])
+
+    if not songs:
+        return {"type": "failed", "error": "Трек не найден"}
+
+    results = spotdl.download_songs(songs)
+
+    if not results or any(path is None for _, path in results):
+        return {"type": "failed", "error": "spotdl не скачал файл"}
+
+    return {"type": "done"}
+
+
+def main() -> int:
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1, encoding="utf-8")
+
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def send(message: dict[str, Any]):
+        protocol.write(json.dumps(message, ensure_ascii=False) + "\n")
+        protocol.flush()
+
+    try:
+        spotdl = create_spotdl()
+    except Exception as ex:
+        send({"type": "error", "error": f"{type(ex).__name__}: {ex}"})
+
+        return 1
+
+    send({"type": "ready"})
+
+    handlers: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+        "ping": lambda message: {"type": "pong"},
+        "download": lambda message: download(spotdl, message["url"], message["output_dir"])
+    }
+
+    for line in sys.stdin:
+        message = json.loads(line)
+
+        if message["type"] == "stop":
+            break
+
+        try:
+            send(handlers[message["type"]](message))
+        except Exception as ex:
+            send({"type": "failed", "error": f"{type(ex).__name__}: {ex}"})
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
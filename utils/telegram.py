@@ -0,0 +1,41 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from config import TELEGRAM_RETRY_AFTER_MAX_ATTEMPTS
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+async def retry_after_flood_control(
+        request: Callable[[], Awaitable[T]],
+        attempts: int = TELEGRAM_RETRY_AFTER_MAX_ATTEMPTS
+) -> T:
+    """
+    Выполняет запрос к Telegram, повторяя его после паузы, если Telegram ответил TelegramRetryAfter.
+
+    Args:
+        request: Запрос (вызывается заново на каждой попытке)
+        attempts: Количество попыток
+
+    Returns:
+        Результат запроса
+
+    Raises:
+        TelegramRetryAfter: Лимит не снят после attempts попыток
+    """
+
+    for attempt in range(1, attempts + 1):
+        try:
+            return await request()
+        except TelegramRetryAfter as ex:
+            if attempt == attempts:
+                raise
+
+            logger.warning("Telegram ограничил частоту запросов, повтор через %s с", ex.retry_after)
+
+            await asyncio.sleep(ex.retry_after)
@@ -0,0 +1,83 @@
+import asyncio
+import subprocess
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+from config import TRANSCODE_TIMEOUT, SPOTDL_OUTPUT_TAIL_LINES
+from enums.transcode_profile import TranscodeProfile
+from errors import TranscodeError
+from utils.downloads import iter_output_lines, stop_process
+
+
+@dataclass(frozen=True)
+class TranscodeProfileSpec:
+    """Параметры ffmpeg для профиля перекодирования."""
+
+    extension: str
+    arguments: tuple[str, ...]
+
+
+TRANSCODE_PROFILE_SPECS: dict[TranscodeProfile, TranscodeProfileSpec] = {
+    TranscodeProfile.MP3_128: TranscodeProfileSpec(
+        extension=".mp3",
+        arguments=("-c:a", "libmp3lame", "-b:a", "128k")
+    ),
+    TranscodeProfile.OPUS_96: TranscodeProfileSpec(
+        extension=".ogg",
+        arguments=("-c:a", "libopus", "-b:a", "96k", "-vbr", "on")
+    )
+}
+
+
+async def transcode_audio(source: Path, output_path: Path, profile: TranscodeProfile, timeout: float = TRANSCODE_TIMEOUT):
+    """
+    Перекодирует аудиофайл с помощью ffmpeg.
+
+    Обложка (видеопоток) отбрасывается, теги копируются. При отмене или по
+    истечении времени процесс ffmpeg останавливается.
+
+    Args:
+        source: Исходный файл
+        output_path: Файл результата
+        profile: Профиль перекодирования
+        timeout: Время на перекодирование
+
+    Raises:
+        subprocess.TimeoutExpired: Перекодирование не уложилось в отведённое время
+        TranscodeError: Ошибка ffmpeg
+    """
+
+    spec = TRANSCODE_PROFILE_SPECS[profile]
+
+    command = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", str(source),
+        "-map", "0:a", "-map_metadata", "0",
+        *spec.arguments,
+        str(output_path)
+    ]
+
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True
+    )
+
+    output_tail: deque[str] = deque(maxlen=SPOTDL_OUTPUT_TAIL_LINES)
+
+    try:
+        async with asyncio.timeout(timeout):
+            async for line in iter_output_lines(process.stderr):
+                output_tail.append(line)
+
+            return_code = await process.wait()
+    except TimeoutError:
+        raise subprocess.TimeoutExpired(command, timeout) from None
+    finally:
+        if process.returncode is None:
+            await stop_process(process)
+
+    if return_code != 0:
+        raise TranscodeError(source, "\n".join(output_tail) or f"код завершения {return_code}")
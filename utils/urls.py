@@ -1,7 +1,8 @@
 import re
+from typing import Optional
 from urllib.parse import quote
 
-from config import URL_QUOTE_REGEX
+from config import URL_QUOTE_REGEX, SPOTIFY_TRACK_ID_REGEX, SPOTIFY_ID_REGEX
 from enums.payload_command import PayloadCommand
 
 
@@ -15,3 +16,25 @@ def generate_content_share_url(payload_command: PayloadCommand, content_id: str)
     url += data
 
     return url
+
+
+def is_spotify_id(content_id: str) -> bool:
+    """Проверяет, что строка похожа на ID Spotify (22 символа base62)."""
+
+    return re.fullmatch(SPOTIFY_ID_REGEX, content_id) is not None
+
+
+def extract_spotify_track_id(url: str) -> Optional[str]:
+    """
+    Получает ID трека из ссылки Spotify.
+
+    Args:
+        url: Ссылка на трек
+
+    Returns:
+        ID трека или None, если ссылка не распознана
+    """
+
+    match = re.match(SPOTIFY_TRACK_ID_REGEX, url.strip())
+
+    return match.group(1) if match else None